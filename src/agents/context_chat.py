@@ -12,6 +12,9 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 from src.utils.llm import get_llm_client
 from src.rag.retriever import HybridPOIRetriever, TipsRetriever
 
+# Walking distance for "nearby places" when the user's location is known
+NEARBY_RADIUS_KM = 1.5
+
 
 # Knowledge base for common questions
 LOCAL_KNOWLEDGE = {
@@ -191,9 +194,22 @@ Answer helpfully and concisely:
         return ""
     
     def _get_nearby_pois(self, question: str, user_context: Optional[Dict] = None) -> str:
-        """Get nearby POIs relevant to the question."""
+        """Get nearby POIs: by distance when the user's location is known, else by relevance."""
         
         try:
+            origin = self._resolve_location(user_context)
+            if origin:
+                lat, lng, exclude = origin
+                nearby = self.poi_retriever.nearby(
+                    lat, lng, radius_km=NEARBY_RADIUS_KM, limit=3, exclude_ids=exclude
+                )
+                if nearby:
+                    pois = [
+                        f"• {poi.name} (~{int(round(km * 1000, -1))} м): {poi.description[:50]}..."
+                        for poi, km in nearby
+                    ]
+                    return "\n".join(pois)
+            
             results = self.poi_retriever.search(query=question, top_k=3)
             if results:
                 pois = [f"• {r.poi.name}: {r.poi.description[:50]}..." for r in results[:3]]
@@ -203,6 +219,23 @@ Answer helpfully and concisely:
         
         return ""
     
+    def _resolve_location(self, user_context: Optional[Dict]) -> Optional[tuple]:
+        """(lat, lng, exclude_ids) from user_context ("lat"/"lng" or "current_poi")."""
+        
+        if not user_context:
+            return None
+        
+        if user_context.get("lat") is not None and user_context.get("lng") is not None:
+            return float(user_context["lat"]), float(user_context["lng"]), []
+        
+        current = user_context.get("current_poi")
+        if current:
+            poi = self.poi_retriever.get_by_id(current)
+            if poi and poi.coordinates:
+                return poi.coordinates.lat, poi.coordinates.lng, [poi.id]
+        
+        return None
+    
     def _get_relevant_tips(self, question: str) -> str:
         """Get relevant tips from tips retriever."""
         
@@ -1,14 +1,21 @@
 """
-AI Route Planner - Generates trip routes using LLM and RAG.
-100% AI-powered generation - no hardcoded templates.
+AI Route Planner - Generates trip routes using RAG and a deterministic solver.
+Places, times, meals and budgets are fixed by the solver; the LLM only
+writes route names, day themes and notes.
 """
 
-import json
+import os
 import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from pathlib import Path
 from typing import List, Optional, Tuple, Dict, Any
 from datetime import datetime, timedelta
 
+import numpy as np
+
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from src.models.schemas import (
@@ -16,46 +23,108 @@ from src.models.schemas import (
     BudgetStyle, Evidence, PhysicalLevel
 )
 from src.rag.retriever import HybridPOIRetriever, TipsRetriever, FilterCriteria
+from src.rag.catalog import get_catalog, CatalogSnapshot
+from src.rag.travel import TravelMatrix, get_travel_matrix, transfer_slot_minutes
+from src.rag.opening_hours import Day, OpeningHoursIndex, get_opening_hours, parse_hhmm
+from src.rag.restaurant_index import RestaurantIndex, get_restaurant_index
+from src.agents.route_optimizer import RouteOptimizer, Stop, format_minute
 from src.utils.llm import get_llm_client
 
 
-# System prompt for route generation
-ROUTE_PLANNER_SYSTEM = """Ты — эксперт по планированию путешествий в Самарканде, Узбекистан.
-Твоя задача — создавать оптимальные маршруты на основе:
-- Доступных достопримечательностей (POIs)
-- Бюджета и предпочтений туриста
-- Логистики (расстояние, время работы, физическая нагрузка)
+# System prompt for route notes (the route itself is already fixed)
+ROUTE_PLANNER_SYSTEM = """Ты — гид по Самарканду, Узбекистан.
+Тебе дают готовый маршрут: места, порядок и время уже выбраны и проверены.
 
 Правила:
-1. Размещай POI логично по географии (близкие места рядом в расписании)
-2. Учитывай время работы: большинство мест 08:00-18:00
-3. Планируй 4-7 активностей в день для умеренного темпа
-4. Для budget стиля — выбирай дешёвые и бесплатные места
-5. Оставляй время на обед (12:00-14:00) и отдых
-6. Горные туры занимают весь день (07:00-17:00)
-7. Шахи-Зинда, Регистан, Гури-Эмир — must-see для первого дня
+1. НЕ добавляй, не убирай и не переставляй места, не меняй время
+2. Придумай название маршрута и короткое описание
+3. Для каждого дня — тема с эмодзи и практичный совет
+4. Для мест — короткие заметки (что посмотреть, когда лучше фотографировать)
+5. Отвечай только JSON
 """
 
+# LLM notes for all variants run concurrently on a shared, bounded pool.
+# A variant that misses the deadline keeps its plain skeleton.
+VARIANT_TIMEOUT_SECONDS = float(os.getenv("ROUTE_VARIANT_TIMEOUT", "45"))
+_variant_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("ROUTE_VARIANT_WORKERS", "6")),
+    thread_name_prefix="route-variant"
+)
+
+# Set to 0 to skip the LLM pass entirely (routes are complete without it)
+ROUTE_LLM_NOTES = os.getenv("ROUTE_LLM_NOTES", "1") != "0"
+
+# Sightseeing hours per city day by TripRequest.pace
+PACE_DAY_HOURS = {
+    "relaxed": 5.0,
+    "moderate": 7.0,
+    "intensive": 8.5
+}
+
+# Share of the per-day budget a style plans to spend, and its stops per day
+STYLE_BUDGET_SHARE = {
+    "budget": 0.6,
+    "balanced": 0.85,
+    "comfort": 1.0
+}
+STYLE_MAX_STOPS = {
+    "budget": 6,
+    "balanced": 5,
+    "comfort": 4
+}
+
+STYLE_NAMES = {
+    "budget": "Бюджетный маршрут",
+    "balanced": "Сбалансированный маршрут",
+    "comfort": "Комфортный маршрут"
+}
+STYLE_TO_BUDGET = {
+    "budget": BudgetStyle.BUDGET,
+    "balanced": BudgetStyle.MODERATE,
+    "comfort": BudgetStyle.COMFORT
+}
+
+DAY_THEME_BY_CATEGORY = {
+    "history": "История и архитектура 🏛️",
+    "architecture": "История и архитектура 🏛️",
+    "religious": "Святыни Самарканда 🕌",
+    "museum": "Музеи и наследие 🖼️",
+    "market": "Базары и ремёсла 🛍️",
+    "craft": "Базары и ремёсла 🛍️",
+    "food": "Вкусы Самарканда 🍲",
+    "nature": "Природа 🌿",
+    "modern": "Современный город 🌆"
+}
+
+# City sightseeing ends here; dinner and at most one evening place follow
+DAY_SIGHTS_END = 19 * 60
+EVENING_END = 23 * 60
+EVENING_BEST_TIMES = ("evening", "sunset")
+
 
 class AIRoutePlanner:
     """
-    AI-powered route planner that:
+    Route planner that:
     1. Uses hybrid RAG to retrieve relevant POIs
-    2. Uses LLM to intelligently plan and sequence activities
-    3. Generates multiple route variants dynamically
-    4. Respects all user constraints
+    2. Builds timed route skeletons deterministically (opening hours, travel
+       times, meals, mountain day, per-style budget)
+    3. Optionally asks the LLM for names, themes and notes on the fixed skeleton
     """
     
     def __init__(
         self,
         poi_retriever: HybridPOIRetriever = None,
         tips_retriever: TipsRetriever = None,
-        llm_client = None
+        llm_client = None,
+        variant_timeout: float = None,
+        annotate: bool = None
     ):
         self.poi_retriever = poi_retriever or HybridPOIRetriever()
         self.tips_retriever = tips_retriever or TipsRetriever()
         self.llm_client = llm_client or get_llm_client()
-        print("🤖 AI Route Planner initialized (no templates, 100% AI)")
+        self.variant_timeout = variant_timeout if variant_timeout is not None else VARIANT_TIMEOUT_SECONDS
+        self.annotate = ROUTE_LLM_NOTES if annotate is None else annotate
+        print(f"🤖 AI Route Planner initialized (deterministic skeleton, LLM notes: {'on' if self.annotate else 'off'})")
     
     def generate_routes(
         self,
@@ -63,10 +132,10 @@ class AIRoutePlanner:
         num_variants: int = 3
     ) -> Tuple[List[Route], Evidence]:
         """
-        Generate route variants using AI:
+        Generate route variants:
         1. Retrieve relevant POIs using RAG
-        2. Get contextual tips
-        3. Use LLM to generate optimized routes
+        2. Build a deterministic, timed skeleton per style (milliseconds)
+        3. Optionally let the LLM name the routes and write themes and notes
         
         Returns:
             (list of Routes, Evidence showing what data was used)
@@ -90,23 +159,37 @@ class AIRoutePlanner:
         # Step 3: Get relevant tips for context
         tips = self.tips_retriever.get_relevant_tips(trip_request)
         
-        # Step 4: Generate routes using AI
+        # Step 4: Deterministic skeletons - places, meals and times are fixed here
         available_pois = [r.poi for r in relevant_pois]
-        
-        routes = []
         styles = ["budget", "balanced", "comfort"][:num_variants]
+        skeletons = {
+            style: self._build_skeleton(trip_request, available_pois, mountain_pois, mountain_day, style)
+            for style in styles
+        }
+        
+        # Step 5: LLM notes for all variants concurrently; a variant that misses
+        # the deadline (or fails) keeps its plain skeleton
+        futures = {}
+        if self.annotate:
+            futures = {
+                style: _variant_executor.submit(self._annotate_route, route, trip_request, tips, style)
+                for style, route in skeletons.items() if route
+            }
+        deadline = time.monotonic() + self.variant_timeout
         
+        routes = []
         for style in styles:
-            route = self._generate_ai_route(
-                trip_request=trip_request,
-                pois=available_pois,
-                mountain_pois=mountain_pois,
-                mountain_day=mountain_day,
-                tips=tips,
-                style=style
-            )
-            if route:
-                routes.append(route)
+            route = skeletons[style]
+            if route is None:
+                continue
+            future = futures.get(style)
+            if future:
+                try:
+                    route = future.result(timeout=max(0.0, deadline - time.monotonic()))
+                except FutureTimeout:
+                    print(f"⏱️ Route notes timed out for {style}, keeping the skeleton")
+                    future.cancel()
+            routes.append(route)
         
         # Build evidence
         evidence = Evidence(
@@ -141,228 +224,58 @@ class AIRoutePlanner:
         
         return None
     
-    def _generate_ai_route(
-        self,
-        trip_request: TripRequest,
-        pois: List[POI],
-        mountain_pois: List[POI],
-        mountain_day: Optional[int],
-        tips: List[str],
-        style: str
-    ) -> Optional[Route]:
-        """Generate a route using LLM."""
-        
-        try:
-            # Prepare POI data for LLM
-            poi_data = self._prepare_poi_data(pois, style)
-            mountain_data = self._prepare_poi_data(mountain_pois, style) if mountain_pois else []
-            
-            # Build prompt
-            prompt = self._build_generation_prompt(
-                trip_request=trip_request,
-                poi_data=poi_data,
-                mountain_data=mountain_data,
-                mountain_day=mountain_day,
-                tips=tips,
-                style=style
-            )
-            
-            # Generate route using LLM
-            response = self.llm_client.complete_json(
-                prompt=prompt,
-                system_prompt=ROUTE_PLANNER_SYSTEM,
-                temperature=0.4
-            )
-            
-            # Parse and validate response
-            route = self._parse_llm_response(response, trip_request, style)
-            return route
-            
-        except Exception as e:
-            print(f"⚠️ AI generation failed for {style}: {e}")
-            # Fallback to algorithmic generation
-            return self._generate_fallback_route(
-                trip_request, pois, mountain_pois, mountain_day, style
-            )
-    
-    def _prepare_poi_data(self, pois: List[POI], style: str) -> List[Dict]:
-        """Prepare POI data for LLM prompt."""
-        
-        # Filter and sort based on style
-        if style == "budget":
-            sorted_pois = sorted(pois, key=lambda p: (p.cost_usd, -len([t for t in p.tags if t == "must-see"])))
-        elif style == "comfort":
-            sorted_pois = sorted(pois, key=lambda p: (-(getattr(p, 'avg_rating', 4.0) or 4.0), -p.cost_usd))
-        else:
-            sorted_pois = sorted(pois, key=lambda p: (-10 if "must-see" in p.tags else 0, p.cost_usd))
-        
-        return [
-            {
-                "id": p.id,
-                "name": p.name,
-                "category": p.category[0] if p.category else "attraction",
-                "cost": p.cost_usd,
-                "hours": p.duration_hours,
-                "tags": p.tags[:3],
-                "coords": {"lat": p.coordinates.lat, "lng": p.coordinates.lng} if p.coordinates else None
-            }
-            for p in sorted_pois[:20]
-        ]
+    # --- Deterministic skeleton ---
     
-    def _build_generation_prompt(
+    def _pick_restaurant(
         self,
-        trip_request: TripRequest,
-        poi_data: List[Dict],
-        mountain_data: List[Dict],
-        mountain_day: Optional[int],
-        tips: List[str],
-        style: str
-    ) -> str:
-        """Build prompt for LLM route generation."""
-        
-        style_instructions = {
-            "budget": "Выбирай дешёвые и бесплатные места. Максимум $5-7 на активность.",
-            "balanced": "Оптимальное сочетание цены и качества. Включи must-see места.",
-            "comfort": "Премиальный опыт. Меньше мест, больше времени на каждое. Лучшие рейтинги."
-        }
-        
-        style_names = {
-            "budget": "Бюджетный маршрут",
-            "balanced": "Сбалансированный маршрут",
-            "comfort": "Комфортный маршрут"
-        }
-        
-        prompt = f"""Создай {style_names[style]} для туриста.
-
-ЗАПРОС ТУРИСТА:
-- Город: {trip_request.city}
-- Дней: {trip_request.duration_days}
-- Бюджет: ${trip_request.budget_usd}
-- Интересы: {', '.join(trip_request.interests) if trip_request.interests else 'история, культура'}
-- Темп: {trip_request.pace.value if hasattr(trip_request.pace, 'value') else trip_request.pace}
-- Ограничения: {', '.join(trip_request.constraints) if trip_request.constraints else 'нет'}
-
-СТИЛЬ: {style_instructions[style]}
-
-ДОСТУПНЫЕ МЕСТА (выбери подходящие):
-{json.dumps(poi_data, ensure_ascii=False, indent=2)}
-"""
-
-        if mountain_day and mountain_data:
-            prompt += f"""
-ГОРНЫЕ ТУРЫ (для дня {mountain_day}):
-{json.dumps(mountain_data, ensure_ascii=False, indent=2)}
-"""
-
-        if tips:
-            prompt += f"""
-СОВЕТЫ:
-{chr(10).join('- ' + t for t in tips[:5])}
-"""
-
-        prompt += """
-ФОРМАТ ОТВЕТА (JSON):
-{
-    "name": "Название маршрута",
-    "description": "Краткое описание (1-2 предложения)",
-    "total_cost": числом в USD,
-    "days": [
-        {
-            "day": 1,
-            "theme": "Тема дня",
-            "activities": [
-                {
-                    "poi_id": "id места",
-                    "poi_name": "Название",
-                    "start_time": "09:00",
-                    "end_time": "10:30",
-                    "cost": числом,
-                    "notes": "опционально"
-                }
-            ]
-        }
-    ],
-    "highlights": ["фишка 1", "фишка 2"],
-    "warnings": ["предупреждение если есть"]
-}
-"""
-        return prompt
+        catalog: CatalogSnapshot,
+        minute: int,
+        max_price: float,
+        style: str,
+        exclude: set,
+        day: Day = None,
+        minutes: int = 0,
+        near: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Restaurant open for the whole meal and within the meal budget, close
+        to the previous stop; cheapest good one for budget, best rated otherwise.
+        Places already used on the trip are picked again only if nothing else fits.
+        """
+        index = get_restaurant_index(catalog)
+        cheapest = style == "budget"
+        limit = max_price * 1.5
+        return (
+            index.best(minute, minutes, day, limit, exclude, near, cheapest)
+            or index.best(minute, minutes, day, limit, (), near, cheapest)
+            # Nothing within the meal budget: the cheapest open place still beats no meal
+            or index.best(minute, minutes, day, None, (), near, cheapest=True)
+        )
     
-    def _parse_llm_response(
-        self,
-        response: Dict,
-        request: TripRequest,
-        style: str
-    ) -> Optional[Route]:
-        """Parse LLM response into Route object."""
-        
-        try:
-            days = []
-            
-            for day_data in response.get("days", []):
-                activities = []
-                day_cost = 0
-                day_hours = 0
-                
-                for act_data in day_data.get("activities", []):
-                    cost = float(act_data.get("cost", 0))
-                    
-                    # Calculate hours from time
-                    try:
-                        start = datetime.strptime(act_data.get("start_time", "09:00"), "%H:%M")
-                        end = datetime.strptime(act_data.get("end_time", "10:00"), "%H:%M")
-                        hours = (end - start).seconds / 3600
-                    except:
-                        hours = 1.5
-                    
-                    activities.append(ActivitySlot(
-                        poi_id=act_data.get("poi_id", "unknown"),
-                        poi_name=act_data.get("poi_name", "Место"),
-                        start_time=act_data.get("start_time", "09:00"),
-                        end_time=act_data.get("end_time", "10:00"),
-                        cost_usd=cost,
-                        notes=act_data.get("notes")
-                    ))
-                    
-                    day_cost += cost
-                    day_hours += hours
-                
-                if activities:
-                    days.append(DayPlan(
-                        day=day_data.get("day", len(days) + 1),
-                        theme=day_data.get("theme", f"День {len(days) + 1}"),
-                        activities=activities,
-                        total_cost=day_cost,
-                        total_hours=day_hours,
-                        notes=day_data.get("notes")
-                    ))
-            
-            if not days:
-                return None
-            
-            style_map = {
-                "budget": BudgetStyle.BUDGET,
-                "balanced": BudgetStyle.MODERATE,
-                "comfort": BudgetStyle.COMFORT
-            }
-            
-            return Route(
-                id=f"ai_{style}_{datetime.now().strftime('%H%M%S')}",
-                name=response.get("name", f"AI Маршрут ({style})"),
-                description=response.get("description", "Сгенерировано AI"),
-                duration_days=len(days),
-                total_cost_usd=float(response.get("total_cost", sum(d.total_cost for d in days))),
-                style=style_map.get(style, BudgetStyle.MODERATE),
-                days=days,
-                highlights=response.get("highlights", []),
-                warnings=response.get("warnings", [])
-            )
-            
-        except Exception as e:
-            print(f"⚠️ Error parsing LLM response: {e}")
-            return None
+    def _meal_slot(self, rest: Dict[str, Any], label: str, start: int, minutes: int) -> ActivitySlot:
+        return ActivitySlot(
+            poi_id=rest["id"],
+            poi_name=f"{label}: {rest['name']}",
+            start_time=format_minute(start),
+            end_time=format_minute(start + minutes),
+            cost_usd=rest.get("avg_check_usd", 15),
+            notes=", ".join(rest.get("cuisine", [])[:2]) or None
+        )
     
-    def _generate_fallback_route(
+    def _default_theme(self, day_num: int, pois: List[POI]) -> str:
+        """Theme from the day's dominant category (the LLM pass may replace it)."""
+        if day_num == 1:
+            return "Исторический центр 🏛️"
+        counts: Dict[str, int] = {}
+        for poi in pois:
+            for category in poi.category:
+                if category in DAY_THEME_BY_CATEGORY:
+                    counts[category] = counts.get(category, 0) + 1
+        if not counts:
+            return f"День {day_num}"
+        return DAY_THEME_BY_CATEGORY[max(counts, key=lambda c: (counts[c], c))]
+    
+    def _build_skeleton(
         self,
         request: TripRequest,
         pois: List[POI],
@@ -370,127 +283,277 @@ class AIRoutePlanner:
         mountain_day: Optional[int],
         style: str
     ) -> Optional[Route]:
-        """Generate route algorithmically as fallback."""
+        """
+        Build a complete timed route without the LLM: sights by style priority
+        within pace hours and budget, ordered by the route optimiser around lunch,
+        plus meals and the mountain day.
+        """
+        catalog = get_catalog(Path(self.poi_retriever.data_path).parent)
+        optimizer = RouteOptimizer(get_travel_matrix(catalog))
+        travel = optimizer.travel
+        opening_hours = get_opening_hours(catalog)
         
-        days = []
-        used_pois = set()
+        def hop(from_id: Optional[str], to_id: str) -> int:
+            return transfer_slot_minutes(travel.travel_minutes(from_id, to_id)) if from_id else 0
+        
+        pace = request.pace.value if hasattr(request.pace, 'value') else str(request.pace)
+        hours_per_day = PACE_DAY_HOURS.get(pace, 7.0)
+        max_stops = STYLE_MAX_STOPS.get(style, 5)
+        daily_budget = request.budget_usd * STYLE_BUDGET_SHARE.get(style, 0.85) / request.duration_days
+        meal_budget = daily_budget * 0.25  # two meals take about half of the day's budget
+        
+        def rating(poi: POI) -> float:
+            return catalog.poi_index.get(poi.id, {}).get("avg_rating", 4.0) or 4.0
         
-        # Parameters based on style
+        # Sights only: no venues, excursions or multi-hour trips in a city day
+        sights = [
+            p for p in pois
+            if p.id not in catalog.restaurant_index and p.id not in catalog.hotel_index
+            and "day_trip" not in p.tags and "day_trip" not in p.category
+            and 0 < p.duration_hours < 5
+        ]
         if style == "budget":
-            daily_budget = (request.budget_usd / request.duration_days) * 0.5
-            prefer_free = True
+            sort_key = lambda p: ("must-see" not in p.tags, p.cost_usd, -rating(p))
         elif style == "comfort":
-            daily_budget = (request.budget_usd / request.duration_days) * 1.2
-            prefer_free = False
+            sort_key = lambda p: (-rating(p), "must-see" not in p.tags, -p.cost_usd)
         else:
-            daily_budget = (request.budget_usd / request.duration_days) * 0.8
-            prefer_free = False
-        
-        hours_per_day = 7
-        
-        # Sort POIs
-        sorted_pois = sorted(
-            pois,
-            key=lambda p: (
-                -10 if "must-see" in p.tags else 0,
-                -p.cost_usd if prefer_free else p.cost_usd * 0.1,
-                -(getattr(p, 'avg_rating', 4.0) or 4.0)
-            )
-        )
+            sort_key = lambda p: ("must-see" not in p.tags, p.cost_usd * 0.1, -rating(p))
+        sorted_pois = sorted(sights, key=sort_key)
+        # Shows and sunset spots go after dinner instead of into the daytime tour
+        evening_pois = [p for p in sorted_pois if p.best_time in EVENING_BEST_TIMES]
+        sorted_pois = [p for p in sorted_pois if p.best_time not in EVENING_BEST_TIMES]
+        must_see_ids = {p.id for p in sights if "must-see" in p.tags}
+        
+        days = []
+        used_pois = set()
+        used_restaurants = set()
         
         for day_num in range(1, request.duration_days + 1):
-            activities = []
+            activities: List[ActivitySlot] = []
             day_cost = 0.0
-            day_hours = 0.0
-            current_time = datetime.strptime("09:00", "%H:%M")
+            day = request.start_date + timedelta(days=day_num - 1) if request.start_date else None
             
             # Mountain day
             if day_num == mountain_day and mountain_pois:
                 mountain = mountain_pois[0] if style == "budget" else mountain_pois[-1] if len(mountain_pois) > 1 else mountain_pois[0]
+                end = 7 * 60 + int(min(mountain.duration_hours, 10) * 60)
                 activities.append(ActivitySlot(
                     poi_id=mountain.id,
                     poi_name=mountain.name,
                     start_time="07:00",
-                    end_time="17:00",
+                    end_time=format_minute(end),
                     cost_usd=mountain.cost_usd,
                     notes="Полный день в горах"
                 ))
+                day_cost += mountain.cost_usd
+                dinner = self._pick_restaurant(catalog, 19 * 60, meal_budget, style, used_restaurants, day, 90,
+                                               near=mountain.id)
+                if dinner and day_cost + dinner.get("avg_check_usd", 15) <= daily_budget:
+                    activities.append(self._meal_slot(dinner, "Ужин", max(end + 30, 19 * 60), 90))
+                    used_restaurants.add(dinner["id"])
+                    day_cost += dinner.get("avg_check_usd", 15)
                 days.append(DayPlan(
                     day=day_num,
                     theme="Горы и природа 🏔️",
                     activities=activities,
-                    total_cost=mountain.cost_usd,
-                    total_hours=10,
+                    total_cost=day_cost,
+                    total_hours=(end - 7 * 60) / 60,
                     notes="Выезд рано утром"
                 ))
                 continue
             
-            # City day
+            # City day: pick sights by priority within hours and the sightseeing budget
+            sight_budget = max(0.0, daily_budget - 2 * meal_budget)
+            selected: List[POI] = []
+            hours = spent = 0.0
             for poi in sorted_pois:
                 if poi.id in used_pois:
                     continue
-                if "day_trip" in poi.tags or poi.duration_hours >= 5:
+                if hours + poi.duration_hours > hours_per_day:
                     continue
-                if day_hours + poi.duration_hours > hours_per_day:
+                if spent + poi.cost_usd > sight_budget:
                     continue
-                if style == "budget" and day_cost + poi.cost_usd > daily_budget:
-                    continue
-                
-                end_time = current_time + timedelta(hours=poi.duration_hours)
+                selected.append(poi)
+                hours += poi.duration_hours
+                spent += poi.cost_usd
+                if len(selected) >= max_stops:
+                    break
+            
+            # Order by travel time and opening hours, then time it around lunch
+            by_id = {poi.id: poi for poi in selected}
+            ordered = optimizer.order([Stop.from_record(poi.model_dump()) for poi in selected])
+            t, prev, lunch_done = 9 * 60, None, False
+            visit_minutes = 0
+            
+            for stop in ordered:
+                begin = max(t + hop(prev, stop.id), stop.opens)
+                if not lunch_done and (begin >= 12 * 60 or begin + stop.duration_minutes > 13 * 60 + 30):
+                    lunch_done = True
+                    lunch = self._pick_restaurant(catalog, max(t, 12 * 60), meal_budget, style, used_restaurants, day, 75,
+                                               near=prev)
+                    if lunch:
+                        lunch_start = max(t + hop(prev, lunch["id"]), 12 * 60)
+                        activities.append(self._meal_slot(lunch, "Обед", lunch_start, 75))
+                        used_restaurants.add(lunch["id"])
+                        day_cost += lunch.get("avg_check_usd", 15)
+                        t, prev = lunch_start + 75, lunch["id"]
+                        begin = max(t + hop(prev, stop.id), stop.opens)
                 
+                end = begin + stop.duration_minutes
+                if end > DAY_SIGHTS_END or not opening_hours.open_between(stop.id, day, begin, end):
+                    continue
+                poi = by_id[stop.id]
                 activities.append(ActivitySlot(
                     poi_id=poi.id,
                     poi_name=poi.name,
-                    start_time=current_time.strftime("%H:%M"),
-                    end_time=end_time.strftime("%H:%M"),
+                    start_time=format_minute(begin),
+                    end_time=format_minute(end),
                     cost_usd=poi.cost_usd,
                     notes=poi.tips[0] if poi.tips else None
                 ))
-                
                 used_pois.add(poi.id)
                 day_cost += poi.cost_usd
-                day_hours += poi.duration_hours
-                current_time = end_time + timedelta(minutes=30)
-                
-                if len(activities) >= 6:
+                visit_minutes += stop.duration_minutes
+                t, prev = end, poi.id
+            
+            if not lunch_done:
+                lunch = self._pick_restaurant(catalog, max(t, 12 * 60), meal_budget, style, used_restaurants, day, 75,
+                                               near=prev)
+                if lunch:
+                    lunch_start = max(t + hop(prev, lunch["id"]), 12 * 60)
+                    activities.append(self._meal_slot(lunch, "Обед", lunch_start, 75))
+                    used_restaurants.add(lunch["id"])
+                    day_cost += lunch.get("avg_check_usd", 15)
+                    t, prev = lunch_start + 75, lunch["id"]
+            
+            dinner = self._pick_restaurant(catalog, 19 * 60, meal_budget, style, used_restaurants, day, 90,
+                                           near=prev)
+            if dinner and day_cost + dinner.get("avg_check_usd", 15) <= daily_budget:
+                dinner_start = max(t + hop(prev, dinner["id"]), 19 * 60)
+                activities.append(self._meal_slot(dinner, "Ужин", dinner_start, 90))
+                used_restaurants.add(dinner["id"])
+                day_cost += dinner.get("avg_check_usd", 15)
+                t, prev = dinner_start + 90, dinner["id"]
+            
+            for poi in evening_pois:
+                if poi.id in used_pois or day_cost + poi.cost_usd > daily_budget:
+                    continue
+                begin = max(t + hop(prev, poi.id), 19 * 60)
+                end = begin + int(round(poi.duration_hours * 60))
+                if end > EVENING_END:
                     break
+                if not opening_hours.open_between(poi.id, day, begin, end):
+                    continue
+                activities.append(ActivitySlot(
+                    poi_id=poi.id,
+                    poi_name=poi.name,
+                    start_time=format_minute(begin),
+                    end_time=format_minute(end),
+                    cost_usd=poi.cost_usd,
+                    notes=poi.tips[0] if poi.tips else None
+                ))
+                by_id[poi.id] = poi
+                used_pois.add(poi.id)
+                day_cost += poi.cost_usd
+                visit_minutes += end - begin
+                break
             
             if activities:
-                theme = "Исторический центр 🏛️" if day_num == 1 else f"День {day_num}"
                 days.append(DayPlan(
                     day=day_num,
-                    theme=theme,
+                    theme=self._default_theme(day_num, [by_id[a.poi_id] for a in activities if a.poi_id in by_id]),
                     activities=activities,
                     total_cost=day_cost,
-                    total_hours=day_hours
+                    total_hours=visit_minutes / 60
                 ))
         
         if not days:
             return None
         
-        style_names = {
-            "budget": "Бюджетный маршрут",
-            "balanced": "Сбалансированный маршрут",
-            "comfort": "Комфортный маршрут"
-        }
+        total_cost = sum(d.total_cost for d in days)
+        warnings = []
+        if total_cost > request.budget_usd:
+            warnings.append(f"⚠️ Estimated cost ${total_cost:.0f} exceeds budget ${request.budget_usd:.0f}")
         
-        style_map = {
-            "budget": BudgetStyle.BUDGET,
-            "balanced": BudgetStyle.MODERATE,
-            "comfort": BudgetStyle.COMFORT
-        }
+        must_see = [a.poi_name for d in days for a in d.activities if a.poi_id in must_see_ids]
         
         return Route(
-            id=f"fallback_{style}",
-            name=style_names.get(style, "Маршрут"),
-            description="Сгенерировано алгоритмически",
+            id=f"route_{style}",
+            name=STYLE_NAMES.get(style, "Маршрут"),
+            description="Маршрут оптимизирован по расстояниям и часам работы",
             duration_days=len(days),
-            total_cost_usd=sum(d.total_cost for d in days),
-            style=style_map.get(style, BudgetStyle.MODERATE),
+            total_cost_usd=total_cost,
+            style=STYLE_TO_BUDGET.get(style, BudgetStyle.MODERATE),
             days=days,
-            highlights=["Оптимизированный маршрут"],
-            warnings=[]
+            highlights=must_see[:3] or ["Оптимизированный маршрут"],
+            warnings=warnings
         )
+    
+    # --- Optional LLM pass ---
+    
+    def _build_notes_prompt(self, route: Route, request: TripRequest, tips: List[str], style: str) -> str:
+        """Compact description of a fixed route for the LLM to annotate."""
+        lines = []
+        for day in route.days:
+            stops = "; ".join(f"{a.start_time} {a.poi_id} ({a.poi_name})" for a in day.activities)
+            lines.append(f"День {day.day}: {stops}")
+        
+        prompt = f"""Маршрут ({STYLE_NAMES.get(style, style)}) по Самарканду уже составлен — места и время НЕ меняй.
+Интересы туриста: {', '.join(request.interests) if request.interests else 'история, культура'}.
+
+{chr(10).join(lines)}
+"""
+        if tips:
+            prompt += f"""
+СОВЕТЫ:
+{chr(10).join('- ' + t for t in tips[:3])}
+"""
+        prompt += """
+Ответь JSON:
+{"name": "название маршрута", "description": "1-2 предложения", "highlights": ["фишка 1", "фишка 2"],
+ "days": [{"day": 1, "theme": "тема дня с эмодзи", "notes": "совет на день"}],
+ "notes": {"<poi_id>": "короткий совет к месту"}}
+"""
+        return prompt
+    
+    def _annotate_route(self, route: Route, request: TripRequest, tips: List[str], style: str) -> Route:
+        """Let the LLM write the name, themes and notes; the skeleton is kept on any failure."""
+        try:
+            response = self.llm_client.complete_json(
+                prompt=self._build_notes_prompt(route, request, tips, style),
+                system_prompt=ROUTE_PLANNER_SYSTEM,
+                temperature=0.4
+            )
+            return self._apply_notes(route, response)
+        except Exception as e:
+            print(f"⚠️ Route notes failed for {style}, keeping the skeleton: {e}")
+            return route
+    
+    def _apply_notes(self, route: Route, response: Dict) -> Route:
+        """Copy text fields from the LLM response onto the route; structure is never changed."""
+        if not isinstance(response, dict):
+            return route
+        
+        def text(value, limit: int = 300) -> Optional[str]:
+            return value.strip()[:limit] if isinstance(value, str) and value.strip() else None
+        
+        route = route.model_copy(deep=True)
+        route.name = text(response.get("name"), 80) or route.name
+        route.description = text(response.get("description")) or route.description
+        highlights = [text(h, 120) for h in response.get("highlights") or [] if text(h, 120)]
+        if highlights:
+            route.highlights = highlights[:5]
+        
+        day_notes = {d.get("day"): d for d in response.get("days") or [] if isinstance(d, dict)}
+        poi_notes = response.get("notes") if isinstance(response.get("notes"), dict) else {}
+        for day in route.days:
+            notes = day_notes.get(day.day, {})
+            day.theme = text(notes.get("theme"), 80) or day.theme
+            day.notes = text(notes.get("notes")) or day.notes
+            for activity in day.activities:
+                activity.notes = text(poi_notes.get(activity.poi_id), 200) or activity.notes
+        
+        return route
 
 
 # Backward compatibility alias
@@ -528,6 +591,79 @@ if __name__ == "__main__":
 
 # ==================== DETERMINISTIC TRIP PLANNER (Step 4) ====================
 
+class InterestScores:
+    """
+    Interest x POI relevance matrix for DeterministicTripPlanner, built once
+    per catalog snapshot. Scoring a request is a sum of interest rows plus the
+    static part (must-see, UNESCO, rating); ranked results are memoised per
+    normalised interest set.
+    """
+    
+    TAG_WEIGHT = 2.0
+    CATEGORY_WEIGHT = 1.5
+    DESCRIPTION_WEIGHT = 0.5
+    MAX_CACHED_RANKINGS = 256
+    
+    def __init__(self, catalog: CatalogSnapshot):
+        self.ids = [poi.get("id") for poi in catalog.pois]
+        self._tags = [set(poi.get("tags", [])) for poi in catalog.pois]
+        self._categories = [set(poi.get("category", [])) for poi in catalog.pois]
+        self._descriptions = [poi.get("description", "").lower() for poi in catalog.pois]
+        
+        self.static = np.array([
+            3.0 * ("must-see" in tags) + 2.0 * ("unesco" in tags)
+            for tags in self._tags
+        ], dtype=np.float64)
+        self.rating = np.array([
+            (poi.get("avg_rating", 4.0) - 4.0) * 0.5 for poi in catalog.pois
+        ], dtype=np.float64)
+        
+        # Rows for every tag and category are precomputed; other interests
+        # (matched only by description) get a row on first use
+        vocabulary = set().union(*self._tags, *self._categories) if self.ids else set()
+        self.rows: Dict[str, np.ndarray] = {interest: self._row(interest) for interest in vocabulary}
+        self._rankings: "OrderedDict[Tuple[str, ...], List[Tuple[str, float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def _row(self, interest: str) -> np.ndarray:
+        return np.array([
+            self.TAG_WEIGHT * (interest in tags)
+            + self.CATEGORY_WEIGHT * (interest in categories)
+            + self.DESCRIPTION_WEIGHT * (interest in description)
+            for tags, categories, description in zip(self._tags, self._categories, self._descriptions)
+        ], dtype=np.float64)
+    
+    def row(self, interest: str) -> np.ndarray:
+        row = self.rows.get(interest)
+        if row is None:
+            row = self._row(interest)
+            with self._lock:
+                self.rows.setdefault(interest, row)
+        return row
+    
+    def rank(self, interests: List[str]) -> List[Tuple[str, float]]:
+        """(poi_id, score) pairs, best first (catalog order breaks ties)."""
+        key = tuple(sorted({i.lower() for i in interests}))
+        with self._lock:
+            ranking = self._rankings.get(key)
+            if ranking is not None:
+                self._rankings.move_to_end(key)
+                return list(ranking)
+        
+        scores = self.static.copy()
+        for interest in key:
+            scores += self.row(interest)
+        scores += self.rating
+        order = np.argsort(-scores, kind="stable")
+        ranking = [(self.ids[i], float(scores[i])) for i in order]
+        
+        with self._lock:
+            self._rankings[key] = ranking
+            if len(self._rankings) > self.MAX_CACHED_RANKINGS:
+                self._rankings.popitem(last=False)
+        return list(ranking)
+
+
 class DeterministicTripPlanner:
     """
     No-LLM Trip Planner using pure data-driven scheduling.
@@ -540,6 +676,22 @@ class DeterministicTripPlanner:
         "fast": (5, 6)
     }
     
+    # Sightseeing hours per city day (visits only, without meals and transfers)
+    PACE_HOURS = {
+        "slow": 4.0,
+        "medium": 5.5,
+        "fast": 7.0
+    }
+    
+    # Share of the trip budget available for entry fees and excursions (the rest is meals)
+    POI_BUDGET_SHARE = 0.4
+    
+    # Excursions this long start at 07:00 and include lunch on the way
+    FULL_DAY_TRIP_HOURS = 6
+    AFTERNOON_END = "19:00"
+    DINNER_START = "19:30"
+    DINNER_END = "21:00"
+    
     DAY_THEMES = {
         1: "Сердце Самарканда",
         2: "Древние тайны",
@@ -552,28 +704,72 @@ class DeterministicTripPlanner:
         if data_dir is None:
             data_dir = Path(__file__).parent.parent.parent / "database"
         self.data_dir = data_dir
-        self.poi_data: List[Dict[str, Any]] = []
-        self.restaurants: List[Dict[str, Any]] = []
-        self.poi_index: Dict[str, Dict[str, Any]] = {}
-        self.restaurant_index: Dict[str, Dict[str, Any]] = {}
-        self._load_data()
-    
-    def _load_data(self):
-        """Load POI and restaurant data."""
-        poi_path = self.data_dir / "poi.json"
-        hr_path = self.data_dir / "hotels_restaurants.json"
-        
-        if poi_path.exists():
-            with open(poi_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                self.poi_data = data.get("poi", [])
-                self.poi_index = {p["id"]: p for p in self.poi_data}
-        
-        if hr_path.exists():
-            with open(hr_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                self.restaurants = data.get("restaurants", [])
-                self.restaurant_index = {r["id"]: r for r in self.restaurants}
+        get_catalog(self.data_dir)  # warm the shared snapshot
+    
+    # Catalog data is read from the shared snapshot so edits to the JSON
+    # files are picked up without re-reading them per request.
+    
+    @property
+    def catalog(self) -> CatalogSnapshot:
+        return get_catalog(self.data_dir)
+    
+    @property
+    def poi_data(self) -> Tuple[Dict[str, Any], ...]:
+        return self.catalog.pois
+    
+    @property
+    def restaurants(self) -> Tuple[Dict[str, Any], ...]:
+        return self.catalog.restaurants
+    
+    @property
+    def poi_index(self) -> Dict[str, Dict[str, Any]]:
+        return self.catalog.poi_index
+    
+    @property
+    def restaurant_index(self) -> Dict[str, Dict[str, Any]]:
+        return self.catalog.restaurant_index
+    
+    @property
+    def travel(self) -> TravelMatrix:
+        return get_travel_matrix(self.catalog)
+    
+    @property
+    def optimizer(self) -> RouteOptimizer:
+        return RouteOptimizer(self.travel)
+    
+    @property
+    def opening_hours(self) -> OpeningHoursIndex:
+        return get_opening_hours(self.catalog)
+    
+    @property
+    def restaurant_slots(self) -> RestaurantIndex:
+        return get_restaurant_index(self.catalog)
+    
+    def _minute(self, moment: datetime) -> int:
+        return moment.hour * 60 + moment.minute
+    
+    def _visit_start(self, poi_id: str, day: Day, arrival: datetime, duration: float) -> Optional[datetime]:
+        """
+        When a visit arriving at `arrival` can start: on arrival, or once the place
+        opens that day. None if the visit cannot be done within opening hours.
+        """
+        if poi_id not in self.opening_hours:
+            return arrival
+        window = self.opening_hours.window(poi_id, day)
+        if window is None:
+            return None  # closed on this weekday
+        start = arrival + timedelta(minutes=max(0, window[0] - self._minute(arrival)))
+        end = start + timedelta(hours=duration)
+        end_minute = self._minute(end) + (end.date() - start.date()).days * 24 * 60
+        if not self.opening_hours.open_between(poi_id, day, self._minute(start), end_minute):
+            return None
+        return start
+    
+    def _transfer(self, from_id: Optional[str], to_id: Optional[str]) -> timedelta:
+        """Travel time between two stops, rounded up to the 5-minute schedule grid."""
+        if not from_id or not to_id:
+            return timedelta(0)
+        return timedelta(minutes=transfer_slot_minutes(self.travel.travel_minutes(from_id, to_id)))
     
     def create_plan(
         self,
@@ -590,9 +786,8 @@ class DeterministicTripPlanner:
         poi_count = 0
         meal_count = 0
         
-        min_poi, max_poi = self.PACE_CONFIG.get(pace, (3, 4))
         scored_pois = self._score_pois(interests)
-        used_poi_ids = set()
+        allocation = self._allocate_pois(scored_pois, days, pace, budget)
         
         if start_date:
             try:
@@ -607,24 +802,46 @@ class DeterministicTripPlanner:
             blocks: List[Dict[str, Any]] = []
             day_cost = 0.0
             
-            day_pois = self._select_pois_for_day(scored_pois, used_poi_ids, min_poi, max_poi, day_num)
-            for pid in day_pois:
-                used_poi_ids.add(pid)
+            day_pois = allocation[day_num - 1]
+            excursion = next((p for p in day_pois if self._is_day_trip(self.poi_index[p])), None)
+            evening_pois = [p for p in day_pois if self._is_evening(self.poi_index[p])]
             
             current_time = datetime.strptime("09:00", "%H:%M")
+            previous_id = None
             
-            # Morning POIs
-            morning_pois = [p for p in day_pois if self.poi_index.get(p, {}).get("best_time") == "morning"]
-            other_pois = [p for p in day_pois if p not in morning_pois]
+            # Order the day's stops by travel time and opening hours (morning spots first),
+            # then split them around lunch
+            ordered = [s.id for s in self.optimizer.order(
+                [Stop.from_record(self.poi_index[p]) for p in day_pois
+                 if p != excursion and p not in evening_pois]
+            )]
+            if excursion:
+                # The excursion takes the morning (or the whole day)
+                morning_pois, other_pois = [excursion], ordered
+                if self.poi_index[excursion].get("duration_hours", 4) >= self.FULL_DAY_TRIP_HOURS:
+                    current_time = datetime.strptime("07:00", "%H:%M")
+                else:
+                    current_time = datetime.strptime("08:00", "%H:%M")
+            else:
+                morning_pois = ordered[:1]
+                if len(ordered) > 2:
+                    second = self.poi_index[ordered[1]]
+                    first_hours = self.poi_index[ordered[0]].get("duration_hours", 1.5)
+                    if first_hours + second.get("duration_hours", 1.5) <= 4:  # both done by ~13:00
+                        morning_pois = ordered[:2]
+                other_pois = ordered[len(morning_pois):]
             
-            if not morning_pois and other_pois:
-                morning_pois = [other_pois.pop(0)]
-            
-            for poi_id in morning_pois[:2]:
+            deferred = []
+            for poi_id in morning_pois:
                 poi = self.poi_index.get(poi_id, {})
                 duration = poi.get("duration_hours", 1.5)
                 cost = poi.get("cost_usd", 0)
                 
+                start = self._visit_start(poi_id, day_date, current_time + self._transfer(previous_id, poi_id), duration)
+                if start is None:
+                    deferred.append(poi_id)  # closed this morning; the afternoon may fit it
+                    continue
+                current_time = start
                 start_time = current_time.strftime("%H:%M")
                 end_time = (current_time + timedelta(hours=duration)).strftime("%H:%M")
                 
@@ -636,13 +853,22 @@ class DeterministicTripPlanner:
                 })
                 day_cost += cost
                 poi_count += 1
-                current_time = current_time + timedelta(hours=duration, minutes=15)
+                current_time = current_time + timedelta(hours=duration)
+                previous_id = poi_id
             
-            # Lunch - schedule after morning POIs, but not before 12:00
+            # Lunch - schedule after morning POIs (plus the walk/ride there), but not before 12:00.
+            # Full-day excursions include lunch on the way.
             lunch_start = max(current_time, datetime.strptime("12:00", "%H:%M"))
+            lunch_rest = None
+            if lunch_start <= datetime.strptime("15:00", "%H:%M"):
+                lunch_rest = self._select_restaurant(lunch_start.strftime("%H:%M"), budget / days / 3,
+                                                     day=day_date, minutes=90, near=previous_id)
+            if lunch_rest:
+                lunch_start = max(current_time + self._transfer(previous_id, lunch_rest["id"]),
+                                  datetime.strptime("12:00", "%H:%M"))
+                previous_id = lunch_rest["id"]
             lunch_end = lunch_start + timedelta(hours=1, minutes=30)
             
-            lunch_rest = self._select_restaurant(lunch_start.strftime("%H:%M"), budget / days / 3)
             if lunch_rest:
                 blocks.append({
                     "start": lunch_start.strftime("%H:%M"), 
@@ -656,15 +882,20 @@ class DeterministicTripPlanner:
                 day_cost += lunch_rest.get("avg_check_usd", 15)
                 meal_count += 1
             
-            current_time = lunch_end + timedelta(minutes=15)
+            current_time = lunch_end if lunch_rest else current_time
 
             
-            # Afternoon POIs
-            for poi_id in other_pois[:2]:
+            # Afternoon POIs, until the dinner break
+            afternoon_end = datetime.strptime(self.AFTERNOON_END, "%H:%M")
+            for poi_id in other_pois + deferred:
                 poi = self.poi_index.get(poi_id, {})
                 duration = poi.get("duration_hours", 1.5)
                 cost = poi.get("cost_usd", 0)
                 
+                start = self._visit_start(poi_id, day_date, current_time + self._transfer(previous_id, poi_id), duration)
+                if start is None or start + timedelta(hours=duration) > afternoon_end:
+                    continue
+                current_time = start
                 start_time = current_time.strftime("%H:%M")
                 end_time = (current_time + timedelta(hours=duration)).strftime("%H:%M")
                 
@@ -676,15 +907,18 @@ class DeterministicTripPlanner:
                 })
                 day_cost += cost
                 poi_count += 1
-                current_time = current_time + timedelta(hours=duration, minutes=20)
+                current_time = current_time + timedelta(hours=duration)
+                previous_id = poi_id
             
             # Optional dinner
+            evening_time = max(current_time, datetime.strptime(self.DINNER_START, "%H:%M"))
             if budget > day_cost + 20:
-                dinner_rest = self._select_restaurant("19:00", budget / days / 3, 
-                                                       exclude=lunch_rest["id"] if lunch_rest else None)
+                dinner_rest = self._select_restaurant(self.DINNER_START, budget / days / 3, 
+                                                       exclude=lunch_rest["id"] if lunch_rest else None,
+                                                       day=day_date, minutes=90, near=previous_id)
                 if dinner_rest:
                     blocks.append({
-                        "start": "19:30", "end": "21:00", "type": "meal",
+                        "start": self.DINNER_START, "end": self.DINNER_END, "type": "meal",
                         "poi_id": None, "venue_id": dinner_rest["id"],
                         "name": f"Ужин: {dinner_rest['name']}",
                         "reason": dinner_rest.get("description", "")[:50],
@@ -692,13 +926,40 @@ class DeterministicTripPlanner:
                     })
                     day_cost += dinner_rest.get("avg_check_usd", 20)
                     meal_count += 1
+                    evening_time = datetime.strptime(self.DINNER_END, "%H:%M")
+                    previous_id = dinner_rest["id"]
+            
+            # Shows and sunset spots after dinner
+            evening_end = datetime.strptime(format_minute(EVENING_END), "%H:%M")
+            for poi_id in evening_pois:
+                poi = self.poi_index[poi_id]
+                duration = poi.get("duration_hours", 1.5)
+                cost = poi.get("cost_usd", 0)
+                
+                start = self._visit_start(poi_id, day_date, evening_time + self._transfer(previous_id, poi_id), duration)
+                if start is None or start + timedelta(hours=duration) > evening_end:
+                    continue
+                blocks.append({
+                    "start": start.strftime("%H:%M"),
+                    "end": (start + timedelta(hours=duration)).strftime("%H:%M"),
+                    "type": "poi",
+                    "poi_id": poi_id, "venue_id": None,
+                    "name": poi.get("name_en") or poi.get("name", poi_id),
+                    "reason": self._get_reason(poi), "cost_usd": cost
+                })
+                day_cost += cost
+                poi_count += 1
+                evening_time, previous_id = start + timedelta(hours=duration), poi_id
             
             blocks.sort(key=lambda b: b["start"])
             
             plan_days.append({
                 "day_number": day_num,
                 "date": day_date.strftime("%Y-%m-%d"),
-                "theme": f"День {day_num}: {self.DAY_THEMES.get(day_num, 'Исследование')}",
+                "theme": f"День {day_num}: " + (
+                    f"Поездка — {self.poi_index[excursion].get('name_en') or self.poi_index[excursion]['name']}"
+                    if excursion else self.DAY_THEMES.get(day_num, 'Исследование')
+                ),
                 "blocks": blocks
             })
             total_cost += day_cost
@@ -718,37 +979,116 @@ class DeterministicTripPlanner:
     
     def _score_pois(self, interests: List[str]) -> List[Tuple[str, float]]:
         """Score POIs by relevance to interests."""
-        scored = []
-        for poi in self.poi_data:
-            score = 0.0
-            tags = poi.get("tags", [])
-            categories = poi.get("category", [])
+        return self.catalog.derive("planner_interest_scores", InterestScores).rank(interests)
+    
+    def _is_day_trip(self, poi: Dict[str, Any]) -> bool:
+        return "day_trip" in poi.get("category", [])
+    
+    def _is_evening(self, poi: Dict[str, Any]) -> bool:
+        return poi.get("best_time") in EVENING_BEST_TIMES
+    
+    def _allocate_pois(
+        self,
+        scored: List[Tuple[str, float]],
+        days: int,
+        pace: str,
+        budget: float
+    ) -> List[List[str]]:
+        """
+        Assign POIs to all days in one pass:
+        1. Pick POIs by score within the trip's visit hours, per-day counts and entry budget.
+           Day trips get a day of their own (never day 1, at most one per three days);
+           overnight trips don't fit a city plan and are skipped. Evening POIs (shows,
+           sunset spots) open after dinner are kept apart, at most one per day.
+        2. Order the city POIs as one tour and cut it into contiguous, hour-balanced days,
+           so each day stays in one part of town.
+        3. The best-scoring day becomes day 1; day trips are spread over the later days
+           and evening POIs go to the days in score order.
+        """
+        _, max_c = self.PACE_CONFIG.get(pace, (3, 4))
+        day_hours = self.PACE_HOURS.get(pace, 5.5)
+        poi_budget = budget * self.POI_BUDGET_SHARE
+        max_trips = max(1, days // 3) if days >= 2 else 0
+        score_of = dict(scored)
+        
+        trips: List[str] = []
+        evening: List[str] = []
+        city: List[str] = []
+        city_hours = 0.0
+        spent = 0.0
+        
+        for poi_id, _ in scored:
+            poi = self.poi_index.get(poi_id)
+            if poi is None or "overnight" in poi.get("category", []):
+                continue
+            cost = poi.get("cost_usd", 0)
+            if spent + cost > poi_budget:
+                continue
+            hours = poi.get("duration_hours", 1.5)
             
-            for interest in interests:
-                il = interest.lower()
-                if il in tags: score += 2.0
-                if il in categories: score += 1.5
-                if il in poi.get("description", "").lower(): score += 0.5
+            if self._is_evening(poi):
+                after_dinner = self._minute(datetime.strptime(self.DINNER_END, "%H:%M"))
+                if len(evening) < days and self.opening_hours.open_between(
+                        poi_id, None, after_dinner, after_dinner + int(hours * 60)):
+                    evening.append(poi_id)
+                    spent += cost
+                continue
             
-            if "must-see" in tags: score += 3.0
-            if "unesco" in tags: score += 2.0
-            score += (poi.get("avg_rating", 4.0) - 4.0) * 0.5
+            if self._is_day_trip(poi):
+                city_days = days - len(trips) - 1
+                # Taking a day for the trip must not strand already chosen city POIs
+                if len(trips) < max_trips and city_days >= 1 and \
+                        len(city) <= city_days * max_c and city_hours <= city_days * day_hours:
+                    trips.append(poi_id)
+                    spent += cost
+                continue
             
-            scored.append((poi.get("id"), score))
+            city_days = days - len(trips)
+            if len(city) + 1 > city_days * max_c or city_hours + hours > city_days * day_hours:
+                continue
+            city.append(poi_id)
+            city_hours += hours
+            spent += cost
+        
+        city_days = days - len(trips)
+        chunks = self._split_city_days(city, city_days, max_c)
+        chunks.sort(key=lambda chunk: -sum(score_of[p] for p in chunk))
         
-        scored.sort(key=lambda x: x[1], reverse=True)
-        return scored
+        # Day trips go on days 2, 5, 8, ... (0-based 1, 4, 7, ...) as far as possible
+        allocation: List[List[str]] = []
+        trip_days = {min(1 + 3 * i, days - 1): trip for i, trip in enumerate(trips)}
+        for day_index in range(days):
+            if day_index in trip_days:
+                allocation.append([trip_days[day_index]])
+            else:
+                allocation.append(chunks.pop(0) if chunks else [])
+        for day_pois, poi_id in zip(allocation, evening):
+            day_pois.append(poi_id)
+        return allocation
     
-    def _select_pois_for_day(self, scored, used, min_c, max_c, day_num) -> List[str]:
-        selected = []
-        for poi_id, _ in scored:
-            if poi_id in used: continue
-            if len(selected) >= max_c: break
-            poi = self.poi_index.get(poi_id, {})
-            if day_num == 1 and "day_trip" in poi.get("category", []): continue
-            if "overnight" in poi.get("category", []): continue
-            selected.append(poi_id)
-        return selected
+    def _split_city_days(self, city: List[str], city_days: int, max_c: int) -> List[List[str]]:
+        """Cut a travel-time tour over the city POIs into city_days hour-balanced days."""
+        if city_days <= 0:
+            return []
+        stops = [Stop.from_record(self.poi_index[p]) for p in city]
+        tour = [s.id for s in self.optimizer.order(stops, windows=False)]
+        
+        loads = [self.poi_index[p].get("duration_hours", 1.5) + 0.25 for p in tour]  # visit + hop
+        target = sum(loads) / city_days if tour else 1.0
+        chunks: List[List[str]] = [[] for _ in range(city_days)]
+        done = 0.0
+        for poi_id, load in zip(tour, loads):
+            chunks[min(city_days - 1, int((done + load / 2) // target))].append(poi_id)
+            done += load
+        
+        # Respect the per-day count by shifting boundaries (keeps days contiguous on the tour)
+        for i in range(city_days - 1):
+            while len(chunks[i]) > max_c:
+                chunks[i + 1].insert(0, chunks[i].pop())
+        for i in range(city_days - 1, 0, -1):
+            while len(chunks[i]) > max_c:
+                chunks[i - 1].append(chunks[i].pop(0))
+        return chunks
     
     def _get_reason(self, poi: Dict[str, Any]) -> str:
         best_time = poi.get("best_time", "any")
@@ -759,29 +1099,28 @@ class DeterministicTripPlanner:
         if "unesco" in tags: return "Объект ЮНЕСКО"
         return poi.get("description", "")[:40] + "..."
     
-    def _select_restaurant(self, time: str, max_price: float, exclude=None) -> Optional[Dict]:
-        try:
-            time_dt = datetime.strptime(time, "%H:%M")
-        except:
+    def _select_restaurant(
+        self,
+        time: str,
+        max_price: float,
+        exclude=None,
+        day: Day = None,
+        minutes: int = 0,
+        near: Optional[str] = None
+    ) -> Optional[Dict]:
+        """
+        Best-rated restaurant within budget that is open from `time` for `minutes`;
+        with `near` (the previous stop), travel time from it counts against rating.
+        """
+        minute = parse_hhmm(time)
+        if minute is None:
             return None
-        
-        candidates = []
-        for rest in self.restaurants:
-            if rest["id"] == exclude: continue
-            opens = rest.get("opens_at", "00:00")
-            closes = rest.get("closing_hours", "23:59")
-            try:
-                opens_dt = datetime.strptime(opens, "%H:%M")
-                closes_dt = datetime.strptime(closes, "%H:%M")
-                if closes_dt <= opens_dt: closes_dt = datetime.strptime("23:59", "%H:%M")
-                if not (opens_dt <= time_dt <= closes_dt): continue
-            except: pass
-            
-            if rest.get("avg_check_usd", 15) <= max_price * 1.5:
-                candidates.append((rest, rest.get("rating", 4.0)))
-        
-        candidates.sort(key=lambda x: x[1], reverse=True)
-        return candidates[0][0] if candidates else None
+        return self.restaurant_slots.best(
+            minute, minutes, day,
+            max_price=max_price * 1.5,
+            exclude={exclude} if exclude else (),
+            near=near
+        )
     
     def _validate_plan(self, plan_days: List[Dict]) -> List[str]:
         """Quality Gates - Step 5."""
@@ -0,0 +1,306 @@
+"""
+Route Optimizer - Orders and times a day's stops by travel time.
+Nearest-neighbour construction followed by 2-opt and Or-opt improvement,
+with opening-hours time windows as soft constraints. Runs in milliseconds
+for typical day sizes and needs no LLM.
+"""
+
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.rag.travel import TravelMatrix, transfer_slot_minutes
+from src.rag.opening_hours import time_window
+
+
+DAY_START_MINUTE = 9 * 60
+DAY_END_MINUTE = 21 * 60
+
+# Lunch break as the planners take it: from 12:00, before a visit that would
+# start after noon or run past 13:30
+LUNCH_EARLIEST = 12 * 60
+LUNCH_LATEST_END = 13 * 60 + 30
+LUNCH_MINUTES = 75
+
+# Each minute spent outside a stop's opening window costs this many travel minutes;
+# starting after a stop's preferred latest start (e.g. morning light) costs less
+WINDOW_PENALTY = 10.0
+PREFERENCE_PENALTY = 2.0
+
+# Improvement stops after this many passes or this much wall time
+MAX_PASSES = 20
+TIME_BUDGET_SECONDS = 0.05
+
+# Nearest-neighbour construction starts from at most this many first stops
+MAX_SEEDS = 8
+
+
+def format_minute(minute: float) -> str:
+    """Minute of day -> "HH:MM" (clamped to the same day)."""
+    minute = int(round(min(max(minute, 0), 24 * 60 - 1)))
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+@dataclass
+class Stop:
+    """A place to visit with its visit length and opening window (minutes of day)."""
+    id: str
+    name: str
+    duration_minutes: int
+    opens: int = 0
+    closes: int = 24 * 60
+    cost_usd: float = 0.0
+    latest_start: Optional[int] = None  # soft preference, not an opening-hours limit
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any], default_hours: float = 1.5) -> "Stop":
+        """Build a stop from a poi.json / hotels_restaurants.json record."""
+        opens, closes = time_window(record)
+        hours = record.get("duration_hours", default_hours)
+        return cls(
+            id=record["id"],
+            name=record.get("name_en") or record.get("name", record["id"]),
+            duration_minutes=int(round(hours * 60)),
+            opens=opens,
+            closes=closes,
+            cost_usd=record.get("cost_usd", record.get("avg_check_usd", 0)) or 0,
+            latest_start=12 * 60 if record.get("best_time") == "morning" else None
+        )
+
+
+@dataclass
+class ScheduledStop:
+    stop: Stop
+    start: int           # minute of day
+    end: int
+    travel_minutes: int  # from the previous stop (or the start point)
+    mode: str = "walk"   # "walk" or "taxi"
+    in_window: bool = True
+
+
+@dataclass
+class DayRoute:
+    stops: List[ScheduledStop] = field(default_factory=list)
+    skipped: List[Stop] = field(default_factory=list)   # did not fit before the day ends
+    lunch_start: Optional[int] = None                      # minute of day of the lunch break
+
+    @property
+    def travel_minutes(self) -> int:
+        return sum(s.travel_minutes for s in self.stops)
+
+    @property
+    def cost_usd(self) -> float:
+        return sum(s.stop.cost_usd for s in self.stops)
+
+
+class RouteOptimizer:
+    """
+    Sequences stops to minimise day length (travel plus waiting) while
+    respecting opening windows; travel times come from the TravelMatrix.
+    """
+
+    def __init__(
+        self,
+        travel: TravelMatrix,
+        day_start: int = DAY_START_MINUTE,
+        day_end: int = DAY_END_MINUTE
+    ):
+        self.travel = travel
+        self.day_start = day_start
+        self.day_end = day_end
+
+    # --- Cost model ---
+
+    def _matrix(self, stops: Sequence[Stop], start_id: Optional[str]) -> np.ndarray:
+        """Slot-rounded travel minutes; the last row/column is the start point."""
+        ids = [s.id for s in stops] + [start_id or ""]
+        minutes = self.travel.submatrix(ids)
+        minutes = np.maximum(5.0, np.ceil(minutes / 5.0) * 5.0)
+        np.fill_diagonal(minutes, 0.0)
+        if not start_id:
+            minutes[-1, :] = 0.0
+        return minutes
+
+    def _cost(self, order: Sequence[int], stops: Sequence[Stop], minutes: np.ndarray, start: int) -> float:
+        """Finish time offset plus window violations (weighted), with the lunch break as in schedule()."""
+        t = start
+        prev = len(stops)  # the start point
+        violation = 0.0
+        late = 0.0
+        lunch_done = False
+        for i in order:
+            stop = stops[i]
+            begin = max(t + minutes[prev, i], stop.opens)
+            if not lunch_done and (begin >= LUNCH_EARLIEST or begin + stop.duration_minutes > LUNCH_LATEST_END):
+                lunch_done = True
+                t = max(t, LUNCH_EARLIEST) + LUNCH_MINUTES
+                begin = max(t + minutes[prev, i], stop.opens)
+            t = begin
+            if stop.latest_start is not None and t > stop.latest_start:
+                late += t - stop.latest_start
+            t += stop.duration_minutes
+            if t > stop.closes:
+                violation += t - stop.closes
+            prev = i
+        if t > self.day_end:
+            violation += t - self.day_end
+        return (t - start) + WINDOW_PENALTY * violation + PREFERENCE_PENALTY * late
+
+    # --- Construction and improvement ---
+
+    def _nearest_neighbour(self, first: int, n: int, minutes: np.ndarray) -> List[int]:
+        order = [first]
+        remaining = set(range(n)) - {first}
+        while remaining:
+            last = order[-1]
+            nxt = min(remaining, key=lambda j: (minutes[last, j], j))
+            order.append(nxt)
+            remaining.remove(nxt)
+        return order
+
+    def order(
+        self,
+        stops: Sequence[Stop],
+        start_id: Optional[str] = None,
+        start_minute: Optional[int] = None,
+        windows: bool = True
+    ) -> List[Stop]:
+        """
+        Best visiting order found for the stops (deterministic).
+        With windows=False only travel time counts, e.g. for a multi-day tour.
+        """
+        n = len(stops)
+        if n <= 1:
+            return list(stops)
+
+        start = self.day_start if start_minute is None else start_minute
+        minutes = self._matrix(stops, start_id)
+        deadline = time.perf_counter() + TIME_BUDGET_SECONDS
+
+        def cost(order):
+            if windows:
+                return self._cost(order, stops, minutes, start)
+            return minutes[n, order[0]] + sum(minutes[a, b] for a, b in zip(order, order[1:]))
+
+        # Construction: nearest neighbour from each possible first stop; for
+        # large inputs only from those closest to the start / opening earliest
+        seeds = sorted(sorted(range(n), key=lambda j: (minutes[n, j], stops[j].opens, j))[:MAX_SEEDS])
+        best = min((self._nearest_neighbour(first, n, minutes) for first in seeds), key=cost)
+        best_cost = cost(best)
+
+        def out_of_time() -> bool:
+            return time.perf_counter() > deadline
+
+        for _ in range(MAX_PASSES):
+            improved = False
+
+            # 2-opt: reverse a segment
+            for i in range(n - 1):
+                if out_of_time():
+                    break
+                for j in range(i + 1, n):
+                    candidate = best[:i] + best[i:j + 1][::-1] + best[j + 1:]
+                    candidate_cost = cost(candidate)
+                    if candidate_cost < best_cost - 1e-9:
+                        best, best_cost, improved = candidate, candidate_cost, True
+
+            # Or-opt: move a segment of 1-3 stops elsewhere
+            for length in (1, 2, 3):
+                for i in range(n - length + 1):
+                    if out_of_time():
+                        break
+                    segment = best[i:i + length]
+                    rest = best[:i] + best[i + length:]
+                    for k in range(len(rest) + 1):
+                        if k == i:
+                            continue
+                        candidate = rest[:k] + segment + rest[k:]
+                        candidate_cost = cost(candidate)
+                        if candidate_cost < best_cost - 1e-9:
+                            best, best_cost, improved = candidate, candidate_cost, True
+
+            if not improved or out_of_time():
+                break
+
+        return [stops[i] for i in best]
+
+    # --- Scheduling ---
+
+    def schedule(
+        self,
+        ordered: Sequence[Stop],
+        start_id: Optional[str] = None,
+        start_minute: Optional[int] = None
+    ) -> DayRoute:
+        """
+        Assign times to stops in the given order, with a lunch break around
+        noon (lunch_start); stops past day_end are skipped.
+        """
+        t = self.day_start if start_minute is None else start_minute
+        prev_id = start_id
+        route = DayRoute()
+
+        for stop in ordered:
+            travel = transfer_slot_minutes(self.travel.travel_minutes(prev_id, stop.id)) if prev_id else 0
+            begin = max(t + travel, stop.opens)
+            if route.lunch_start is None and (
+                begin >= LUNCH_EARLIEST or begin + stop.duration_minutes > LUNCH_LATEST_END
+            ):
+                route.lunch_start = max(t, LUNCH_EARLIEST)
+                t = route.lunch_start + LUNCH_MINUTES
+                begin = max(t + travel, stop.opens)
+            end = begin + stop.duration_minutes
+            if end > self.day_end:
+                route.skipped.append(stop)
+                continue
+            route.stops.append(ScheduledStop(
+                stop=stop,
+                start=begin,
+                end=end,
+                travel_minutes=travel,
+                mode=self.travel.mode(prev_id, stop.id) if prev_id else "walk",
+                in_window=stop.opens <= begin and end <= stop.closes
+            ))
+            t = end
+            prev_id = stop.id
+
+        return route
+
+    def plan_day(
+        self,
+        stops: Sequence[Stop],
+        start_id: Optional[str] = None,
+        start_minute: Optional[int] = None
+    ) -> DayRoute:
+        """Order and time one day's stops."""
+        ordered = self.order(stops, start_id=start_id, start_minute=start_minute)
+        return self.schedule(ordered, start_id=start_id, start_minute=start_minute)
+
+    def plan_days(self, stops: Sequence[Stop], days: int, start_id: Optional[str] = None) -> List[DayRoute]:
+        """
+        Split stops over several days: one tour over all stops is cut into
+        contiguous, similarly loaded segments (neighbouring stops share a day),
+        then each day is re-optimised with its time windows.
+        """
+        days = max(1, days)
+        if days == 1 or len(stops) <= 1:
+            return [self.plan_day(stops, start_id=start_id)] + [DayRoute() for _ in range(days - 1)]
+
+        tour = self.order(stops, start_id=start_id, windows=False)
+        loads = [s.duration_minutes + 30 for s in tour]  # visit plus a typical hop
+        target = sum(loads) / days
+
+        chunks: List[List[Stop]] = [[] for _ in range(days)]
+        done = 0.0
+        for stop, load in zip(tour, loads):
+            index = min(days - 1, int((done + load / 2) // target))
+            chunks[index].append(stop)
+            done += load
+
+        return [self.plan_day(chunk, start_id=start_id) for chunk in chunks]
@@ -0,0 +1,192 @@
+"""
+Story Store - Pre-generated CultureStoryteller stories on disk.
+Stories for every POI x language x style are rendered in batch and served
+without an LLM call; each entry carries a fingerprint of its POI record and
+prompt, so edits to either make it stale.
+
+Pre-generate:
+    python -m src.agents.story_store [--languages ru,en] [--styles full] [--force]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+
+STORE_FORMAT_VERSION = 1
+DEFAULT_STORE_PATH = Path(__file__).parent.parent.parent / "database" / "stories.json"
+
+LANGUAGES = ("ru", "en", "uz")
+STYLES = ("full", "brief", "legend")
+
+
+def story_fingerprint(poi_record: Dict, prompt: str) -> str:
+    """Hash of everything a story depends on: the POI record and the rendered prompt."""
+    payload = json.dumps([poi_record, prompt], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class StoryStore:
+    """
+    JSON file of pre-generated stories keyed by "poi_id|language|style".
+
+    The file is re-read when its mtime changes, so a batch run is picked up
+    by running servers without a restart.
+    """
+
+    def __init__(self, path: Path = None):
+        self.path = Path(path or os.getenv("STORY_STORE_PATH") or DEFAULT_STORE_PATH)
+        self._stories: Dict[str, Dict] = {}
+        self._mtime_ns = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(poi_id: str, language: str, style: str) -> str:
+        return f"{poi_id}|{language}|{style}"
+
+    def _reload_if_changed(self):
+        try:
+            mtime_ns = self.path.stat().st_mtime_ns
+        except OSError:
+            return
+        if mtime_ns == self._mtime_ns:
+            return
+
+        with self._lock:
+            if mtime_ns == self._mtime_ns:
+                return
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Story store unreadable, ignoring: {e}")
+                return
+            if data.get("format_version") != STORE_FORMAT_VERSION:
+                print(f"⚠️  Story store format {data.get('format_version')} != {STORE_FORMAT_VERSION}, ignoring")
+                self._stories = {}
+            else:
+                self._stories = data.get("stories", {})
+            self._mtime_ns = mtime_ns
+
+    def get(self, poi_id: str, language: str, style: str, fingerprint: str) -> Optional[Dict]:
+        """Return the stored entry if it exists and is not stale."""
+        self._reload_if_changed()
+        entry = self._stories.get(self.key(poi_id, language, style))
+        if entry and entry.get("fingerprint") == fingerprint:
+            return entry
+        return None
+
+    def put(self, poi_id: str, language: str, style: str, fingerprint: str, result: Dict):
+        """Record a generated story (in memory; call save() to persist)."""
+        with self._lock:
+            self._stories[self.key(poi_id, language, style)] = {
+                "fingerprint": fingerprint,
+                "story": result["story"],
+                "poi_name": result.get("poi_name"),
+                "has_legend": result.get("has_legend", False),
+                "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+            }
+
+    def prune(self, keep_poi_ids: set) -> int:
+        """Drop stories for POIs no longer in the catalog."""
+        with self._lock:
+            stale = [k for k in self._stories if k.split("|", 1)[0] not in keep_poi_ids]
+            for k in stale:
+                del self._stories[k]
+            return len(stale)
+
+    def save(self):
+        """Write the store atomically."""
+        with self._lock:
+            data = {"format_version": STORE_FORMAT_VERSION, "stories": self._stories}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".json.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self._mtime_ns = self.path.stat().st_mtime_ns
+
+    def __len__(self) -> int:
+        self._reload_if_changed()
+        return len(self._stories)
+
+
+def pregenerate_stories(
+    storyteller=None,
+    languages: List[str] = LANGUAGES,
+    styles: List[str] = STYLES,
+    force: bool = False,
+    save_every: int = 10
+) -> Dict[str, int]:
+    """
+    Render every catalog POI x language x style into the story store.
+    Entries whose fingerprint still matches are skipped unless force=True.
+    """
+    from src.agents.storyteller import CultureStoryteller
+    from src.rag.catalog import get_catalog
+    from src.utils.llm import MockLLMClient
+
+    storyteller = storyteller or CultureStoryteller()
+    if isinstance(getattr(storyteller.llm, "client", storyteller.llm), MockLLMClient):
+        print("❌ No LLM available - refusing to fill the story store with mock stories")
+        return {"generated": 0, "fresh": 0, "failed": 0, "pruned": 0}
+    store = storyteller.story_store
+    store._reload_if_changed()
+
+    poi_ids = [p["id"] for p in get_catalog().pois if "id" in p]
+    stats = {"generated": 0, "fresh": 0, "failed": 0, "pruned": store.prune(set(poi_ids))}
+    total = len(poi_ids) * len(languages) * len(styles)
+    done = 0
+
+    for poi_id in poi_ids:
+        for language in languages:
+            for style in styles:
+                done += 1
+                prepared = storyteller.prepare_story(poi_id, language, style)
+                if prepared is None:
+                    stats["failed"] += 1
+                    continue
+                poi, elements, prompt, fingerprint = prepared
+
+                if not force and store.get(poi.id, language, style, fingerprint):
+                    stats["fresh"] += 1
+                    continue
+
+                try:
+                    result = storyteller.generate_story(poi, elements, prompt, style, refresh=force)
+                except Exception as e:
+                    print(f"❌ [{done}/{total}] {poi.id} {language}/{style}: {e}")
+                    stats["failed"] += 1
+                    continue
+
+                store.put(poi.id, language, style, fingerprint, result)
+                stats["generated"] += 1
+                print(f"✅ [{done}/{total}] {poi.id} {language}/{style}")
+                if stats["generated"] % save_every == 0:
+                    store.save()
+
+    store.save()
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-generate POI stories into the story store")
+    parser.add_argument("--languages", default=",".join(LANGUAGES))
+    parser.add_argument("--styles", default=",".join(STYLES))
+    parser.add_argument("--force", action="store_true", help="Regenerate even fresh entries")
+    args = parser.parse_args()
+
+    stats = pregenerate_stories(
+        languages=[l for l in args.languages.split(",") if l],
+        styles=[s for s in args.styles.split(",") if s],
+        force=args.force
+    )
+    print(f"📚 Story store: {stats}")
@@ -10,7 +10,9 @@ from typing import Optional, List, Dict
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from src.utils.llm import get_llm_client
+from src.utils.llm_cache import CachedLLMClient, get_llm_cache
 from src.rag.retriever import HybridPOIRetriever
+from src.agents.story_store import StoryStore, story_fingerprint
 
 
 # Pre-built story elements for main attractions
@@ -85,9 +87,34 @@ that makes tourists want to visit. Include one interesting fact or legend.
 Language: {language}
 """
 
-    def __init__(self, llm_client=None, poi_retriever=None):
-        self.llm = llm_client or get_llm_client()
+    LEGEND_STORY_PROMPT = """You are a keeper of Samarkand's legends. Retell the legends, myths and
+mysteries connected with {poi_name}.
+
+Background information:
+{context}
+
+Requirements:
+1. Focus on legends and folk tales, not on dates and architecture
+2. If several legends exist, tell the most striking one in full
+3. Say briefly what historians think really happened
+4. End with where visitors can see traces of the legend today
+
+Style: Like a storyteller by the fire, mysterious but honest about what is myth.
+Length: 1-2 paragraphs (100-200 words)
+Language: {language}
+
+Tell the legend:
+"""
+
+    # Stories only change with the POI record, so cached ones stay valid for a week
+    STORY_CACHE_TTL = 7 * 24 * 3600
+
+    def __init__(self, llm_client=None, poi_retriever=None, story_store: StoryStore = None):
+        llm = llm_client or get_llm_client()
+        # generate_story passes cache options, which only the caching wrapper accepts
+        self.llm = llm if isinstance(llm, CachedLLMClient) else CachedLLMClient(llm, get_llm_cache())
         self.poi_retriever = poi_retriever or HybridPOIRetriever()
+        self.story_store = story_store or StoryStore()
     
     def tell_story(
         self, 
@@ -97,6 +124,7 @@ Language: {language}
     ) -> Dict:
         """
         Generate an engaging story about a POI.
+        Served from the pre-generated story store when it has a fresh entry.
         
         Args:
             poi_id: ID of the place
@@ -107,10 +135,37 @@ Language: {language}
             dict with story and metadata
         """
         
+        prepared = self.prepare_story(poi_id, language, style)
+        if prepared is None:
+            return {"story": "Место не найдено", "success": False}
+        poi, elements, prompt, fingerprint = prepared
+        
+        stored = self.story_store.get(poi.id, language, style, fingerprint)
+        if stored:
+            return {
+                "story": stored["story"],
+                "poi_name": poi.name,
+                "style": style,
+                "has_legend": stored.get("has_legend", False),
+                "success": True
+            }
+        
+        try:
+            return self.generate_story(poi, elements, prompt, style)
+        except Exception as e:
+            # Fallback to pre-built content
+            return self._fallback_story(poi, elements, language)
+    
+    def prepare_story(self, poi_id: str, language: str, style: str):
+        """
+        Resolve the POI and render its prompt.
+        Returns (poi, elements, prompt, fingerprint), or None if the POI is unknown.
+        """
+        
         # 1. Get POI data
         poi = self.poi_retriever.get_by_id(poi_id)
         if not poi:
-            return {"story": "Место не найдено", "success": False}
+            return None
         
         # 2. Get pre-built elements if available
         poi_key = poi_id.lower().replace("-", "_").replace(" ", "_")
@@ -119,12 +174,18 @@ Language: {language}
         # 3. Build context
         context = self._build_context(poi, elements)
         
-        # 4. Generate story
+        # 4. Render prompt
         if style == "brief":
             prompt = self.QUICK_STORY_PROMPT.format(
                 poi_name=poi.name,
                 language=language
             )
+        elif style == "legend":
+            prompt = self.LEGEND_STORY_PROMPT.format(
+                poi_name=poi.name,
+                context=context,
+                language=language
+            )
         else:
             prompt = self.STORY_PROMPT.format(
                 poi_name=poi.name,
@@ -132,19 +193,20 @@ Language: {language}
                 language=language
             )
         
-        try:
-            story = self.llm.complete(prompt)
-            
-            return {
-                "story": story,
-                "poi_name": poi.name,
-                "style": style,
-                "has_legend": bool(elements.get("legends")),
-                "success": True
-            }
-        except Exception as e:
-            # Fallback to pre-built content
-            return self._fallback_story(poi, elements, language)
+        fingerprint = story_fingerprint(poi.model_dump(mode="json"), prompt)
+        return poi, elements, prompt, fingerprint
+    
+    def generate_story(self, poi, elements: Dict, prompt: str, style: str, refresh: bool = False) -> Dict:
+        """Generate a story with the LLM (raises on LLM failure)."""
+        story = self.llm.complete(prompt, cache_ttl=self.STORY_CACHE_TTL, cache_refresh=refresh)
+        
+        return {
+            "story": story,
+            "poi_name": poi.name,
+            "style": style,
+            "has_legend": bool(elements.get("legends")),
+            "success": True
+        }
     
     def _build_context(self, poi, elements: Dict) -> str:
         """Build context string from POI data and story elements."""
@@ -12,23 +12,30 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 from src.models.schemas import (
     TripRequest, Route, DayPlan, VerifierReport, CheckResult
 )
+from src.rag.opening_hours import OpeningHoursIndex, get_opening_hours, parse_hhmm
 
 
 class RouteVerifier:
     """
     Verifier agent that checks route feasibility:
     - Budget constraints
-    - Time constraints
+    - Time constraints (hours per day, opening hours)
     - Physical level
     - Specific user constraints
     """
     
-    def __init__(self):
+    def __init__(self, opening_hours: OpeningHoursIndex = None):
         self.max_hours_per_day = {
             "relaxed": 6,
             "moderate": 8,
             "intensive": 10
         }
+        self._opening_hours = opening_hours
+    
+    @property
+    def opening_hours(self) -> OpeningHoursIndex:
+        # Default: the shared catalog's index, so catalog reloads are picked up
+        return self._opening_hours or get_opening_hours()
     
     def verify(self, route: Route, request: TripRequest) -> VerifierReport:
         """
@@ -130,19 +137,54 @@ class RouteVerifier:
                     "max": max_hours
                 })
         
-        if not overloaded_days:
+        closed_visits = self._find_closed_visits(route, request)
+        
+        if not overloaded_days and not closed_visits:
             return CheckResult(
                 passed=True,
                 message=f"✅ Расписание OK для темпа '{request.pace.value}'",
                 details={"max_hours_per_day": max_hours}
             )
-        else:
+        
+        problems = []
+        if overloaded_days:
             days_str = ", ".join([f"День {d['day']} ({d['hours']:.1f}ч)" for d in overloaded_days])
-            return CheckResult(
-                passed=False,
-                message=f"⚠️ Перегружены дни: {days_str}",
-                details={"overloaded_days": overloaded_days}
-            )
+            problems.append(f"Перегружены дни: {days_str}")
+        if closed_visits:
+            visits_str = ", ".join([f"{v['name']} (день {v['day']}, {v['start']})" for v in closed_visits[:3]])
+            problems.append(f"Закрыто во время визита: {visits_str}")
+        return CheckResult(
+            passed=False,
+            message="⚠️ " + "; ".join(problems),
+            details={"overloaded_days": overloaded_days, "closed_visits": closed_visits}
+        )
+    
+    def _find_closed_visits(self, route: Route, request: TripRequest) -> List[dict]:
+        """Activities scheduled outside the place's opening hours on that day."""
+        opening_hours = self.opening_hours
+        closed = []
+        
+        for day in route.days:
+            day_date = day.date
+            if day_date is None and request.start_date:
+                day_date = request.start_date + timedelta(days=day.day - 1)
+            
+            for act in day.activities:
+                start, end = parse_hhmm(act.start_time), parse_hhmm(act.end_time)
+                if start is None or end is None or act.poi_id not in opening_hours:
+                    continue
+                if end < start:
+                    end += 24 * 60  # ends after midnight
+                if not opening_hours.open_between(act.poi_id, day_date, start, end):
+                    closed.append({
+                        "day": day.day,
+                        "poi_id": act.poi_id,
+                        "name": act.poi_name,
+                        "start": act.start_time,
+                        "end": act.end_time
+                    })
+        
+        return closed
     
     def _check_constraints(self, route: Route, request: TripRequest) -> CheckResult:
         """Check if specific user constraints are satisfied."""
@@ -247,6 +289,9 @@ class RouteVerifier:
                 fixes.append("💡 Уберите 1-2 активности из перегруженного дня")
                 fixes.append("💡 Перенесите часть на другой день")
             
+            if "закрыто" in issue.lower():
+                fixes.append("💡 Сдвиньте визит на часы работы или на другой день")
+            
             if "не выполнен" in issue.lower():
                 fixes.append("💡 Добавьте горный маршрут на указанный день")
         
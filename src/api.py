@@ -4,29 +4,109 @@ SaFar - AI Travel Assistant API
 """
 
 import os
+import json
+import asyncio
 import hashlib
-from typing import List, Optional, Tuple
+import time
+import threading
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Tuple
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from pathlib import Path
 
 # Import local modules
-from src.utils.llm import get_llm_client
+from src.utils.llm import get_llm_client, aclose_async_http_client
+from src.utils.llm_cache import get_llm_cache
+from src.utils.session_store import get_session_store
+from src.utils.plan_cache import get_plan_cache, normalise_start_date, plan_key, precompute_plans
 from src.agents.intake import IntakeAgent
 from src.models.schemas import TripRequest
 from src.agents.context_chat import ContextChatAgent
 from src.agents.storyteller import CultureStoryteller
 from src.utils.weather import WeatherService
-from src.rag.retriever import HybridPOIRetriever
+from src.utils.images import get_image_index
+from src.rag.retriever import HybridPOIRetriever, TipsRetriever
+from src.rag.catalog import get_catalog, CatalogSnapshot
 from src.agents.planner import DeterministicTripPlanner, AIRoutePlanner
+from src.agents.route_optimizer import LUNCH_MINUTES, RouteOptimizer, Stop, format_minute
+from src.rag.travel import get_travel_matrix
 from src.models.schemas import PlanRequest, PlanResponse, PlanDay, PlanBlock, PlanBlockType
 
+# --- Startup warm-up ---
+# Heavy singletons are built at boot so the first user doesn't pay for them.
+# /ready reports 503 until this finishes (Railway's healthcheck gates traffic on it).
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+PLAN_CACHE_PRECOMPUTE = os.getenv("PLAN_CACHE_PRECOMPUTE", "true").lower() == "true"
+
+_warmup = {"ready": False, "started_at": None, "total_ms": None, "phases": {}, "errors": {}}
+
+def _timed_warm(name: str, factory):
+    """Build one component, recording its duration (runs in a worker thread)."""
+    started = time.perf_counter()
+    try:
+        factory()
+    except Exception as e:
+        _warmup["errors"][name] = str(e)
+        print(f"⚠️  Warm-up {name} failed: {e}")
+    elapsed = (time.perf_counter() - started) * 1000
+    _warmup["phases"][name] = round(elapsed, 1)
+    print(f"⏱️ Warm-up {name}: {elapsed:.0f} ms")
+
+async def _warm_up():
+    """Build independent components in parallel, then the agents that share them."""
+    started = time.perf_counter()
+    _warmup["started_at"] = time.time()
+    stages = [
+        {
+            "catalog": get_catalog,
+            "image_index": get_image_index,
+            "llm": get_llm,
+            "poi_retriever": get_poi_retriever,
+            "tips_retriever": get_tips_retriever,
+            "trip_planner": get_trip_planner,
+            "weather": get_weather,
+            "session_store": get_session_store,
+        },
+        {
+            "intake_agent": get_intake_agent,
+            "context_chat": get_context_chat,
+            "storyteller": get_storyteller,
+            "ai_planner": get_ai_planner,
+        },
+    ]
+    if PLAN_CACHE_PRECOMPUTE and get_plan_cache() is not None:
+        stages[1]["plan_cache"] = _precompute_plans  # needs only the trip planner
+    for stage in stages:
+        await asyncio.gather(*(
+            run_in_threadpool(_timed_warm, name, factory) for name, factory in stage.items()
+        ))
+    
+    _warmup["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    _warmup["ready"] = True
+    print(f"✅ Warm-up complete in {_warmup['total_ms']:.0f} ms")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_task = None
+    if WARMUP_ON_STARTUP:
+        warm_task = asyncio.create_task(_warm_up())
+    else:
+        _warmup["ready"] = True
+    yield
+    if warm_task is not None and not warm_task.done():
+        warm_task.cancel()
+    await aclose_async_http_client()
+
 app = FastAPI(
     title="SaFar API",
     description="AI-Powered Travel Assistant for Samarkand",
-    version="2.0"
+    version="2.0",
+    lifespan=lifespan
 )
 
 # CORS
@@ -50,117 +130,87 @@ _context_chat = None
 _storyteller = None
 _weather_service = None
 _poi_retriever = None
-_conversation_history: dict = {}  # session_id -> list of messages
+_tips_retriever = None
+
+# Warm-up builds these in worker threads while requests are already served,
+# so each is created under its own lock (double-checked)
+_llm_client_lock = threading.Lock()
+_intake_agent_lock = threading.Lock()
+_context_chat_lock = threading.Lock()
+_storyteller_lock = threading.Lock()
+_weather_service_lock = threading.Lock()
+_poi_retriever_lock = threading.Lock()
+_tips_retriever_lock = threading.Lock()
+
+# LLM response cache lifetimes (seconds) per call-site
+ITINERARY_CACHE_TTL = 6 * 3600
+SMART_ANSWER_CACHE_TTL = 3600
 
 def get_poi_retriever():
     global _poi_retriever
     if _poi_retriever is None:
-        _poi_retriever = HybridPOIRetriever()
+        with _poi_retriever_lock:
+            if _poi_retriever is None:
+                _poi_retriever = HybridPOIRetriever()
     return _poi_retriever
 
+def get_tips_retriever():
+    global _tips_retriever
+    if _tips_retriever is None:
+        with _tips_retriever_lock:
+            if _tips_retriever is None:
+                _tips_retriever = TipsRetriever()
+    return _tips_retriever
+
 def get_llm():
     global _llm_client
     if _llm_client is None:
-        _llm_client = get_llm_client()
+        with _llm_client_lock:
+            if _llm_client is None:
+                _llm_client = get_llm_client()
     return _llm_client
 
 def get_intake_agent():
     global _intake_agent
     if _intake_agent is None:
-        _intake_agent = IntakeAgent(get_llm())
+        with _intake_agent_lock:
+            if _intake_agent is None:
+                _intake_agent = IntakeAgent(get_llm())
     return _intake_agent
 
 def get_context_chat():
     global _context_chat
     if _context_chat is None:
-        _context_chat = ContextChatAgent(get_llm())
+        with _context_chat_lock:
+            if _context_chat is None:
+                _context_chat = ContextChatAgent(get_llm(), get_poi_retriever(), get_tips_retriever())
     return _context_chat
 
 def get_storyteller():
     global _storyteller
     if _storyteller is None:
-        _storyteller = CultureStoryteller(get_llm())
+        with _storyteller_lock:
+            if _storyteller is None:
+                _storyteller = CultureStoryteller(get_llm(), get_poi_retriever())
     return _storyteller
 
 def get_weather():
     global _weather_service
     if _weather_service is None:
-        _weather_service = WeatherService()
+        with _weather_service_lock:
+            if _weather_service is None:
+                _weather_service = WeatherService()
     return _weather_service
 
 def get_poi_image_url(poi_id: str, category: str = "poi") -> str:
     """Map POI ID to image URL. Returns API-served path."""
-    
-    # Special mappings for POI IDs that don't match image filenames exactly
-    poi_id_mappings = {
-        "gur_emir_mausoleum": "gur_e_amir_mausoleum",
-        "shah_i_zinda": "shah_i_zinda_necropolis",
-        "bibi_khanym_mosque": "bibi_khanym_mosque",
-        "siab_bazaar": "siob_bazaar",
-        "afrosiyab_museum": "afrosiyob_museum",
-        "ulugh_beg_observatory": "ulugh_beg_observatory_museum",
-        "hazrat_khizr_mosque": "hazrat_khizr_mosque",
-        "central_plov_center": "central_plov_center",  # May not exist, will fallback
-        "silk_paper_workshop_konigil": "meros_paper_mill",
-        "khovrenko_winery": "khovrenko_winery_wine_museum",
-        "rukhobod_mausoleum": "rukhobod_mausoleum",
-        "amir_temur_statue": "amir_temur_monument",
-        "zarafshan_gorge_day_trip": "amankutan_gorge_viewpoint",  # Fallback
-        "seven_lakes_fann_mountains": "amankutan_gorge_viewpoint",  # Fallback
-        "aksay_waterfall_hike": "amankutan_gorge_viewpoint",  # Fallback
-        "urgut_sunday_market": "urgut_bazaar",
-        "siyob_restaurant": "siob_bazaar",  # Fallback
-        "art_cafe_samarkand": "siob_bazaar",  # Fallback
-        "ishrat_khona_ruins": "ishratkhana_mausoleum",
-        "sunset_viewpoint_hill": "hazrat_khizr_viewpoint",
-        "samarkand_carpet_workshop": "samarkand_bukhara_silk_carpets_factory",
-        "saint_daniel_tomb": "khoja_doniyor_mausoleum",
-        "museum_ulughbek": "ulugh_beg_observatory_museum",
-        "registan_night_show": "registan_square",
-        "teahouse_lyabi_hovuz": "siob_bazaar",  # Fallback
-        "afrosiyab_ancient_settlement": "afrosiyob_archaeological_site",
-        "eternal_city_samarkand": "registan_square",  # Fallback
-        "nurata_mountains_2day": "amankutan_gorge_viewpoint",  # Fallback
-        "chorsu_local_market": "siob_bazaar",  # Fallback
-    }
-    
-    # Use mapping if exists, otherwise use POI ID as-is
-    image_filename = poi_id_mappings.get(poi_id, poi_id)
-    
-    # Check if image exists
-    frontend_dir = Path(__file__).parent.parent / "frontend"
-    image_path = frontend_dir / "images" / category / f"{image_filename}.jpg"
-    
-    
-    if image_path.exists():
-        return f"/images/{category}/{image_filename}.jpg"
-    
-    # Try alternative extensions
-    for ext in [".png", ".webp"]:
-        alt_path = frontend_dir / "images" / category / f"{image_filename}{ext}"
-        if alt_path.exists():
-            return f"/images/{category}/{image_filename}{ext}"
-    
-    # Fallbacks by category (so cards always have a local image)
-    fallback_by_category = {
-        "hotels": ("hotels", "hotel_city_samarkand.jpg"),
-        "restaurants": ("restaurants", "rest_afandi_food.jpg"),
-        "poi": ("poi", "registan_square.jpg"),
-    }
-    fb = fallback_by_category.get(category)
-    if fb:
-        fb_dir, fb_file = fb
-        fb_path = frontend_dir / "images" / fb_dir / fb_file
-        if fb_path.exists():
-            return f"/images/{fb_dir}/{fb_file}"
-
-    # Return empty string if no image found (frontend will use remote fallback)
-    return ""
+    return get_image_index().resolve(poi_id, category)
 
 # --- Models ---
 class ChatRequest(BaseModel):
     message: str
     session_id: Optional[str] = None
+    context: Optional[dict] = None  # e.g. {"lat": .., "lng": ..} or {"current_poi": ".."}
 
 class ChatResponse(BaseModel):
     message: str
@@ -179,6 +229,7 @@ class OptimizeRequest(BaseModel):
     places: List[str]
     days: int = 1
     budget: float = 100
+    narrate: bool = False  # let the LLM write prose around the optimised schedule
 
 class EditPlanRequest(BaseModel):
     places: List[str]
@@ -186,13 +237,35 @@ class EditPlanRequest(BaseModel):
 
 # --- Deterministic Trip Planner Singleton ---
 _trip_planner = None
+_trip_planner_lock = threading.Lock()
 
 def get_trip_planner():
     global _trip_planner
     if _trip_planner is None:
-        _trip_planner = DeterministicTripPlanner()
+        with _trip_planner_lock:
+            if _trip_planner is None:
+                _trip_planner = DeterministicTripPlanner()
     return _trip_planner
 
+# --- AI Route Planner Singleton (shares the retrievers and LLM client above) ---
+_ai_planner = None
+_ai_planner_lock = threading.Lock()
+
+def get_ai_planner():
+    global _ai_planner
+    if _ai_planner is None:
+        with _ai_planner_lock:
+            if _ai_planner is None:
+                _ai_planner = AIRoutePlanner(
+                    poi_retriever=get_poi_retriever(),
+                    tips_retriever=get_tips_retriever(),
+                    llm_client=get_llm()
+                )
+    return _ai_planner
+
+# PlanRequest pace -> TripRequest pace
+PLAN_PACE_TO_TRIP_PACE = {"slow": "relaxed", "medium": "moderate", "fast": "intensive"}
+
 # --- AI Itinerary Generation ---
 ITINERARY_SYSTEM = """Ты SaFar — лучший AI-гид по Самарканду и Узбекистану.
 
@@ -236,14 +309,14 @@ ITINERARY_PROMPT = """Создай детальный маршрут на {days}
 - ⚠️ Важные советы
 - 📸 Лучшие фото-споты"""
 
-def generate_ai_itinerary(days: int, budget: float, interests: List[str]) -> str:
-    """Use LLM to generate a fully AI-powered itinerary with RAG context."""
-    llm = get_llm()
+async def _build_itinerary_prompt(days: int, budget: float, interests: List[str]) -> Tuple[str, str, str]:
+    """Retrieve RAG context and build the itinerary prompt. Returns (prompt, system, header)."""
     retriever = get_poi_retriever()
     
     # Get relevant POIs from vector database based on interests
+    # (search may call the embeddings API, so keep it off the event loop)
     query = " ".join(interests) + " Samarkand достопримечательности"
-    rag_results = retriever.search(query=query, top_k=15)
+    rag_results = await run_in_threadpool(retriever.search, query=query, top_k=15)
     
     # Format POI context for the LLM
     poi_context = ""
@@ -289,26 +362,47 @@ def generate_ai_itinerary(days: int, budget: float, interests: List[str]) -> str
     system = """Ты — SaFar, AI-гид по Самарканду. Используй данные из базы для создания точных маршрутов.
     ВАЖНО: Отвечай на языке пользователя (русский по умолчанию)."""
     
+    # Format the response nicely
+    header = f"🗓️ **Ваш {days}-дневный маршрут по Самарканду**\n"
+    header += f"💰 Бюджет: ${budget:.0f} | 📍 Самарканд, Узбекистан\n"
+    header += f"🔍 Найдено {len(rag_results)} мест в базе данных\n\n"
+    
+    return prompt, system, header
+
+async def generate_ai_itinerary(days: int, budget: float, interests: List[str], refresh: bool = False) -> str:
+    """Use LLM to generate a fully AI-powered itinerary with RAG context.
+    
+    refresh=True skips the cached answer (used by /v1/regenerate).
+    """
+    prompt, system, header = await _build_itinerary_prompt(days, budget, interests)
+    
     try:
-        response = llm.complete(prompt, system_prompt=system, max_tokens=4000)
-        
-        # Format the response nicely
-        header = f"🗓️ **Ваш {days}-дневный маршрут по Самарканду**\n"
-        header += f"💰 Бюджет: ${budget:.0f} | 📍 Самарканд, Узбекистан\n"
-        header += f"🔍 Найдено {len(rag_results)} мест в базе данных\n\n"
-        
+        response = await get_llm().acomplete(
+            prompt, system_prompt=system, max_tokens=4000,
+            cache_ttl=ITINERARY_CACHE_TTL, cache_refresh=refresh
+        )
         return header + response
     except Exception as e:
         # Fallback if LLM fails
         return f"❌ Ошибка генерации: {str(e)}. Попробуйте ещё раз."
 
-def generate_smart_answer(message: str) -> str:
-    """Generate a smart answer for general travel questions using RAG."""
-    llm = get_llm()
+async def stream_ai_itinerary(days: int, budget: float, interests: List[str], refresh: bool = False) -> AsyncIterator[str]:
+    """Streaming variant of generate_ai_itinerary: yields the header, then LLM chunks."""
+    prompt, system, header = await _build_itinerary_prompt(days, budget, interests)
+    
+    yield header
+    async for chunk in get_llm().astream(
+        prompt, system_prompt=system, max_tokens=4000,
+        cache_ttl=ITINERARY_CACHE_TTL, cache_refresh=refresh
+    ):
+        yield chunk
+
+async def _build_smart_answer_prompt(message: str) -> Tuple[str, str]:
+    """Retrieve RAG context for a general question. Returns (prompt, system)."""
     retriever = get_poi_retriever()
     
     # RAG Search
-    rag_results = retriever.search(query=message, top_k=5)
+    rag_results = await run_in_threadpool(retriever.search, query=message, top_k=5)
     
     # Format Context
     context = ""
@@ -332,30 +426,75 @@ Use emojis where appropriate.
     
     system = "You are SaFar, a helpful AI travel assistant for Samarkand."
     
+    return prompt, system
+
+async def generate_smart_answer(message: str) -> str:
+    """Generate a smart answer for general travel questions using RAG."""
+    prompt, system = await _build_smart_answer_prompt(message)
+    
     try:
-        return llm.complete(prompt, system_prompt=system)
+        return await get_llm().acomplete(prompt, system_prompt=system, cache_ttl=SMART_ANSWER_CACHE_TTL)
     except Exception as e:
         return f"I couldn't process that clearly. {e}"
 
+async def stream_smart_answer(message: str) -> AsyncIterator[str]:
+    """Streaming variant of generate_smart_answer."""
+    prompt, system = await _build_smart_answer_prompt(message)
+    
+    async for chunk in get_llm().astream(prompt, system_prompt=system, cache_ttl=SMART_ANSWER_CACHE_TTL):
+        yield chunk
+
+# --- Server-Sent Events ---
+
+def _sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def _sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # --- API Endpoints ---
 
 
-@app.post("/v1/plan", response_model=PlanResponse)
-async def create_trip_plan(request: PlanRequest):
-    """
-    Deterministic Trip Planner - No LLM hallucinations!
-    Returns a structured plan with days[], blocks[], warnings[].
-    """
-    try:
-        planner = get_trip_planner()
+def _build_plan(request: PlanRequest) -> PlanResponse:
+    """Deterministic plan for a request, served from the plan cache when possible."""
+    planner = get_trip_planner()
+    # Resolve the date up front so the plan and its cache key agree
+    start_date = normalise_start_date(request.start_date)
+    
+    def create() -> PlanResponse:
         plan = planner.create_plan(
             days=request.days,
             interests=request.interests,
             budget=request.budget,
             pace=request.pace,
-            start_date=request.start_date
+            start_date=start_date
         )
         return PlanResponse(**plan)
+    
+    cache = get_plan_cache()
+    if cache is None:
+        return create()
+    return cache.get_or_create(plan_key(request, start_date, planner.catalog.version), create)
+
+
+def _precompute_plans():
+    built = precompute_plans(_build_plan)
+    print(f"🗓️ Plan cache: {built} common plans precomputed")
+
+
+@app.post("/v1/plan", response_model=PlanResponse)
+async def create_trip_plan(request: PlanRequest):
+    """
+    Deterministic Trip Planner - No LLM hallucinations!
+    Returns a structured plan with days[], blocks[], warnings[].
+    """
+    try:
+        return _build_plan(request)
     except Exception as e:
         print(f"❌ Error in create_trip_plan: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -366,14 +505,15 @@ def _convert_route_to_plan_response(route, pace: str = "medium") -> PlanResponse
     plan_days = []
     poi_count = 0
     meal_count = 0
+    restaurant_index = get_catalog().restaurant_index
     
     for day_plan in route.days:
         blocks = []
         for activity in day_plan.activities:
-            # Determine block type from POI name/notes
-            block_type = PlanBlockType.poi
-            if any(keyword in activity.poi_name.lower() for keyword in ['restaurant', 'lunch', 'dinner', 'breakfast', 'cafe', 'plov']):
-                block_type = PlanBlockType.meal
+            # Determine block type from the catalog, then from POI name/notes
+            block_type = PlanBlockType.POI
+            if activity.poi_id in restaurant_index or any(keyword in activity.poi_name.lower() for keyword in ['restaurant', 'lunch', 'dinner', 'breakfast', 'cafe', 'plov']):
+                block_type = PlanBlockType.MEAL
                 meal_count += 1
             else:
                 poi_count += 1
@@ -414,24 +554,30 @@ async def create_ai_trip_plan(request: PlanRequest):
     """
     try:
         print("🤖 AI Trip Planner requested...")
+        started = time.perf_counter()
         
         # Create TripRequest from PlanRequest
+        pace = request.pace or "medium"
         trip_request = TripRequest(
             city="Samarkand",
             duration_days=request.days,
             budget_usd=request.budget,
             interests=request.interests or ["history", "culture"],
             constraints=[],
-            pace=request.pace or "moderate"
+            pace=PLAN_PACE_TO_TRIP_PACE.get(pace, pace)
         )
         
-        # Use AI planner with RAG
-        ai_planner = AIRoutePlanner()
-        routes, evidence = ai_planner.generate_routes(trip_request, num_variants=1)
+        # Shared warm planner; only the first request pays for construction
+        ai_planner = _ai_planner or await run_in_threadpool(get_ai_planner)
+        setup_ms = (time.perf_counter() - started) * 1000
+        
+        # Sync retrieval + LLM calls run in the threadpool
+        routes, evidence = await run_in_threadpool(ai_planner.generate_routes, trip_request, num_variants=1)
+        print(f"⏱️ AI plan: setup {setup_ms:.1f} ms, retrieval+generation {(time.perf_counter() - started) * 1000 - setup_ms:.0f} ms")
         
         if routes:
             print(f"✅ AI generated {len(routes)} route(s)")
-            return _convert_route_to_plan_response(routes[0], request.pace or "medium")
+            return _convert_route_to_plan_response(routes[0], pace)
         else:
             print("⚠️ AI returned no routes, falling back to deterministic")
             return await create_trip_plan(request)
@@ -442,6 +588,106 @@ async def create_ai_trip_plan(request: PlanRequest):
         return await create_trip_plan(request)
 
 
+def _remember_reply(session_id: str, content: str, trip_request: Optional[TripRequest] = None):
+    """Append an assistant message (and the trip_request it was based on) to history."""
+    message = {"role": "assistant", "content": content}
+    if trip_request is not None:
+        message["trip_request"] = trip_request.model_dump() if hasattr(trip_request, 'model_dump') else trip_request
+    get_session_store().append(session_id, message)
+
+async def _prepare_chat_turn(request: ChatRequest, session_id: str) -> Tuple[str, Optional[ChatResponse], Optional[TripRequest]]:
+    """
+    Run intake for a chat message.
+    
+    Returns (mode, response, trip_request):
+    - "reply": response is final (greeting, clarification)
+    - "itinerary": generate an itinerary for trip_request
+    - "answer": generate a smart answer for a general question
+    """
+    agent = get_intake_agent()
+    history = get_session_store()
+    
+    # Add user message to history
+    history.append(session_id, {"role": "user", "content": request.message})
+    
+    # Check for greetings
+    greetings = ['hello', 'hi', 'hey', 'salom', 'привет', 'здравствуйте']
+    if request.message.lower().strip() in greetings or len(request.message.strip()) < 5:
+        history.append(session_id, {"role": "assistant", "content": "greeting"})
+        return "reply", ChatResponse(
+            message="Привет! Я SaFar — ваш AI-помощник для путешествий по Самарканду. 🏛️\n\nРасскажите о вашей поездке:\n• Сколько дней планируете?\n• Какой бюджет?\n• Что вас интересует? (история, еда, природа, шопинг...)",
+            needs_clarification=True,
+            trip_request=None
+        ), None
+    
+    # Check if this is a correction to previous trip request
+    # Look for patterns like "ne sto dollarov a 300", "not 100 but 300", etc.
+    previous_trip = None
+    messages = history.get(session_id)
+    if len(messages) > 2:
+        # Check last assistant response for trip_request
+        for msg in reversed(messages[:-1]):
+            if isinstance(msg, dict) and msg.get("trip_request"):
+                previous_trip = msg.get("trip_request")
+                break
+    
+    # If we have a previous trip and this looks like a correction, use apply_patch
+    if previous_trip and any(word in request.message.lower() for word in ['ne', 'не', 'not', 'но', 'but', 'а']):
+        try:
+            from src.models.schemas import TripRequest
+            prev_trip_obj = TripRequest.model_validate(previous_trip) if isinstance(previous_trip, dict) else previous_trip
+            updated_trip = await run_in_threadpool(agent.apply_patch, prev_trip_obj, request.message)
+            trip_request = updated_trip
+            question = None
+        except:
+            # Fallback to normal parsing
+            trip_request, question = await run_in_threadpool(agent.parse, request.message)
+    else:
+        # Parse user input (will handle corrections in _mock_parse)
+        trip_request, question = await run_in_threadpool(agent.parse, request.message)
+    
+    if trip_request:
+        # Check if we need clarifying questions
+        missing_info = []
+        
+        # Check for arrival/departure info
+        text_lower = request.message.lower()
+        has_arrival_info = any(word in text_lower for word in ['прилет', 'arrival', 'прибы', 'приезж', 'утром', 'вечером', 'в ', 'приеду'])
+        has_interests = len(trip_request.interests) > 0 and trip_request.interests != ['history', 'architecture']
+        
+        if not has_arrival_info:
+            missing_info.append("🕐 Во сколько вы прибываете в Самарканд?")
+        if not has_interests or 'history' in trip_request.interests and 'architecture' in trip_request.interests:
+            missing_info.append("🎯 Что вас больше интересует: история, гастрономия, природа, шопинг?")
+        
+        # Ask clarifying questions if needed (but still remember the trip_request)
+        if missing_info and len(missing_info) >= 2:
+            clarification_msg = f"Отлично! {trip_request.duration_days} дней с бюджетом ${trip_request.budget_usd:.0f} — хороший план!\n\nЧтобы составить идеальный маршрут, уточните:\n" + "\n".join(missing_info)
+            # Store trip_request in history
+            _remember_reply(session_id, clarification_msg, trip_request)
+            return "reply", ChatResponse(
+                message=clarification_msg,
+                needs_clarification=True,
+                trip_request=trip_request  # Keep the parsed request for context
+            ), trip_request
+        
+        # Generate 100% AI itinerary!
+        return "itinerary", None, trip_request
+    
+    # IntakeAgent returned None for trip_request
+    # If explicit question was asked by Intake that means clarification needed, but usually Intake only returns Question if it PARTIALLY parsed something.
+    # If both None (as per our recent change), treat as GENERAL QA
+    if question:
+        return "reply", ChatResponse(
+            message=question,
+            needs_clarification=True,
+            trip_request=None
+        ), None
+    
+    # SMART ANSWER MODE
+    # The user asked something that isn't a trip plan (e.g. "french restaurant")
+    return "answer", None, None
+
 @app.post("/v1/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     """
@@ -449,124 +695,34 @@ async def chat(request: ChatRequest):
     Now with smart clarifying questions and conversation history!
     """
     try:
-        agent = get_intake_agent()
         session_id = request.session_id or "default"
+        mode, response, trip_request = await _prepare_chat_turn(request, session_id)
         
-        # Initialize conversation history for this session
-        if session_id not in _conversation_history:
-            _conversation_history[session_id] = []
-        
-        # Add user message to history
-        _conversation_history[session_id].append({"role": "user", "content": request.message})
-        
-        # Check for greetings
-        greetings = ['hello', 'hi', 'hey', 'salom', 'привет', 'здравствуйте']
-        if request.message.lower().strip() in greetings or len(request.message.strip()) < 5:
-            _conversation_history[session_id].append({"role": "assistant", "content": "greeting"})
-            return ChatResponse(
-                message="Привет! Я SaFar — ваш AI-помощник для путешествий по Самарканду. 🏛️\n\nРасскажите о вашей поездке:\n• Сколько дней планируете?\n• Какой бюджет?\n• Что вас интересует? (история, еда, природа, шопинг...)",
-                needs_clarification=True,
-                trip_request=None
-            )
-        
-        # Check if this is a correction to previous trip request
-        # Look for patterns like "ne sto dollarov a 300", "not 100 but 300", etc.
-        previous_trip = None
-        if len(_conversation_history[session_id]) > 2:
-            # Check last assistant response for trip_request
-            for msg in reversed(_conversation_history[session_id][:-1]):
-                if isinstance(msg, dict) and msg.get("trip_request"):
-                    previous_trip = msg.get("trip_request")
-                    break
+        if mode == "reply":
+            return response
         
-        # If we have a previous trip and this looks like a correction, use apply_patch
-        if previous_trip and any(word in request.message.lower() for word in ['ne', 'не', 'not', 'но', 'but', 'а']):
-            try:
-                from src.models.schemas import TripRequest
-                prev_trip_obj = TripRequest.model_validate(previous_trip) if isinstance(previous_trip, dict) else previous_trip
-                updated_trip = agent.apply_patch(prev_trip_obj, request.message)
-                trip_request = updated_trip
-                question = None
-            except:
-                # Fallback to normal parsing
-                trip_request, question = agent.parse(request.message)
-        else:
-            # Parse user input (will handle corrections in _mock_parse)
-            trip_request, question = agent.parse(request.message)
-        
-        if trip_request:
-            # Check if we need clarifying questions
-            missing_info = []
-            
-            # Check for arrival/departure info
-            text_lower = request.message.lower()
-            has_arrival_info = any(word in text_lower for word in ['прилет', 'arrival', 'прибы', 'приезж', 'утром', 'вечером', 'в ', 'приеду'])
-            has_interests = len(trip_request.interests) > 0 and trip_request.interests != ['history', 'architecture']
-            
-            if not has_arrival_info:
-                missing_info.append("🕐 Во сколько вы прибываете в Самарканд?")
-            if not has_interests or 'history' in trip_request.interests and 'architecture' in trip_request.interests:
-                missing_info.append("🎯 Что вас больше интересует: история, гастрономия, природа, шопинг?")
-            
-            # Ask clarifying questions if needed (but still remember the trip_request)
-            if missing_info and len(missing_info) >= 2:
-                clarification_msg = f"Отлично! {trip_request.duration_days} дней с бюджетом ${trip_request.budget_usd:.0f} — хороший план!\n\nЧтобы составить идеальный маршрут, уточните:\n" + "\n".join(missing_info)
-                # Store trip_request in history
-                _conversation_history[session_id].append({
-                    "role": "assistant", 
-                    "content": clarification_msg,
-                    "trip_request": trip_request.model_dump() if hasattr(trip_request, 'model_dump') else trip_request
-                })
-                return ChatResponse(
-                    message=clarification_msg,
-                    needs_clarification=True,
-                    trip_request=trip_request  # Keep the parsed request for context
-                )
-            
-            # Generate 100% AI itinerary!
-            itinerary = generate_ai_itinerary(
+        if mode == "itinerary":
+            itinerary = await generate_ai_itinerary(
                 days=trip_request.duration_days,
                 budget=trip_request.budget_usd,
                 interests=trip_request.interests
             )
             
             # Store successful trip_request in history
-            _conversation_history[session_id].append({
-                "role": "assistant",
-                "content": itinerary,
-                "trip_request": trip_request.model_dump() if hasattr(trip_request, 'model_dump') else trip_request
-            })
+            _remember_reply(session_id, itinerary, trip_request)
             return ChatResponse(
                 message=itinerary,
                 needs_clarification=False,
                 trip_request=trip_request
             )
-        else:
-            # IntakeAgent returned None for trip_request
-            # If explicit question was asked by Intake that means clarification needed, but usually Intake only returns Question if it PARTIALLY parsed something.
-            # If both None (as per our recent change), treat as GENERAL QA
-            
-            if question:
-                return ChatResponse(
-                    message=question,
-                    needs_clarification=True,
-                    trip_request=None
-                )
-            else:
-                # SMART ANSWER MODE
-                # The user asked something that isn't a trip plan (e.g. "french restaurant")
-                answer = generate_smart_answer(request.message)
-                
-                _conversation_history[session_id].append({
-                    "role": "assistant",
-                    "content": answer
-                })
-                
-                return ChatResponse(
-                    message=answer,
-                    needs_clarification=False,
-                    trip_request=None
-                )
+        
+        answer = await generate_smart_answer(request.message)
+        _remember_reply(session_id, answer)
+        return ChatResponse(
+            message=answer,
+            needs_clarification=False,
+            trip_request=None
+        )
     except Exception as e:
         print(f"❌ Error in chat endpoint: {e}")
         return ChatResponse(
@@ -575,32 +731,178 @@ async def chat(request: ChatRequest):
             trip_request=None
         )
 
+@app.post("/v1/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    SSE variant of /v1/chat.
+    Emits `delta` events ({"text": ...}) as the reply is generated, then a
+    `done` event with needs_clarification and trip_request (or `error`).
+    """
+    session_id = request.session_id or "default"
+    
+    async def events():
+        try:
+            mode, response, trip_request = await _prepare_chat_turn(request, session_id)
+            
+            if mode == "reply":
+                yield _sse("delta", {"text": response.message})
+                yield _sse("done", {
+                    "needs_clarification": response.needs_clarification,
+                    "trip_request": response.trip_request.model_dump(mode="json") if response.trip_request else None
+                })
+                return
+            
+            if mode == "itinerary":
+                chunks = stream_ai_itinerary(
+                    days=trip_request.duration_days,
+                    budget=trip_request.budget_usd,
+                    interests=trip_request.interests
+                )
+            else:
+                chunks = stream_smart_answer(request.message)
+            
+            parts = []
+            async for text in chunks:
+                parts.append(text)
+                yield _sse("delta", {"text": text})
+            
+            _remember_reply(session_id, "".join(parts), trip_request)
+            yield _sse("done", {
+                "needs_clarification": False,
+                "trip_request": trip_request.model_dump(mode="json") if trip_request else None
+            })
+        except Exception as e:
+            print(f"❌ Error in chat stream: {e}")
+            yield _sse("error", {"message": f"❌ Ошибка генерации: {str(e)}. Попробуйте ещё раз."})
+    
+    return _sse_response(events())
+
 @app.post("/v1/regenerate")
 async def regenerate_itinerary(request: ChatRequest):
     """Regenerate itinerary with different suggestions."""
     agent = get_intake_agent()
-    trip_request, _ = agent.parse(request.message)
+    trip_request, _ = await run_in_threadpool(agent.parse, request.message)
     
     if trip_request:
-        itinerary = generate_ai_itinerary(
+        itinerary = await generate_ai_itinerary(
             days=trip_request.duration_days,
             budget=trip_request.budget_usd,
-            interests=trip_request.interests
+            interests=trip_request.interests,
+            refresh=True
         )
         return {"message": itinerary, "regenerated": True}
     
     return {"message": "Could not parse your request", "regenerated": False}
 
-@app.post("/v1/optimize-itinerary")
-async def optimize_itinerary(request: OptimizeRequest):
-    """Optimize user's selected places into a smart itinerary."""
-    llm = get_llm()
+@app.post("/v1/regenerate/stream")
+async def regenerate_itinerary_stream(request: ChatRequest):
+    """SSE variant of /v1/regenerate."""
     
-    places_str = ", ".join(request.places)
+    async def events():
+        try:
+            agent = get_intake_agent()
+            trip_request, _ = await run_in_threadpool(agent.parse, request.message)
+            
+            if not trip_request:
+                yield _sse("delta", {"text": "Could not parse your request"})
+                yield _sse("done", {"regenerated": False})
+                return
+            
+            async for text in stream_ai_itinerary(
+                days=trip_request.duration_days,
+                budget=trip_request.budget_usd,
+                interests=trip_request.interests,
+                refresh=True
+            ):
+                yield _sse("delta", {"text": text})
+            yield _sse("done", {"regenerated": True})
+        except Exception as e:
+            yield _sse("error", {"message": f"❌ Ошибка генерации: {str(e)}. Попробуйте ещё раз."})
     
-    prompt = f"""✨ **ЗАДАЧА: Создать Шедевральный Маршрут** ✨
+    return _sse_response(events())
+
+def _optimize_places(request: OptimizeRequest) -> dict:
+    """Order and time the selected places per day with the route optimiser (no LLM)."""
+    retriever = get_poi_retriever()
+    catalog = get_catalog()
+    
+    stops, unresolved, seen = [], [], set()
+    for place in request.places:
+        poi = retriever.get_by_id(place)
+        record = None
+        if poi:
+            record = (catalog.poi_index.get(poi.id) or catalog.restaurant_index.get(poi.id)
+                      or catalog.hotel_index.get(poi.id))
+        if record is None:
+            unresolved.append(place)
+        elif record["id"] not in seen:
+            seen.add(record["id"])
+            stops.append(Stop.from_record(record))
+    
+    optimizer = RouteOptimizer(get_travel_matrix(catalog))
+    days = []
+    for day_num, route in enumerate(optimizer.plan_days(stops, max(1, min(request.days, 14))), 1):
+        days.append({
+            "day": day_num,
+            "stops": [
+                {
+                    "id": s.stop.id,
+                    "name": s.stop.name,
+                    "start": format_minute(s.start),
+                    "end": format_minute(s.end),
+                    "travel_minutes": s.travel_minutes,
+                    "travel_mode": s.mode,
+                    "cost_usd": s.stop.cost_usd,
+                    "in_window": s.in_window
+                }
+                for s in route.stops
+            ],
+            "lunch": None if route.lunch_start is None else {
+                "start": format_minute(route.lunch_start),
+                "end": format_minute(route.lunch_start + LUNCH_MINUTES)
+            },
+            "skipped": [s.name for s in route.skipped],
+            "travel_minutes": route.travel_minutes,
+            "cost_usd": route.cost_usd
+        })
+    
+    return {"days": days, "unresolved": unresolved}
+
+def _format_optimized_plan(plan: dict) -> str:
+    """Markdown rendering of an optimised plan."""
+    lines = []
+    for day in plan["days"]:
+        if not day["stops"]:
+            continue
+        lines.append(f"### 🌟 День {day['day']}")
+        lunch = day.get("lunch")
+        for stop in day["stops"]:
+            if lunch and stop["start"] >= lunch["end"]:
+                lines.append(f"**{lunch['start']}–{lunch['end']} — 🍛 Обед**")
+                lunch = None
+            if stop["travel_minutes"]:
+                icon, how = ("🚶", "пешком") if stop["travel_mode"] == "walk" else ("🚕", "на такси")
+                lines.append(f"{icon} {stop['travel_minutes']} мин {how}")
+            warning = " ⚠️ вне часов работы" if not stop["in_window"] else ""
+            lines.append(f"**{stop['start']}–{stop['end']} — {stop['name']}**{warning}")
+        if lunch:
+            lines.append(f"**{lunch['start']}–{lunch['end']} — 🍛 Обед**")
+        if day["skipped"]:
+            lines.append(f"_Не поместилось в день: {', '.join(day['skipped'])}_")
+        lines.append("")
+    if plan["unresolved"]:
+        lines.append(f"_Не найдено в базе: {', '.join(plan['unresolved'])}_")
+    return "\n".join(lines).strip()
+
+def _build_optimize_prompt(request: OptimizeRequest, plan: dict) -> Tuple[str, str]:
+    """Build the prompt that narrates an already optimised plan. Returns (prompt, system)."""
+    schedule = _format_optimized_plan(plan)
+    
+    prompt = f"""✨ **ЗАДАЧА: Описать Шедевральный Маршрут** ✨
+       
+       Готовое расписание (порядок и время уже оптимизированы — НЕ меняй их):
+{schedule}
        
-       Места: {places_str}
        Дней: {request.days}
        
        Ты — элитный консьерж-сервис уровня Luxury. Твоя задача — не просто составить список, а влюбить гостя в Самарканд.
@@ -608,7 +910,7 @@ async def optimize_itinerary(request: OptimizeRequest):
        ⚡ **ТРЕБОВАНИЯ К ОФОРМЛЕНИЮ:**
        - Используй **жирные заголовки** и красивые разделители.
        - Добавь "✨ Магию момента" к каждому месту (почему именно сейчас?).
-       - Логистика должна быть идеальной (учитывай время суток).
+       - Сохрани порядок мест и время из расписания, добавь советы по переездам.
        - Стиль: Вдохновляющий, легкий, с эмодзи.
        
        🗺️ **СТРУКТУРА ОТВЕТА:**
@@ -628,15 +930,13 @@ async def optimize_itinerary(request: OptimizeRequest):
     
     system = "Welcome to SaFar!"
     
+    return prompt, system
+
+@app.post("/v1/optimize-itinerary")
+async def optimize_itinerary(request: OptimizeRequest):
+    """Optimize user's selected places into a smart itinerary."""
     try:
-        response = llm.complete(prompt, system_prompt=system, max_tokens=2000)
-        
-        return {
-            "success": True,
-            "itinerary": f"✨ **Оптимизированный маршрут**\n\n{response}",
-            "places_count": len(request.places),
-            "days": request.days
-        }
+        plan = await run_in_threadpool(_optimize_places, request)
     except Exception as e:
         return {
             "success": False,
@@ -644,6 +944,43 @@ async def optimize_itinerary(request: OptimizeRequest):
             "places_count": len(request.places),
             "days": request.days
         }
+    
+    itinerary = _format_optimized_plan(plan)
+    if request.narrate:
+        prompt, system = _build_optimize_prompt(request, plan)
+        try:
+            itinerary = await get_llm().acomplete(prompt, system_prompt=system, max_tokens=2000)
+        except Exception as e:
+            print(f"⚠️ Itinerary narration failed, returning the plain schedule: {e}")
+    
+    return {
+        "success": True,
+        "itinerary": f"✨ **Оптимизированный маршрут**\n\n{itinerary}",
+        "plan": plan,
+        "places_count": len(request.places),
+        "days": request.days
+    }
+
+@app.post("/v1/optimize-itinerary/stream")
+async def optimize_itinerary_stream(request: OptimizeRequest):
+    """SSE variant of /v1/optimize-itinerary."""
+    
+    async def events():
+        try:
+            plan = await run_in_threadpool(_optimize_places, request)
+            yield _sse("plan", plan)
+            yield _sse("delta", {"text": "✨ **Оптимизированный маршрут**\n\n"})
+            if request.narrate:
+                prompt, system = _build_optimize_prompt(request, plan)
+                async for text in get_llm().astream(prompt, system_prompt=system, max_tokens=2000):
+                    yield _sse("delta", {"text": text})
+            else:
+                yield _sse("delta", {"text": _format_optimized_plan(plan)})
+            yield _sse("done", {"success": True, "places_count": len(request.places), "days": request.days})
+        except Exception as e:
+            yield _sse("error", {"message": f"❌ Ошибка оптимизации: {str(e)}"})
+    
+    return _sse_response(events())
 
 @app.post("/v1/edit-itinerary")
 async def edit_itinerary(request: EditPlanRequest):
@@ -669,7 +1006,7 @@ async def edit_itinerary(request: EditPlanRequest):
     """
     
     try:
-        response = llm.complete_json(prompt)
+        response = await llm.acomplete_json(prompt)
         return response
     except Exception as e:
         # Fallback if JSON fails
@@ -683,120 +1020,181 @@ async def get_places(category: str = "all", limit: int = 20):
     places = await search_places(q="", category=category, limit=limit)
     return {"places": places}
 
+# --- Catalog place lists (built once per catalog snapshot) ---
+
+# Samarkand center coordinates as fallback
+SAMARKAND_CENTER = (39.6548, 66.9758)
+
+def _map_poi_category(poi_categories) -> str:
+    """Map POI categories to frontend categories."""
+    if not isinstance(poi_categories, list):
+        return "attraction"
+    # POIs with history/architecture/landmark/religious/museum -> "attraction"
+    if any(cat in ["history", "architecture", "landmark", "religious", "museum", "archaeology", "science", "viewpoint"] for cat in poi_categories):
+        return "attraction"
+    elif any(cat in ["market", "shopping"] for cat in poi_categories):
+        return "market"
+    elif any(cat in ["food", "restaurant", "cafe"] for cat in poi_categories):
+        return "restaurant"
+    elif any(cat in ["hotel", "accommodation"] for cat in poi_categories):
+        return "hotel"
+    return "attraction"  # default
+
+def _poi_image_url(poi: dict, poi_category: str) -> str:
+    """Get image URL - use existing or generate from POI ID."""
+    image_url = poi.get("image_url", "")
+    if not image_url:
+        # Choose correct image folder based on mapped category
+        image_folder = "poi"
+        if poi_category == "hotel":
+            image_folder = "hotels"
+        elif poi_category == "restaurant":
+            image_folder = "restaurants"
+        image_url = get_poi_image_url(poi.get("id"), image_folder)
+    return image_url
+
+def _venue_image_url(image_url: str, folder: str) -> str:
+    """Ensure a local restaurant/hotel image path starts with /images/ for API serving."""
+    if image_url and not image_url.startswith("http"):
+        if not image_url.startswith("/images/"):
+            # Extract filename and construct correct path
+            filename = image_url.split("/")[-1]
+            image_url = f"/images/{folder}/{filename}"
+    return image_url
+
+def _build_search_places(catalog: CatalogSnapshot) -> List[Tuple[dict, str]]:
+    """Places for /v1/search paired with their lowercased search text."""
+    places = []
+    
+    for poi in catalog.pois:
+        poi_category = _map_poi_category(poi.get("category", []))
+        places.append({
+            "id": poi.get("id"),
+            "name": poi.get("name_en") or poi.get("name"),
+            "description": poi.get("description", ""),
+            "category": poi_category,
+            "price": poi.get("cost_usd", 0),
+            "rating": poi.get("avg_rating", 4.5),
+            "image_url": _poi_image_url(poi, poi_category)
+        })
+    
+    for rest in catalog.restaurants:
+        places.append({
+            "id": rest.get("id"),
+            "name": rest.get("name"),
+            "description": rest.get("description", ""),
+            "category": "restaurant",
+            "price": rest.get("avg_check_usd", 10),
+            "rating": rest.get("rating", 4.0),
+            "image_url": _venue_image_url(rest.get("image_url", ""), "restaurants")
+        })
+    
+    for hotel in catalog.hotels:
+        places.append({
+            "id": hotel.get("id"),
+            "name": hotel.get("name"),
+            "description": hotel.get("description", ""),
+            "category": "hotel",
+            "price": hotel.get("price_per_night_usd", 50),
+            "rating": hotel.get("rating", 4.0),
+            "image_url": _venue_image_url(hotel.get("image_url", ""), "hotels")
+        })
+    
+    return [(p, f"{(p['name'] or '').lower()}\n{p['description'].lower()}") for p in places]
+
+def _build_map_places(catalog: CatalogSnapshot) -> List[dict]:
+    """Places with coordinates for /v1/map-places."""
+    places = []
+    
+    for poi in catalog.pois:
+        coords = poi.get("coordinates", {})
+        poi_category = _map_poi_category(poi.get("category", []))
+        places.append({
+            "id": poi.get("id"),
+            "name": poi.get("name_en") or poi.get("name"),
+            "description": poi.get("description", ""),
+            "category": poi_category,
+            "type": f"🏛️ {poi_category.title()}",
+            "price": f"${poi.get('cost_usd', 0)}",
+            "rating": poi.get("avg_rating", 4.5),
+            "image_url": _poi_image_url(poi, poi_category),
+            "address": "",
+            "lat": coords.get("lat", SAMARKAND_CENTER[0]),
+            "lng": coords.get("lng", SAMARKAND_CENTER[1]),
+            "icon": "🏛️"
+        })
+    
+    for i, rest in enumerate(catalog.restaurants):
+        coords = rest.get("coordinates", {})
+        places.append({
+            "id": rest.get("id", f"rest_{i}"),
+            "name": rest.get("name"),
+            "description": rest.get("description", ""),
+            "category": "restaurant",
+            "type": f"🍽️ {rest.get('category', 'restaurant').replace('-', ' ').title()}",
+            "price": f"${rest.get('avg_check_usd', 10)}",
+            "rating": rest.get("rating", 4.0),
+            "image_url": _venue_image_url(rest.get("image_url", ""), "restaurants"),
+            "address": rest.get("address", ""),
+            "lat": coords.get("lat", SAMARKAND_CENTER[0]),
+            "lng": coords.get("lng", SAMARKAND_CENTER[1]),
+            "icon": "🍽️"
+        })
+    
+    for i, hotel in enumerate(catalog.hotels):
+        coords = hotel.get("coordinates", {})
+        places.append({
+            "id": hotel.get("id", f"hotel_{i}"),
+            "name": hotel.get("name"),
+            "description": hotel.get("description", ""),
+            "category": "hotel",
+            "type": f"🏨 {hotel.get('stars', 3)}★ Hotel",
+            "price": f"${hotel.get('price_per_night_usd', 50)}/night",
+            "rating": hotel.get("rating", 4.0),
+            "image_url": _venue_image_url(hotel.get("image_url", ""), "hotels"),
+            "address": hotel.get("address", ""),
+            "lat": coords.get("lat", SAMARKAND_CENTER[0]),
+            "lng": coords.get("lng", SAMARKAND_CENTER[1]),
+            "icon": "🏨"
+        })
+    
+    return places
+
+def _derive_with_images(catalog: CatalogSnapshot, key: str, builder):
+    """
+    catalog.derive for lists that embed image URLs: rebuilt when the image
+    index changes, replacing the previous list in the same slot.
+    """
+    version = get_image_index().current_version()
+    slot = catalog.derive(key, lambda _: {})
+    entry = slot.get("entry")
+    if entry is None or entry[0] != version:
+        entry = (version, builder(catalog))
+        slot["entry"] = entry  # single assignment, so readers see a consistent pair
+    return entry[1]
+
 @app.get("/v1/search")
 async def search_places(q: str = "", category: str = "all", limit: int = 20):
     """Search places - this endpoint is called by the frontend."""
     try:
-        import json
-        from pathlib import Path
+        catalog = get_catalog()
+        # Image URLs are baked into the place lists, so they follow the image index too
+        indexed = _derive_with_images(catalog, "api_search_places", _build_search_places)
         
+        q_lower = q.lower()
         places = []
-        data_dir = Path(__file__).parent.parent / "database"
-        
-        # Debug logging for Railway
-        print(f"🔍 DEBUG: __file__ = {__file__}")
-        print(f"🔍 DEBUG: data_dir = {data_dir}")
-        print(f"🔍 DEBUG: data_dir.exists() = {data_dir.exists()}")
-        
-        # Load POI data
-        poi_path = data_dir / "poi.json"
-        print(f"🔍 DEBUG: poi_path = {poi_path}, exists = {poi_path.exists()}")
-        if poi_path.exists():
-            with open(poi_path, "r", encoding="utf-8") as f:
-                poi_data = json.load(f)
-            for poi in poi_data.get("poi", []):
-                poi_id = poi.get("id")
-                poi_categories = poi.get("category", [])
-                if isinstance(poi_categories, list):
-                    # Map POI categories to frontend categories
-                    # POIs with history/architecture/landmark/religious/museum -> "attraction"
-                    if any(cat in ["history", "architecture", "landmark", "religious", "museum", "archaeology", "science", "viewpoint"] for cat in poi_categories):
-                        poi_category = "attraction"
-                    elif any(cat in ["market", "shopping"] for cat in poi_categories):
-                        poi_category = "market"
-                    elif any(cat in ["food", "restaurant", "cafe"] for cat in poi_categories):
-                        poi_category = "restaurant"
-                    elif any(cat in ["hotel", "accommodation"] for cat in poi_categories):
-                        poi_category = "hotel"
-                    else:
-                        poi_category = "attraction"  # default
-                else:
-                    poi_category = "attraction"
-                
-                # Get image URL - use existing or generate from POI ID
-                image_url = poi.get("image_url", "")
-                if not image_url:
-                    # Choose correct image folder based on mapped category
-                    image_folder = "poi"
-                    if poi_category == "hotel":
-                        image_folder = "hotels"
-                    elif poi_category == "restaurant":
-                        image_folder = "restaurants"
-                    image_url = get_poi_image_url(poi_id, image_folder)
-
-                
-                places.append({
-                    "id": poi_id,
-                    "name": poi.get("name_en") or poi.get("name"),
-                    "description": poi.get("description", ""),
-                    "category": poi_category,
-                    "price": poi.get("cost_usd", 0),
-                    "rating": poi.get("avg_rating", 4.5),
-                    "image_url": image_url
-                })
-        
-        # Load restaurants
-        hr_path = data_dir / "hotels_restaurants.json"
-        if hr_path.exists():
-            with open(hr_path, "r", encoding="utf-8") as f:
-                hr_data = json.load(f)
-            for rest in hr_data.get("restaurants", []):
-                # Fix image URL path - change /images/ to /images/ (already correct) or ensure it exists
-                image_url = rest.get("image_url", "")
-                if image_url and not image_url.startswith("http"):
-                    # Ensure path starts with /images/ for API serving
-                    if not image_url.startswith("/images/"):
-                        # Extract filename and construct correct path
-                        filename = image_url.split("/")[-1]
-                        image_url = f"/images/restaurants/{filename}"
-                places.append({
-                    "id": rest.get("id"),
-                    "name": rest.get("name"),
-                    "description": rest.get("description", ""),
-                    "category": "restaurant",
-                    "price": rest.get("avg_check_usd", 10),
-                    "rating": rest.get("rating", 4.0),
-                    "image_url": image_url
-                })
-            for hotel in hr_data.get("hotels", []):
-                # Fix image URL path
-                image_url = hotel.get("image_url", "")
-                if image_url and not image_url.startswith("http"):
-                    # Ensure path starts with /images/ for API serving
-                    if not image_url.startswith("/images/"):
-                        # Extract filename and construct correct path
-                        filename = image_url.split("/")[-1]
-                        image_url = f"/images/hotels/{filename}"
-                places.append({
-                    "id": hotel.get("id"),
-                    "name": hotel.get("name"),
-                    "description": hotel.get("description", ""),
-                    "category": "hotel",
-                    "price": hotel.get("price_per_night_usd", 50),
-                    "rating": hotel.get("rating", 4.0),
-                    "image_url": image_url
-                })
-        
-        # Filter by category
-        if category != "all":
-            places = [p for p in places if p["category"] == category]
-        
-        # Filter by search query
-        if q:
-            q_lower = q.lower()
-            places = [p for p in places if q_lower in p["name"].lower() or q_lower in p["description"].lower()]
+        for place, text in indexed:
+            if len(places) >= limit:
+                break
+            # Filter by category
+            if category != "all" and place["category"] != category:
+                continue
+            # Filter by search query
+            if q_lower and q_lower not in text:
+                continue
+            places.append(place)
         
-        return places[:limit]
+        return places
     except Exception as e:
         print(f"❌ Error in search_places: {e}")
         # Return partial results or empty list, but don't crash
@@ -806,127 +1204,57 @@ async def search_places(q: str = "", category: str = "all", limit: int = 20):
 async def get_map_places():
     """Get places with coordinates for map display."""
     try:
-        import json
-        from pathlib import Path
-        
-        # Samarkand center coordinates as fallback
-        SAMARKAND_CENTER = (39.6548, 66.9758)
-        
-        places = []
-        data_dir = Path(__file__).parent.parent / "database"
-        
-        # Load POI data
-        poi_path = data_dir / "poi.json"
-        if poi_path.exists():
-            with open(poi_path, "r", encoding="utf-8") as f:
-                poi_data = json.load(f)
-            for poi in poi_data.get("poi", []):
-                coords = poi.get("coordinates", {})
-                lat = coords.get("lat", SAMARKAND_CENTER[0])
-                lng = coords.get("lng", SAMARKAND_CENTER[1])
-                poi_id = poi.get("id")
-                poi_categories = poi.get("category", [])
-                if isinstance(poi_categories, list):
-                    if any(cat in ["history", "architecture", "landmark", "religious", "museum", "archaeology", "science", "viewpoint"] for cat in poi_categories):
-                        poi_category = "attraction"
-                    elif any(cat in ["market", "shopping"] for cat in poi_categories):
-                        poi_category = "market"
-                    elif any(cat in ["food", "restaurant", "cafe"] for cat in poi_categories):
-                        poi_category = "restaurant"
-                    elif any(cat in ["hotel", "accommodation"] for cat in poi_categories):
-                        poi_category = "hotel"
-                    else:
-                        poi_category = "attraction"
-                else:
-                    poi_category = "attraction"
-                image_url = poi.get("image_url", "")
-                if not image_url:
-                    image_folder = "poi"
-                    if poi_category == "hotel":
-                        image_folder = "hotels"
-                    elif poi_category == "restaurant":
-                        image_folder = "restaurants"
-                    image_url = get_poi_image_url(poi_id, image_folder)
-                
-                places.append({
-                    "id": poi_id,
-                    "name": poi.get("name_en") or poi.get("name"),
-                    "description": poi.get("description", ""),
-                    "category": poi_category,
-                    "type": f"🏛️ {poi_category.title()}",
-                    "price": f"${poi.get('cost_usd', 0)}",
-                    "rating": poi.get("avg_rating", 4.5),
-                    "image_url": image_url,
-                    "address": "",
-                    "lat": lat,
-                    "lng": lng,
-                    "icon": "🏛️"
-                })
-        
-        hr_path = data_dir / "hotels_restaurants.json"
-        if hr_path.exists():
-            with open(hr_path, "r", encoding="utf-8") as f:
-                hr_data = json.load(f)
-            
-            # Add restaurants
-            for i, rest in enumerate(hr_data.get("restaurants", [])):
-                # Get coordinates from JSON or use fallback
-                coords = rest.get("coordinates", {})
-                lat = coords.get("lat", SAMARKAND_CENTER[0])
-                lng = coords.get("lng", SAMARKAND_CENTER[1])
-                image_url = rest.get("image_url", "")
-                if image_url and not image_url.startswith("http"):
-                    if not image_url.startswith("/images/"):
-                        filename = image_url.split("/")[-1]
-                        image_url = f"/images/restaurants/{filename}"
-                
-                places.append({
-                    "id": rest.get("id", f"rest_{i}"),
-                    "name": rest.get("name"),
-                    "description": rest.get("description", ""),
-                    "category": "restaurant",
-                    "type": f"🍽️ {rest.get('category', 'restaurant').replace('-', ' ').title()}",
-                    "price": f"${rest.get('avg_check_usd', 10)}",
-                    "rating": rest.get("rating", 4.0),
-                    "image_url": image_url,
-                    "address": rest.get("address", ""),
-                    "lat": lat,
-                    "lng": lng,
-                    "icon": "🍽️"
-                })
-            
-            # Add hotels
-            for i, hotel in enumerate(hr_data.get("hotels", [])):
-                # Get coordinates from JSON or use fallback
-                coords = hotel.get("coordinates", {})
-                lat = coords.get("lat", SAMARKAND_CENTER[0])
-                lng = coords.get("lng", SAMARKAND_CENTER[1])
-                image_url = hotel.get("image_url", "")
-                if image_url and not image_url.startswith("http"):
-                    if not image_url.startswith("/images/"):
-                        filename = image_url.split("/")[-1]
-                        image_url = f"/images/hotels/{filename}"
-                
-                places.append({
-                    "id": hotel.get("id", f"hotel_{i}"),
-                    "name": hotel.get("name"),
-                    "description": hotel.get("description", ""),
-                    "category": "hotel",
-                    "type": f"🏨 {hotel.get('stars', 3)}★ Hotel",
-                    "price": f"${hotel.get('price_per_night_usd', 50)}/night",
-                    "rating": hotel.get("rating", 4.0),
-                    "image_url": image_url,
-                    "address": hotel.get("address", ""),
-                    "lat": lat,
-                    "lng": lng,
-                    "icon": "🏨"
-                })
-        
-        return {"places": places}
+        catalog = get_catalog()
+        return {"places": _derive_with_images(catalog, "api_map_places", _build_map_places)}
     except Exception as e:
         print(f"❌ Error in get_map_places: {e}")
         return {"places": []}
 
+@app.get("/v1/nearby")
+async def get_nearby_places(
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
+    poi_id: Optional[str] = None,
+    radius_km: float = 1.0,
+    category: Optional[str] = None,
+    limit: int = 20
+):
+    """Places within radius_km of a point (lat/lng) or of another place (poi_id), nearest first."""
+    retriever = get_poi_retriever()
+    exclude_ids = []
+    
+    if poi_id:
+        origin = retriever.get_by_id(poi_id)
+        if origin is None or origin.coordinates is None:
+            raise HTTPException(status_code=404, detail=f"Place not found: {poi_id}")
+        lat, lng = origin.coordinates.lat, origin.coordinates.lng
+        exclude_ids = [origin.id]
+    elif lat is None or lng is None:
+        raise HTTPException(status_code=400, detail="Provide lat and lng, or poi_id")
+    
+    results = retriever.nearby(
+        lat, lng,
+        radius_km=max(0.0, min(radius_km, 50.0)),
+        category=category,
+        limit=max(1, min(limit, 100)),
+        exclude_ids=exclude_ids
+    )
+    return {
+        "center": {"lat": lat, "lng": lng},
+        "places": [
+            {
+                "id": poi.id,
+                "name": poi.name,
+                "category": _map_poi_category(poi.category),
+                "distance_km": round(km, 3),
+                "lat": poi.coordinates.lat,
+                "lng": poi.coordinates.lng,
+                "cost_usd": poi.cost_usd
+            }
+            for poi, km in results
+        ]
+    }
+
 @app.post("/v1/ask-ai")
 async def ask_ai(request: ChatRequest):
     """Ask the AI any travel question."""
@@ -935,7 +1263,7 @@ async def ask_ai(request: ChatRequest):
     system = "You are SaFar, an AI travel expert for Samarkand, Uzbekistan. Answer travel questions helpfully and concisely. IMPORTANT: Respond in the same language as the user's message (English, Russian, or Uzbek)."
     
     try:
-        response = llm.complete(request.message, system_prompt=system)
+        response = await llm.acomplete(request.message, system_prompt=system)
         return {"answer": response}
     except Exception as e:
         return {"answer": f"Sorry, I couldn't process that: {str(e)}"}
@@ -944,14 +1272,14 @@ async def ask_ai(request: ChatRequest):
 async def context_chat(request: ChatRequest):
     """Ask contextual questions (transport, currency, etc)."""
     agent = get_context_chat()
-    result = agent.answer(request.message)
+    result = await run_in_threadpool(agent.answer, request.message, request.context)
     return result
 
 @app.post("/v1/story")
 async def tell_story(request: StoryRequest):
     """Generate a story about a place."""
     agent = get_storyteller()
-    return agent.tell_story(request.poi_id, request.language, request.style)
+    return await run_in_threadpool(agent.tell_story, request.poi_id, request.language, request.style)
 
 @app.get("/v1/weather")
 async def get_weather_forecast(days: int = 3):
@@ -960,6 +1288,13 @@ async def get_weather_forecast(days: int = 3):
     forecasts = await service.get_forecast(days)
     return {"forecasts": forecasts}
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once startup warm-up has finished, 503 before."""
+    if not _warmup["ready"]:
+        return JSONResponse(status_code=503, content={"ready": False, "phases": _warmup["phases"]})
+    return {"ready": True, "warmup_ms": _warmup["total_ms"], "phases": _warmup["phases"], "errors": _warmup["errors"]}
+
 @app.get("/debug/files")
 async def debug_files():
     """Debug: List files in the data directory."""
@@ -986,6 +1321,35 @@ async def debug_files():
     
     return result
 
+@app.get("/debug/sessions")
+async def debug_sessions():
+    """Debug: conversation session store usage."""
+    return get_session_store().stats()
+
+@app.get("/debug/embedding-cache")
+async def debug_embedding_cache():
+    """Debug: query embedding cache hit/miss counters."""
+    cache = get_poi_retriever().embedding_cache
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@app.get("/debug/plan-cache")
+async def debug_plan_cache():
+    """Debug: deterministic plan cache hit/miss counters."""
+    cache = get_plan_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@app.get("/debug/llm-cache")
+async def debug_llm_cache():
+    """Debug: LLM response cache hit/miss counters."""
+    cache = get_llm_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
 # Serve Frontend (Must be last to not block API routes)
 if frontend_dir.exists():
     app.mount("/", StaticFiles(directory=str(frontend_dir), html=True), name="frontend")
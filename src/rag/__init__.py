@@ -1,2 +1,3 @@
 # src/rag/__init__.py
 from .retriever import POIRetriever, TipsRetriever
+from .catalog import get_catalog, CatalogSnapshot
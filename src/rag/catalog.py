@@ -0,0 +1,164 @@
+"""
+Catalog Snapshot - Process-wide, immutable view of the venue database.
+Loads poi.json and hotels_restaurants.json once and reloads atomically on change.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+DEFAULT_DATA_DIR = Path(__file__).parent.parent.parent / "database"
+
+POI_FILE = "poi.json"
+EXTRA_FILE = "hotels_restaurants.json"
+
+# How often (seconds) the source files' mtimes are re-checked
+RELOAD_CHECK_INTERVAL = float(os.getenv("CATALOG_RELOAD_INTERVAL", "2.0"))
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """
+    Immutable snapshot of the catalog files.
+
+    Records are shared between all readers and must be treated as read-only.
+    Derived structures (place lists, indexes) are memoised per snapshot via
+    `derive`, so they are rebuilt only when the underlying files change.
+    """
+    version: str              # content hash of the source files
+    data_dir: Path
+    poi_meta: Dict[str, Any]
+    pois: Tuple[Dict[str, Any], ...]
+    restaurants: Tuple[Dict[str, Any], ...]
+    hotels: Tuple[Dict[str, Any], ...]
+    poi_index: Dict[str, Dict[str, Any]]
+    restaurant_index: Dict[str, Dict[str, Any]]
+    hotel_index: Dict[str, Dict[str, Any]]
+    loaded_at: float = 0.0
+    _derived: Dict[str, Any] = field(default_factory=dict, repr=False, compare=False)
+
+    def derive(self, key: str, builder: Callable[["CatalogSnapshot"], Any]) -> Any:
+        """Return a structure computed from this snapshot, building it once."""
+        try:
+            return self._derived[key]
+        except KeyError:
+            value = builder(self)
+            self._derived[key] = value
+            return value
+
+
+def _file_signature(path: Path) -> Tuple[int, int]:
+    """(mtime_ns, size) of a file, or (0, 0) if it does not exist."""
+    try:
+        st = path.stat()
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return 0, 0
+
+
+def _read_json(path: Path) -> Tuple[bytes, Dict[str, Any]]:
+    """Raw bytes (for hashing) and parsed content of a JSON file."""
+    if not path.exists():
+        return b"", {}
+    raw = path.read_bytes()
+    return raw, json.loads(raw.decode("utf-8"))
+
+
+class CatalogStore:
+    """Holds the current snapshot for one data directory and swaps it on change."""
+
+    def __init__(self, data_dir: Path, check_interval: float = RELOAD_CHECK_INTERVAL):
+        self.data_dir = Path(data_dir)
+        self.check_interval = check_interval
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._signature: Tuple = ()
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def _current_signature(self) -> Tuple:
+        return (
+            _file_signature(self.data_dir / POI_FILE),
+            _file_signature(self.data_dir / EXTRA_FILE),
+        )
+
+    def _build(self) -> CatalogSnapshot:
+        poi_raw, poi_data = _read_json(self.data_dir / POI_FILE)
+        extra_raw, extra_data = _read_json(self.data_dir / EXTRA_FILE)
+
+        pois = tuple(poi_data.get("poi", []))
+        restaurants = tuple(extra_data.get("restaurants", []))
+        hotels = tuple(extra_data.get("hotels", []))
+        poi_meta = {k: v for k, v in poi_data.items() if k != "poi"}
+
+        # Content hash: stable across machines and restarts, so it can key on-disk caches
+        digest = hashlib.sha1(poi_raw)
+        digest.update(b"\0")
+        digest.update(extra_raw)
+        version = digest.hexdigest()[:12]
+
+        return CatalogSnapshot(
+            version=version,
+            data_dir=self.data_dir,
+            poi_meta=poi_meta,
+            pois=pois,
+            restaurants=restaurants,
+            hotels=hotels,
+            poi_index={p["id"]: p for p in pois if "id" in p},
+            restaurant_index={r["id"]: r for r in restaurants if "id" in r},
+            hotel_index={h["id"]: h for h in hotels if "id" in h},
+            loaded_at=time.time(),
+        )
+
+    def get(self) -> CatalogSnapshot:
+        """Return the current snapshot, reloading if the files changed."""
+        now = time.monotonic()
+        snapshot = self._snapshot
+        if snapshot is not None and now - self._last_check < self.check_interval:
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is not None and now - self._last_check < self.check_interval:
+                return self._snapshot
+
+            signature = self._current_signature()
+            self._last_check = now
+            if self._snapshot is None or signature != self._signature:
+                try:
+                    new_snapshot = self._build()
+                except Exception as e:
+                    if self._snapshot is None:
+                        raise
+                    # Keep serving the previous snapshot (e.g. file mid-write)
+                    print(f"⚠️  Catalog reload failed, keeping version {self._snapshot.version}: {e}")
+                    return self._snapshot
+
+                self._signature = signature
+                if self._snapshot is not None:
+                    if new_snapshot.version == self._snapshot.version:
+                        return self._snapshot  # touched but unchanged: keep derived caches
+                    print(f"🔄 Catalog reloaded: {self._snapshot.version} -> {new_snapshot.version}")
+                self._snapshot = new_snapshot
+            return self._snapshot
+
+
+_stores: Dict[Path, CatalogStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_catalog(data_dir: Path = None) -> CatalogSnapshot:
+    """Get the shared catalog snapshot for a data directory (default: database/)."""
+    key = Path(data_dir) if data_dir else DEFAULT_DATA_DIR
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            resolved = key.resolve()
+            store = _stores.get(resolved) or CatalogStore(resolved)
+            _stores[resolved] = store
+            _stores[key] = store
+    return store.get()
@@ -0,0 +1,87 @@
+"""
+POI Columns - Columnar view of the catalog for vectorised filtering.
+Numeric fields become NumPy arrays and every tag/category becomes a boolean
+mask over POIs, so filters and boosts are mask operations instead of scans.
+"""
+
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List
+
+import numpy as np
+
+from src.models.schemas import POI
+
+
+class POIColumns:
+    """
+    Immutable column store over a fixed list of POIs (one per catalog snapshot).
+    Row i of every array is POI `ids[i]`.
+    """
+
+    def __init__(self, pois: Dict[str, POI]):
+        self.ids: List[str] = list(pois)
+        self.pois: List[POI] = list(pois.values())
+        self.positions: Dict[str, int] = {poi_id: i for i, poi_id in enumerate(self.ids)}
+        self.size = len(self.ids)
+
+        self.cost = np.array([p.cost_usd for p in self.pois], dtype=np.float64)
+        self.duration = np.array([p.duration_hours for p in self.pois], dtype=np.float64)
+        self.lat = np.array([p.coordinates.lat if p.coordinates else np.nan for p in self.pois], dtype=np.float64)
+        self.lng = np.array([p.coordinates.lng if p.coordinates else np.nan for p in self.pois], dtype=np.float64)
+
+        tag_rows: Dict[str, List[int]] = defaultdict(list)
+        category_rows: Dict[str, List[int]] = defaultdict(list)
+        for i, poi in enumerate(self.pois):
+            for tag in set(poi.tags):
+                tag_rows[tag].append(i)
+            for category in set(poi.category):
+                category_rows[category].append(i)
+
+        self.tag_masks = {tag: self._mask(rows) for tag, rows in tag_rows.items()}
+        self.category_masks = {cat: self._mask(rows) for cat, rows in category_rows.items()}
+
+        # Per-row score vectors, filled in by the owner (e.g. the retriever's boosts)
+        self.static_boost = np.zeros(self.size, dtype=np.float64)
+        self.mountain_boost = np.zeros(self.size, dtype=np.float64)
+        self._memo: Dict[Any, Any] = {}
+
+    def _mask(self, rows: Iterable[int]) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        mask[list(rows)] = True
+        mask.flags.writeable = False
+        return mask
+
+    def empty(self) -> np.ndarray:
+        return np.zeros(self.size, dtype=bool)
+
+    def full(self) -> np.ndarray:
+        return np.ones(self.size, dtype=bool)
+
+    def tag_mask(self, tag: str) -> np.ndarray:
+        mask = self.tag_masks.get(tag)
+        return mask if mask is not None else self.empty()
+
+    def any_tag_mask(self, tags: Iterable[str]) -> np.ndarray:
+        mask = self.empty()
+        for tag in tags:
+            known = self.tag_masks.get(tag)
+            if known is not None:
+                mask |= known
+        return mask
+
+    def category_mask(self, category: str) -> np.ndarray:
+        mask = self.category_masks.get(category)
+        return mask if mask is not None else self.empty()
+
+    def select(self, mask: np.ndarray) -> List[POI]:
+        """POIs where mask is set, in catalog order."""
+        return [self.pois[i] for i in np.flatnonzero(mask)]
+
+    def memo(self, key: Any, builder: Callable[["POIColumns"], Any]) -> Any:
+        """Cache a value derived from these columns (valid for the snapshot's lifetime)."""
+        try:
+            return self._memo[key]
+        except KeyError:
+            value = builder(self)
+            self._memo[key] = value
+            return value
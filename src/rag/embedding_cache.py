@@ -0,0 +1,137 @@
+"""
+Embedding Cache - LRU + on-disk cache in front of an embedding function.
+Recurring texts (default query, interest queries, unchanged documents) are
+embedded once and then served locally.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+DEFAULT_CACHE_PATH = Path(__file__).parent.parent.parent / "database" / "embedding_cache.sqlite3"
+DEFAULT_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+
+
+class CachedEmbeddingFunction:
+    """
+    Wraps an embedding function with a text -> vector cache.
+
+    Follows ChromaDB's EmbeddingFunction interface (`__call__(self, input)`)
+    without importing chromadb, so the NumPy backend can use it too.
+
+    Keys include the model name, so switching models never serves stale
+    vectors. Misses within one call are embedded in a single batch.
+    """
+
+    def __init__(
+        self,
+        embedding_function,
+        model_name: str,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        cache_path: Optional[str] = None
+    ):
+        self.embedding_function = embedding_function
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.counters = {"hits": 0, "disk_hits": 0, "misses": 0, "remote_calls": 0}
+
+        if cache_path:
+            try:
+                self._db = sqlite3.connect(str(cache_path), check_same_thread=False, timeout=5)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️  Embedding cache disk tier disabled: {e}")
+                self._db = None
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        """Insert into the LRU tier (caller holds the lock)."""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, key: str) -> Optional[np.ndarray]:
+        """Memory first, then disk (caller holds the lock)."""
+        vector = self._memory.get(key)
+        if vector is not None:
+            self._memory.move_to_end(key)
+            return vector
+
+        if self._db is not None:
+            try:
+                row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error:
+                row = None
+            if row:
+                vector = np.frombuffer(row[0], dtype=np.float32)
+                self._remember(key, vector)
+                self.counters["disk_hits"] += 1
+                return vector
+        return None
+
+    def __call__(self, input: List[str]) -> List[np.ndarray]:
+        keys = [self._key(text) for text in input]
+        vectors: List[Optional[np.ndarray]] = [None] * len(input)
+        missing: Dict[str, List[int]] = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._lookup(key)
+                if vector is not None:
+                    vectors[i] = vector
+                    self.counters["hits"] += 1
+                else:
+                    missing.setdefault(key, []).append(i)
+                    self.counters["misses"] += 1
+
+        if missing:
+            # Duplicate texts within the batch are embedded once
+            texts = [input[positions[0]] for positions in missing.values()]
+            embedded = self.embedding_function(texts)
+            with self._lock:
+                self.counters["remote_calls"] += 1
+                rows = []
+                for (key, positions), vector in zip(missing.items(), embedded):
+                    vector = np.asarray(vector, dtype=np.float32)
+                    self._remember(key, vector)
+                    rows.append((key, vector.tobytes()))
+                    for i in positions:
+                        vectors[i] = vector
+                if self._db is not None:
+                    try:
+                        self._db.executemany(
+                            "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows
+                        )
+                        self._db.commit()
+                    except sqlite3.Error as e:
+                        print(f"⚠️  Embedding cache write failed: {e}")
+
+        return vectors
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "disk_enabled": self._db is not None
+            }
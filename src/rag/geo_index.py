@@ -0,0 +1,97 @@
+"""
+Geo Index - Uniform grid over catalog coordinates for proximity queries.
+Points are bucketed into ~cell_km square cells; a radius query only computes
+haversine distances for the cells its bounding box touches.
+"""
+
+import math
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance in km (scalars or NumPy arrays, broadcast)."""
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class GeoIndex:
+    """
+    Grid index over points given as parallel lat/lng arrays.
+
+    Rows with NaN coordinates are not indexed. Queries return row positions,
+    so callers can combine results with their own per-row masks.
+    """
+
+    def __init__(self, lats: np.ndarray, lngs: np.ndarray, cell_km: float = 0.5):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lngs = np.asarray(lngs, dtype=np.float64)
+        self.indexed = np.flatnonzero(~(np.isnan(self.lats) | np.isnan(self.lngs)))
+
+        # Cell size in degrees, using the longitude scale at the data's mean latitude
+        ref_lat = float(self.lats[self.indexed].mean()) if len(self.indexed) else 0.0
+        self.cell_lat = cell_km / KM_PER_DEGREE_LAT
+        self.cell_lng = cell_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(ref_lat)), 0.01))
+
+        cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        for pos in self.indexed:
+            cells[self._cell(self.lats[pos], self.lngs[pos])].append(int(pos))
+        self.cells = {cell: np.array(rows, dtype=np.int64) for cell, rows in cells.items()}
+
+    def __len__(self) -> int:
+        return len(self.indexed)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell_lat)), int(math.floor(lng / self.cell_lng))
+
+    def _candidates(self, lat: float, lng: float, radius_km: float) -> np.ndarray:
+        """Rows in the cells overlapping the query's bounding box."""
+        # Widen the longitude span for the query latitude, which may differ from ref_lat
+        lat_span = radius_km / KM_PER_DEGREE_LAT
+        lng_span = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(abs(lat) + lat_span)), 0.01))
+        row_lo, col_lo = self._cell(lat - lat_span, lng - lng_span)
+        row_hi, col_hi = self._cell(lat + lat_span, lng + lng_span)
+
+        if (row_hi - row_lo + 1) * (col_hi - col_lo + 1) > len(self.cells):
+            return self.indexed
+        found = [
+            self.cells[(row, col)]
+            for row in range(row_lo, row_hi + 1)
+            for col in range(col_lo, col_hi + 1)
+            if (row, col) in self.cells
+        ]
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+    def within(
+        self,
+        lat: float,
+        lng: float,
+        radius_km: float,
+        mask: Optional[np.ndarray] = None,
+        limit: Optional[int] = None
+    ) -> List[Tuple[int, float]]:
+        """(row, distance_km) pairs within radius_km, nearest first."""
+        rows = self._candidates(lat, lng, radius_km)
+        if mask is not None and len(rows):
+            rows = rows[mask[rows]]
+        if not len(rows):
+            return []
+
+        distances = haversine_km(lat, lng, self.lats[rows], self.lngs[rows])
+        keep = distances <= radius_km
+        rows, distances = rows[keep], distances[keep]
+
+        order = np.lexsort((rows, distances))
+        if limit is not None:
+            order = order[:limit]
+        return [(int(rows[i]), float(distances[i])) for i in order]
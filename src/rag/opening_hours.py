@@ -0,0 +1,217 @@
+"""
+Opening Hours - Catalog opening hours parsed once into minute intervals.
+POIs use opening_hours "HH:MM-HH:MM", restaurants opens_at/closing_hours.
+Closing at or before opening means the place closes after midnight (the
+interval spills into the next day). Optional weekday rules come from
+`closed_on` (e.g. ["monday"]) or a per-weekday `opening_hours` dict.
+"""
+
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from src.rag.catalog import get_catalog, CatalogSnapshot
+
+
+MINUTES_PER_DAY = 24 * 60
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+# Column used when no weekday is given: the place's regular daily hours
+ANY_DAY = len(WEEKDAYS)
+
+CLOSED = -1
+
+Day = Union[int, date, None]
+
+
+def parse_hhmm(value: Optional[str]) -> Optional[int]:
+    """"HH:MM" -> minute of day, or None."""
+    try:
+        hours, minutes = value.strip().split(":")
+        return int(hours) * 60 + int(minutes)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _interval(opens: Optional[int], closes: Optional[int]) -> Tuple[int, int]:
+    """Normalise to opens < closes; overnight closing goes past MINUTES_PER_DAY."""
+    opens = 0 if opens is None else opens
+    if closes is None:
+        return opens, MINUTES_PER_DAY
+    if closes == opens:
+        return opens, opens + MINUTES_PER_DAY  # round the clock
+    if closes < opens:
+        closes += MINUTES_PER_DAY
+    if (opens, closes) == (0, MINUTES_PER_DAY - 1):
+        closes = MINUTES_PER_DAY  # "00:00-23:59"
+    return opens, closes
+
+
+def _parse_range(value: Any) -> Optional[Tuple[Optional[int], Optional[int]]]:
+    """"HH:MM-HH:MM" -> (opens, closes) minutes, or None if not a range."""
+    if isinstance(value, str) and "-" in value:
+        start, _, end = value.partition("-")
+        return parse_hhmm(start), parse_hhmm(end)
+    return None
+
+
+def _weekday_index(value: Any) -> Optional[int]:
+    if isinstance(value, int) and 0 <= value < len(WEEKDAYS):
+        return value
+    if isinstance(value, str):
+        return {name: i for i, name in enumerate(WEEKDAYS)}.get(value.strip().lower()[:3])
+    return None
+
+
+def weekly_hours(record: Dict[str, Any]) -> List[Optional[Tuple[int, int]]]:
+    """
+    Intervals for Monday..Sunday plus the regular daily hours (index ANY_DAY);
+    None means closed. Unknown hours count as open all day.
+    """
+    hours = record.get("opening_hours")
+    if isinstance(hours, dict):
+        default = _parse_range(hours.get("default"))
+        daily = _interval(*default) if default else (0, MINUTES_PER_DAY)
+        week: List[Optional[Tuple[int, int]]] = [daily] * len(WEEKDAYS)
+        for key, value in hours.items():
+            day = _weekday_index(key)
+            if day is None:
+                continue
+            parsed = _parse_range(value)
+            week[day] = _interval(*parsed) if parsed else None
+    else:
+        parsed = _parse_range(hours)
+        if parsed is None and (record.get("opens_at") or record.get("closing_hours")):
+            parsed = parse_hhmm(record.get("opens_at")), parse_hhmm(record.get("closing_hours"))
+        daily = _interval(*parsed) if parsed else (0, MINUTES_PER_DAY)
+        week = [daily] * len(WEEKDAYS)
+
+    for closed in record.get("closed_on") or []:
+        day = _weekday_index(closed)
+        if day is not None:
+            week[day] = None
+
+    return week + [daily]
+
+
+def time_window(record: Dict[str, Any]) -> Tuple[int, int]:
+    """(opens, closes) minutes of day for the regular daily hours of a record."""
+    return weekly_hours(record)[ANY_DAY]
+
+
+def weekday_column(day: Day) -> int:
+    """0-6 for a weekday number or date; ANY_DAY for None."""
+    if day is None:
+        return ANY_DAY
+    if isinstance(day, date):
+        return day.weekday()
+    return int(day) % len(WEEKDAYS)
+
+
+class OpeningHoursIndex:
+    """
+    Opening intervals for every catalog entity as (N, 8) minute arrays:
+    columns 0-6 are Monday..Sunday, column 7 the regular daily hours.
+    Closed days hold CLOSED in both arrays.
+    """
+
+    def __init__(self, records: Iterable[Dict[str, Any]]):
+        records = [r for r in records if "id" in r]
+        self.ids: List[str] = [r["id"] for r in records]
+        self.positions: Dict[str, int] = {entity_id: i for i, entity_id in enumerate(self.ids)}
+
+        self.opens = np.full((len(self.ids), ANY_DAY + 1), CLOSED, dtype=np.int16)
+        self.closes = np.full((len(self.ids), ANY_DAY + 1), CLOSED, dtype=np.int16)
+        for i, record in enumerate(records):
+            for column, interval in enumerate(weekly_hours(record)):
+                if interval:
+                    self.opens[i, column], self.closes[i, column] = interval
+        self.opens.flags.writeable = False
+        self.closes.flags.writeable = False
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, entity_id: str) -> bool:
+        return entity_id in self.positions
+
+    def _covers(self, rows, day: Day, start: int, end: int) -> np.ndarray:
+        """Rows open for the whole [start, end] (minutes of the given day)."""
+        column = weekday_column(day)
+        opens, closes = self.opens[rows, column], self.closes[rows, column]
+        covered = (opens != CLOSED) & (opens <= start) & (end <= closes)
+
+        # Yesterday's after-midnight hours (only known for real weekdays)
+        if column != ANY_DAY:
+            previous = (column - 1) % len(WEEKDAYS)
+            spill = self.closes[rows, previous].astype(np.int32) - MINUTES_PER_DAY
+            covered |= (self.opens[rows, previous] != CLOSED) & (spill > 0) & (end <= spill)
+        else:
+            spill = closes.astype(np.int32) - MINUTES_PER_DAY
+            covered |= (opens != CLOSED) & (spill > 0) & (end <= spill)
+
+        # A visit past midnight continues into the next day's hours if they start at 00:00
+        if end > MINUTES_PER_DAY:
+            following = ANY_DAY if column == ANY_DAY else (column + 1) % len(WEEKDAYS)
+            covered |= (
+                (opens != CLOSED) & (opens <= start) & (closes >= MINUTES_PER_DAY)
+                & (self.opens[rows, following] == 0) & (end - MINUTES_PER_DAY <= self.closes[rows, following])
+            )
+        return covered
+
+    def is_open(self, entity_id: str, day: Day, minute: int) -> bool:
+        """
+        Whether the entity is open at this minute of the day (weekday 0-6,
+        a date, or None for its regular hours). Unknown entities count as open.
+        """
+        row = self.positions.get(entity_id)
+        if row is None:
+            return True
+        return bool(self._covers([row], day, minute, minute)[0])
+
+    def open_between(self, entity_id: str, day: Day, start: int, end: int) -> bool:
+        """Whether the entity stays open for the whole visit [start, end]."""
+        row = self.positions.get(entity_id)
+        if row is None:
+            return True
+        return bool(self._covers([row], day, start, end)[0])
+
+    def window(self, entity_id: str, day: Day = None) -> Optional[Tuple[int, int]]:
+        """(opens, closes) on that day, or None if closed or unknown."""
+        row = self.positions.get(entity_id)
+        if row is None:
+            return None
+        column = weekday_column(day)
+        if self.opens[row, column] == CLOSED:
+            return None
+        return int(self.opens[row, column]), int(self.closes[row, column])
+
+    def open_in_window(
+        self,
+        start: int,
+        end: Optional[int] = None,
+        day: Day = None,
+        ids: Optional[Iterable[str]] = None
+    ) -> List[str]:
+        """IDs (optionally among `ids`, order kept) open for the whole [start, end]."""
+        end = start if end is None else end
+        if ids is None:
+            rows = np.arange(len(self.ids))
+        else:
+            rows = np.array([self.positions[i] for i in ids if i in self.positions], dtype=np.int64)
+        if not len(rows):
+            return []
+        covered = self._covers(rows, day, start, end)
+        return [self.ids[row] for row in rows[covered]]
+
+
+def _build_opening_hours(catalog: CatalogSnapshot) -> OpeningHoursIndex:
+    return OpeningHoursIndex(catalog.pois + catalog.restaurants + catalog.hotels)
+
+
+def get_opening_hours(catalog: CatalogSnapshot = None) -> OpeningHoursIndex:
+    """Opening-hours index for a catalog snapshot (default: the shared database/ catalog)."""
+    catalog = catalog or get_catalog()
+    return catalog.derive("opening_hours", _build_opening_hours)
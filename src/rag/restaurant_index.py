@@ -0,0 +1,146 @@
+"""
+Restaurant Index - Restaurants bucketed by open-time slot and price band.
+Each bucket is pre-sorted by rating, so picking a meal scans a few rows of
+the right buckets instead of the whole restaurant list. Exact opening hours
+(weekday rules, full meal length) are confirmed with the OpeningHoursIndex.
+"""
+
+import bisect
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.rag.catalog import get_catalog, CatalogSnapshot
+from src.rag.opening_hours import (
+    Day, MINUTES_PER_DAY, OpeningHoursIndex, get_opening_hours, weekly_hours
+)
+from src.rag.travel import TravelMatrix, get_travel_matrix
+
+
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = MINUTES_PER_DAY // SLOT_MINUTES
+
+# Average check upper bounds (USD) of the price bands; the last band is open-ended
+PRICE_BAND_EDGES = (10.0, 20.0, 35.0)
+
+# Proximity ranking: rating points given up per 10 minutes of travel from the previous stop
+PROXIMITY_WEIGHT = 0.1
+
+DEFAULT_CHECK_USD = 15
+DEFAULT_RATING = 4.0
+
+
+def price_band(price: float) -> int:
+    return bisect.bisect_left(PRICE_BAND_EDGES, price)
+
+
+class RestaurantIndex:
+    """
+    buckets[slot][band] -> restaurant rows, best rated first (catalog order
+    breaks ties). A restaurant is in every slot in which it is open on any day.
+    """
+
+    def __init__(
+        self,
+        restaurants: Iterable[Dict[str, Any]],
+        opening_hours: OpeningHoursIndex,
+        travel: Optional[TravelMatrix] = None
+    ):
+        self.records: List[Dict[str, Any]] = [r for r in restaurants if "id" in r]
+        self.opening_hours = opening_hours
+        self.travel = travel
+        self.prices = [r.get("avg_check_usd", DEFAULT_CHECK_USD) for r in self.records]
+        self.ratings = [r.get("rating", DEFAULT_RATING) for r in self.records]
+
+        bands = len(PRICE_BAND_EDGES) + 1
+        self.buckets: List[List[List[int]]] = [[[] for _ in range(bands)] for _ in range(SLOTS_PER_DAY)]
+        for row, record in enumerate(self.records):
+            band = price_band(self.prices[row])
+            for slot in sorted(self._open_slots(record)):
+                self.buckets[slot][band].append(row)
+
+        for slot in self.buckets:
+            for rows in slot:
+                rows.sort(key=lambda row: (-self.ratings[row], row))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _open_slots(self, record: Dict[str, Any]) -> set:
+        """Slots touched by any of the record's opening intervals (after-midnight hours wrap)."""
+        slots = set()
+        for interval in weekly_hours(record):
+            if not interval:
+                continue
+            opens, closes = interval
+            first, last = opens // SLOT_MINUTES, min(closes, 2 * MINUTES_PER_DAY - 1) // SLOT_MINUTES
+            slots.update(slot % SLOTS_PER_DAY for slot in range(first, last + 1))
+        return slots
+
+    def _travel_minutes(self, near: Optional[str], row: int) -> float:
+        if not near or self.travel is None:
+            return 0.0
+        return self.travel.travel_minutes(near, self.records[row]["id"])
+
+    def best(
+        self,
+        start: int,
+        minutes: int = 0,
+        day: Day = None,
+        max_price: Optional[float] = None,
+        exclude: Iterable[str] = (),
+        near: Optional[str] = None,
+        cheapest: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Restaurant open for the whole [start, start + minutes] on `day` with
+        an average check up to max_price, skipping IDs in `exclude`.
+        Best rated by default, or cheapest (then best rated) with cheapest=True.
+        With `near` (the previous stop's ID) travel time from it counts
+        against rating, or breaks price ties when cheapest.
+        """
+        exclude = exclude if isinstance(exclude, (set, frozenset)) else set(exclude)
+        slot = (start // SLOT_MINUTES) % SLOTS_PER_DAY
+        buckets = self.buckets[slot]
+        last_band = len(buckets) - 1 if max_price is None else min(price_band(max_price), len(buckets) - 1)
+
+        def valid(row: int) -> bool:
+            record = self.records[row]
+            return (
+                record["id"] not in exclude
+                and (max_price is None or self.prices[row] <= max_price)
+                and self.opening_hours.open_between(record["id"], day, start, start + minutes)
+            )
+
+        if cheapest:
+            # Bands are disjoint price ranges, so the cheapest match is in the first band with one
+            for band in range(last_band + 1):
+                rows = [row for row in buckets[band] if valid(row)]
+                if rows:
+                    return self.records[min(rows, key=lambda row: (
+                        self.prices[row], self._travel_minutes(near, row), -self.ratings[row], row
+                    ))]
+            return None
+
+        if near and self.travel is not None:
+            rows = [row for band in range(last_band + 1) for row in buckets[band] if valid(row)]
+            if not rows:
+                return None
+            return self.records[max(rows, key=lambda row: (
+                self.ratings[row] - PROXIMITY_WEIGHT * self._travel_minutes(near, row) / 10, -row
+            ))]
+
+        # Rating order within each band: the first valid row of each band competes
+        leaders = [next((row for row in buckets[band] if valid(row)), None) for band in range(last_band + 1)]
+        leaders = [row for row in leaders if row is not None]
+        if not leaders:
+            return None
+        return self.records[min(leaders, key=lambda row: (-self.ratings[row], row))]
+
+
+def _build_restaurant_index(catalog: CatalogSnapshot) -> RestaurantIndex:
+    return RestaurantIndex(catalog.restaurants, get_opening_hours(catalog), get_travel_matrix(catalog))
+
+
+def get_restaurant_index(catalog: CatalogSnapshot = None) -> RestaurantIndex:
+    """Restaurant slot/price index for a catalog snapshot (default: the shared database/ catalog)."""
+    catalog = catalog or get_catalog()
+    return catalog.derive("restaurant_slots", _build_restaurant_index)
@@ -3,15 +3,36 @@ Hybrid RAG Retriever - Metadata Filters + Semantic Search.
 Combines deterministic filtering with embedding-based similarity.
 """
 
+import hashlib
 import json
+import os
 import sys
+import threading
 from pathlib import Path
 from typing import List, Optional, Dict, Any, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+
+import numpy as np
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from src.models.schemas import POI, TripRequest, RetrievalResult, PhysicalLevel
+from src.rag.catalog import get_catalog, CatalogSnapshot
+from src.rag.columns import POIColumns
+from src.rag.geo_index import GeoIndex
+from src.rag.text_index import BM25Index, stem, tokenize
+
+MOUNTAIN_TAGS = ["mountains", "day2_mountains", "nature", "trekking", "hiking"]
+MOUNTAIN_DAY_TAGS = ["day2_mountains", "mountains", "nature", "trekking"]
+
+# Additive relevance boosts (precomputed per POI in _build_columns)
+TAG_BOOSTS = {"must-see": 0.3, "unesco": 0.2, "photography": 0.1}
+FREE_BOOST = 0.1
+MOUNTAIN_BOOST = 0.5
+
+# "chroma" (persistent ChromaDB, default) or "numpy" (in-process exact search)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
+EMBEDDING_MODEL = "text-embedding-3-small"
 
 
 @dataclass
@@ -27,6 +48,28 @@ class FilterCriteria:
     day_specific: int = None  # For constraints like "mountains on day 2"
 
 
+@dataclass
+class KeywordIndex:
+    """Precomputed structures for the keyword search path (one per catalog snapshot)."""
+    bm25: BM25Index
+    name_tokens: Dict[str, set]   # poi_id -> stemmed name tokens
+    tag_sets: Dict[str, set]      # poi_id -> lowercase tags/categories and their stems
+
+
+@dataclass(frozen=True)
+class RetrieverState:
+    """
+    Everything the retriever derives from one catalog snapshot. Replaced as a
+    whole on a catalog change, so a search never mixes two snapshots.
+    """
+    catalog_version: Optional[str] = None
+    pois: Dict[str, POI] = field(default_factory=dict)
+    poi_texts: Dict[str, str] = field(default_factory=dict)  # For semantic search
+    columns: Optional[POIColumns] = None  # Vectorised filters and boosts
+    geo_index: Optional[GeoIndex] = None  # Proximity queries
+    keyword_index: Optional[KeywordIndex] = None  # For keyword fallback
+
+
 class HybridPOIRetriever:
     """
     Hybrid RAG retriever combining:
@@ -41,8 +84,7 @@ class HybridPOIRetriever:
     
     def __init__(self, data_path: str = None):
         self.data_path = data_path or str(Path(__file__).parent.parent.parent / "database" / "poi.json")
-        self.pois: Dict[str, POI] = {}
-        self.poi_texts: Dict[str, str] = {}  # For semantic search
+        self.state = RetrieverState()
         
         # Embedding model
         self.embedder = None
@@ -51,49 +93,129 @@ class HybridPOIRetriever:
         # ChromaDB collection
         self.collection = None
         self.use_vectors = False
+        self.embedding_cache = None  # CachedEmbeddingFunction when OpenAI embeddings are on
+        self._index_lock = threading.Lock()
         
         self._load_data()
         self._init_embeddings()
 
+    # Current snapshot's data (read self.state once when several are needed together)
+    
+    @property
+    def pois(self) -> Dict[str, POI]:
+        return self.state.pois
+    
+    @property
+    def poi_texts(self) -> Dict[str, str]:
+        return self.state.poi_texts
+    
+    @property
+    def columns(self) -> Optional[POIColumns]:
+        return self.state.columns
+    
+    @property
+    def geo_index(self) -> Optional[GeoIndex]:
+        return self.state.geo_index
+    
+    @property
+    def keyword_index(self) -> Optional[KeywordIndex]:
+        return self.state.keyword_index
+    
+    @property
+    def catalog_version(self) -> Optional[str]:
+        return self.state.catalog_version
+
     def _load_data(self):
-        """Load POI data from JSON file."""
+        """Load POI data from the shared catalog snapshot (swapped in with one assignment)."""
         try:
-            # Load basic POIs
-            with open(self.data_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            catalog = get_catalog(Path(self.data_path).parent)
+            self.state = catalog.derive("retriever_state", self._build_state)
+            print(f"✅ Loaded {len(self.state.pois)} POIs (catalog {catalog.version})")
+        except Exception as e:
+            print(f"⚠️  Error loading POI data: {e}")
+
+    def _build_state(self, catalog: CatalogSnapshot) -> RetrieverState:
+        """All per-snapshot structures in one immutable object (built once per snapshot)."""
+        pois, texts = catalog.derive("retriever_pois", self._build_pois)
+        return RetrieverState(
+            catalog_version=catalog.version,
+            pois=pois,
+            poi_texts=texts,
+            columns=catalog.derive("retriever_columns", self._build_columns),
+            geo_index=catalog.derive("retriever_geo_index", self._build_geo_index),
+            keyword_index=catalog.derive("retriever_keyword_index", self._build_keyword_index)
+        )
+
+    def _build_pois(self, catalog: CatalogSnapshot) -> Tuple[Dict[str, POI], Dict[str, str]]:
+        """Validate catalog records into POI models (built once per snapshot)."""
+        pois: Dict[str, POI] = {}
+        texts: Dict[str, str] = {}
+        
+        for poi_data in catalog.pois:
+            poi = POI.model_validate(poi_data)
+            pois[poi.id] = poi
+            texts[poi.id] = self._create_searchable_text(poi)
+        
+        # Hotels and Restaurants
+        try:
+            for rest_data in catalog.restaurants:
+                poi = self._convert_restaurant_to_poi(rest_data)
+                pois[poi.id] = poi
+                texts[poi.id] = self._create_searchable_text(poi)
             
-            for poi_data in data.get("poi", []):
-                poi = POI.model_validate(poi_data)
-                self.pois[poi.id] = poi
-                self.poi_texts[poi.id] = self._create_searchable_text(poi)
+            for hotel_data in catalog.hotels:
+                poi = self._convert_hotel_to_poi(hotel_data)
+                pois[poi.id] = poi
+                texts[poi.id] = self._create_searchable_text(poi)
             
-            # Load Hotels and Restaurants
-            extra_path = str(Path(self.data_path).parent / "hotels_restaurants.json")
-            if Path(extra_path).exists():
+            print(f"   Loaded extra {len(catalog.restaurants)} restaurants and {len(catalog.hotels)} hotels")
+        except Exception as e:
+            print(f"⚠️  Error loading extra data: {e}")
+        
+        return pois, texts
+
+    def _build_keyword_index(self, catalog: CatalogSnapshot) -> KeywordIndex:
+        """Tokenise POI texts into a BM25 index (built once per snapshot)."""
+        pois, texts = catalog.derive("retriever_pois", self._build_pois)
+        
+        tag_sets = {}
+        for poi_id, poi in pois.items():
+            tags = {t.lower() for t in poi.tags + poi.category}
+            tag_sets[poi_id] = tags | {stem(t) for t in tags}
+        
+        return KeywordIndex(
+            bm25=BM25Index(texts),
+            name_tokens={pid: set(tokenize(f"{p.name} {p.name_en or ''}")) for pid, p in pois.items()},
+            tag_sets=tag_sets
+        )
+
+    def _build_columns(self, catalog: CatalogSnapshot) -> POIColumns:
+        """Column arrays, tag masks and boost vectors (built once per snapshot)."""
+        pois, _ = catalog.derive("retriever_pois", self._build_pois)
+        columns = POIColumns(pois)
+        
+        static_boost = np.where(columns.cost == 0, FREE_BOOST, 0.0)
+        for tag, boost in TAG_BOOSTS.items():
+            static_boost = static_boost + boost * columns.tag_mask(tag)
+        columns.static_boost = static_boost
+        columns.mountain_boost = MOUNTAIN_BOOST * columns.any_tag_mask(MOUNTAIN_TAGS)
+        return columns
+
+    def _build_geo_index(self, catalog: CatalogSnapshot) -> GeoIndex:
+        """Grid index over POI/restaurant/hotel coordinates (built once per snapshot)."""
+        columns = catalog.derive("retriever_columns", self._build_columns)
+        return GeoIndex(columns.lat, columns.lng)
+
+    def _sync_catalog(self):
+        """Pick up a newer catalog snapshot if the data files changed."""
+        catalog = get_catalog(Path(self.data_path).parent)
+        if catalog.version != self.catalog_version:
+            self._load_data()
+            if self.use_vectors:
                 try:
-                    with open(extra_path, "r", encoding="utf-8") as f:
-                        extra_data = json.load(f)
-                    
-                    # Process Restaurants
-                    for rest_data in extra_data.get("restaurants", []):
-                        poi = self._convert_restaurant_to_poi(rest_data)
-                        self.pois[poi.id] = poi
-                        self.poi_texts[poi.id] = self._create_searchable_text(poi)
-                        
-                    # Process Hotels
-                    for hotel_data in extra_data.get("hotels", []):
-                        poi = self._convert_hotel_to_poi(hotel_data)
-                        self.pois[poi.id] = poi
-                        self.poi_texts[poi.id] = self._create_searchable_text(poi)
-                        
-                    print(f"   Loaded extra {len(extra_data.get('restaurants', []))} restaurants and {len(extra_data.get('hotels', []))} hotels")
+                    self._index_pois()
                 except Exception as e:
-                    print(f"⚠️  Error loading extra data: {e}")
-            
-            
-            print(f"✅ Loaded {len(self.pois)} POIs")
-        except Exception as e:
-            print(f"⚠️  Error loading POI data: {e}")
+                    print(f"⚠️  Re-indexing after catalog change failed: {e}")
 
     def _convert_restaurant_to_poi(self, data: dict) -> POI:
         """Convert restaurant data to POI."""
@@ -152,13 +274,61 @@ class HybridPOIRetriever:
         ]
         return " ".join(filter(None, parts))
     
+    def _openai_key(self) -> Optional[str]:
+        key = os.getenv("OPENAI_API_KEY")
+        if key and key not in ["sk-your-key-here", "sk-ваш-ключ-здесь"]:
+            return key
+        return None
+    
+    def _cached_embeddings(self, embedding_function):
+        """Put the query/document embedding cache in front of an embedding function."""
+        from src.rag.embedding_cache import CachedEmbeddingFunction, DEFAULT_CACHE_PATH
+        
+        # Recurring query texts are served from the cache instead of the API
+        self.embedding_cache = CachedEmbeddingFunction(
+            embedding_function,
+            model_name=EMBEDDING_MODEL,
+            cache_path=os.getenv("EMBEDDING_CACHE_DB", str(DEFAULT_CACHE_PATH)) or None
+        )
+        return self.embedding_cache
+    
     def _init_embeddings(self):
-        """Initialize embedding model and index POIs with OpenAI or fallback."""
+        """Initialize embedding model and index POIs with the configured vector backend."""
+        if VECTOR_BACKEND == "numpy":
+            if self._init_numpy_index():
+                return
+            print("   Falling back to ChromaDB")
+        self._init_chroma()
+    
+    def _init_numpy_index(self) -> bool:
+        """In-process NumPy index (needs OpenAI embeddings; no ChromaDB import)."""
+        openai_key = self._openai_key()
+        if not openai_key:
+            print("⚠️  NumPy vector backend needs OPENAI_API_KEY for embeddings")
+            return False
+        
+        try:
+            from src.rag.vector_index import NumpyVectorIndex, OpenAIEmbedder
+            
+            embedding_function = self._cached_embeddings(OpenAIEmbedder(openai_key, EMBEDDING_MODEL))
+            self.collection = NumpyVectorIndex("samarkand_poi_openai", embedding_function)
+            
+            # Embed only POIs that are new or changed since the last run
+            self._index_pois()
+            
+            self.use_vectors = True
+            print(f"✅ NumPy vector index ready with {self.collection.count()} embeddings (memory-mapped)")
+            return True
+        except Exception as e:
+            print(f"⚠️  Error initializing NumPy vector index: {e}")
+            self.collection = None
+            self.use_vectors = False
+            return False
+    
+    def _init_chroma(self):
+        """ChromaDB collection with OpenAI embeddings, or Chroma's default model."""
         try:
             import chromadb
-            from chromadb.config import Settings
-            import os
-            from pathlib import Path
             
             # Use persistent storage
             persist_dir = str(Path(__file__).parent.parent.parent / "database" / "chroma_db")
@@ -166,16 +336,17 @@ class HybridPOIRetriever:
             
             # Try OpenAI embeddings first for better quality
             embedding_function = None
-            openai_key = os.getenv("OPENAI_API_KEY")
+            openai_key = self._openai_key()
             
-            if openai_key and openai_key not in ["sk-your-key-here", "sk-ваш-ключ-здесь"]:
+            if openai_key:
                 try:
                     from chromadb.utils.embedding_functions import OpenAIEmbeddingFunction
-                    embedding_function = OpenAIEmbeddingFunction(
+                    
+                    embedding_function = self._cached_embeddings(OpenAIEmbeddingFunction(
                         api_key=openai_key,
-                        model_name="text-embedding-3-small"
-                    )
-                    print("✅ Using OpenAI embeddings (text-embedding-3-small)")
+                        model_name=EMBEDDING_MODEL
+                    ))
+                    print(f"✅ Using OpenAI embeddings ({EMBEDDING_MODEL})")
                 except Exception as e:
                     print(f"⚠️  OpenAI embeddings not available: {e}")
             
@@ -190,9 +361,8 @@ class HybridPOIRetriever:
                 metadata={"hnsw:space": "cosine"}
             )
             
-            # Index POIs if collection is empty
-            if self.collection.count() == 0:
-                self._index_pois()
+            # Embed only POIs that are new or changed since the last run
+            self._index_pois()
             
             self.use_vectors = True
             print(f"✅ Vector store ready with {self.collection.count()} embeddings (persistent)")
@@ -205,40 +375,70 @@ class HybridPOIRetriever:
             print(f"⚠️  Error initializing embeddings: {e}")
             self.use_vectors = False
     
+    def _index_metadata(self, poi: POI) -> Dict[str, Any]:
+        """Vector-store metadata for one POI (used by filters)."""
+        return {
+            "name": poi.name,
+            "categories": ",".join(poi.category),
+            "cost_usd": poi.cost_usd,
+            "duration_hours": poi.duration_hours,
+            "physical_level": poi.physical_level.value if hasattr(poi.physical_level, 'value') else str(poi.physical_level),
+            "tags": ",".join(poi.tags),
+            "district": poi.district,
+            "best_time": poi.best_time,
+            "is_mountain": "true" if any(t in poi.tags for t in ["mountains", "day2_mountains", "nature", "trekking"]) else "false",
+            "is_must_see": "true" if "must-see" in poi.tags else "false"
+        }
+    
     def _index_pois(self):
-        """Index all POIs with rich metadata."""
+        """
+        Bring the collection in line with the catalog.
+        Each document stores a hash of its text and metadata; only new or
+        changed POIs are (re-)embedded and removed POIs are deleted.
+        """
         if not self.collection:
             return
         
-        documents = []
-        metadatas = []
-        ids = []
-        
-        for poi_id, poi in self.pois.items():
-            documents.append(self.poi_texts[poi_id])
+        state = self.state
+        with self._index_lock:
+            stored = self.collection.get(include=["metadatas"])
+            stored_hashes = {
+                doc_id: (meta or {}).get("content_hash")
+                for doc_id, meta in zip(stored["ids"], stored["metadatas"] or [])
+            }
             
-            metadatas.append({
-                "name": poi.name,
-                "categories": ",".join(poi.category),
-                "cost_usd": poi.cost_usd,
-                "duration_hours": poi.duration_hours,
-                "physical_level": poi.physical_level.value if hasattr(poi.physical_level, 'value') else str(poi.physical_level),
-                "tags": ",".join(poi.tags),
-                "district": poi.district,
-                "best_time": poi.best_time,
-                "is_mountain": "true" if any(t in poi.tags for t in ["mountains", "day2_mountains", "nature", "trekking"]) else "false",
-                "is_must_see": "true" if "must-see" in poi.tags else "false"
-            })
+            documents = []
+            metadatas = []
+            ids = []
             
-            ids.append(poi_id)
-        
-        self.collection.add(
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids
-        )
-        
-        print(f"   Indexed {len(documents)} POIs with metadata")
+            for poi_id, poi in state.pois.items():
+                document = state.poi_texts[poi_id]
+                metadata = self._index_metadata(poi)
+                content_hash = hashlib.sha1(
+                    json.dumps([document, metadata], ensure_ascii=False, sort_keys=True).encode("utf-8")
+                ).hexdigest()
+                if stored_hashes.get(poi_id) == content_hash:
+                    continue
+                
+                metadata["content_hash"] = content_hash
+                documents.append(document)
+                metadatas.append(metadata)
+                ids.append(poi_id)
+            
+            removed = [doc_id for doc_id in stored_hashes if doc_id not in state.pois]
+            
+            if ids:
+                self.collection.upsert(
+                    documents=documents,
+                    metadatas=metadatas,
+                    ids=ids
+                )
+            if removed:
+                self.collection.delete(ids=removed)
+            
+            if ids or removed:
+                print(f"   Indexed {len(ids)} changed POIs, removed {len(removed)} "
+                      f"({len(state.pois) - len(ids)} unchanged)")
     
     def search(
         self,
@@ -257,6 +457,8 @@ class HybridPOIRetriever:
         4. Return top-k
         """
         
+        self._sync_catalog()
+        
         # Step 1: Build filter criteria from trip request
         if trip_request and not filters:
             filters = self._build_filters_from_request(trip_request)
@@ -322,6 +524,48 @@ class HybridPOIRetriever:
         
         return " ".join(parts)
     
+    def search_many(
+        self,
+        queries: List[str],
+        filters: FilterCriteria = None,
+        top_k: int = 15
+    ) -> List[List[RetrievalResult]]:
+        """
+        Run several queries with the same filters.
+        Vector mode embeds all queries in one batch and issues a single
+        ChromaDB query. Returns one result list per query, in order.
+        """
+        
+        self._sync_catalog()
+        
+        queries = [q or "достопримечательности Самарканд" for q in queries]
+        if not queries:
+            return []
+        
+        if self.use_vectors and self.collection:
+            return self._hybrid_search_many(queries, filters, top_k)
+        return [self._keyword_search(q, filters, top_k) for q in queries]
+    
+    def _build_where_filter(self, filters: FilterCriteria) -> Optional[Dict]:
+        """Translate filter criteria into a ChromaDB where clause."""
+        if not filters:
+            return None
+        
+        where_conditions = []
+        
+        if filters.max_cost_usd is not None:
+            where_conditions.append({"cost_usd": {"$lte": filters.max_cost_usd}})
+        
+        if filters.required_tags:
+            # Search for mountain-related content
+            where_conditions.append({"is_mountain": "true"})
+        
+        if len(where_conditions) == 1:
+            return where_conditions[0]
+        elif len(where_conditions) > 1:
+            return {"$and": where_conditions}
+        return None
+    
     def _hybrid_search(
         self,
         query: str,
@@ -329,71 +573,81 @@ class HybridPOIRetriever:
         top_k: int
     ) -> List[RetrievalResult]:
         """Hybrid search using ChromaDB with metadata filters."""
+        return self._hybrid_search_many([query], filters, top_k)[0]
+    
+    def _hybrid_search_many(
+        self,
+        queries: List[str],
+        filters: FilterCriteria,
+        top_k: int
+    ) -> List[List[RetrievalResult]]:
+        """Batched hybrid search: one ChromaDB call for all queries."""
         
-        # Build ChromaDB where filter
-        where_filter = {}
-        
-        if filters:
-            where_conditions = []
-            
-            if filters.max_cost_usd is not None:
-                where_conditions.append({"cost_usd": {"$lte": filters.max_cost_usd}})
-            
-            if filters.required_tags:
-                # Search for mountain-related content
-                where_conditions.append({"is_mountain": "true"})
-            
-            if len(where_conditions) == 1:
-                where_filter = where_conditions[0]
-            elif len(where_conditions) > 1:
-                where_filter = {"$and": where_conditions}
+        where_filter = self._build_where_filter(filters)
         
         # Semantic search with filters
         try:
             results = self.collection.query(
-                query_texts=[query],
+                query_texts=queries,
                 n_results=min(top_k * 2, 30),  # Get more for post-filtering
-                where=where_filter if where_filter else None
+                where=where_filter
             )
         except Exception as e:
             print(f"⚠️  ChromaDB query error: {e}")
             # Fallback to unfiltered search
             results = self.collection.query(
-                query_texts=[query],
+                query_texts=queries,
                 n_results=top_k * 2
             )
         
-        # Convert to RetrievalResults
-        retrieval_results = []
+        all_ids = (results or {}).get("ids") or [[] for _ in queries]
+        all_distances = (results or {}).get("distances")
+        
+        # Post-filter and boost once per distinct POI, shared by all queries
+        # (None = filtered out, otherwise the additive boost)
+        state = self.state
+        passes = self._filter_mask(state.columns, filters)
+        boost_vector = self._boost_vector(state.columns, filters)
+        positions = state.columns.positions
+        boosts: Dict[str, Optional[float]] = {}
+        for ids in all_ids:
+            for poi_id in ids:
+                if poi_id in boosts:
+                    continue
+                pos = positions.get(poi_id)
+                if pos is None or not passes[pos]:
+                    boosts[poi_id] = None
+                else:
+                    boosts[poi_id] = float(boost_vector[pos])
         
-        if results and results["ids"] and results["ids"][0]:
-            for i, poi_id in enumerate(results["ids"][0]):
-                if poi_id not in self.pois:
+        # Convert to RetrievalResults
+        batch = []
+        for qi, query in enumerate(queries):
+            ids = all_ids[qi] if qi < len(all_ids) else []
+            distances = all_distances[qi] if all_distances else None
+            retrieval_results = []
+            
+            for i, poi_id in enumerate(ids):
+                boost = boosts.get(poi_id)
+                if boost is None:
                     continue
                 
-                poi = self.pois[poi_id]
-                
-                # Additional post-filtering
-                if filters:
-                    if not self._passes_filters(poi, filters):
-                        continue
-                
                 # Calculate score (ChromaDB returns distances, convert to similarity)
-                distance = results["distances"][0][i] if results["distances"] else 0
-                score = 1.0 / (1.0 + distance)  # Convert distance to similarity
-                
-                # Boost scores
-                score = self._apply_score_boosts(poi, score, filters)
+                distance = distances[i] if distances else 0
+                score = 1.0 / (1.0 + distance) + boost
                 
+                poi = state.pois[poi_id]
                 retrieval_results.append(RetrievalResult(
                     poi=poi,
                     score=min(1.0, score),
                     matched_tags=self._get_matched_tags(poi, query)
                 ))
+            
+            # Sort by score and limit
+            retrieval_results.sort(key=lambda x: x.score, reverse=True)
+            batch.append(retrieval_results[:top_k])
         
-        # Sort by score and limit
-        retrieval_results.sort(key=lambda x: x.score, reverse=True)
-        return retrieval_results[:top_k]
+        return batch
     
     def _keyword_search(
         self,
@@ -401,32 +655,40 @@ class HybridPOIRetriever:
         filters: FilterCriteria,
         top_k: int
     ) -> List[RetrievalResult]:
-        """Fallback keyword-based search with filtering."""
+        """Fallback keyword search: BM25 over POI texts plus tag/name matches and boosts."""
+        
+        state = self.state
+        index, columns = state.keyword_index, state.columns
+        if index is None or columns is None:
+            return []
         
         query_terms = set(query.lower().split())
-        results = []
+        query_tokens = set(tokenize(query))
+        
+        bm25 = index.bm25.search(query_tokens)
+        best = max(bm25.values(), default=0.0)
         
-        for poi_id, poi in self.pois.items():
-            # Apply filters first (deterministic)
-            if filters and not self._passes_filters(poi, filters):
-                continue
+        # Only documents that match a term or carry a boost can score above zero;
+        # filters are applied first (deterministic) as one mask
+        boost_vector = self._boost_vector(columns, filters)
+        candidates = boost_vector > 0
+        candidates[[columns.positions[poi_id] for poi_id in bm25]] = True
+        candidates &= self._filter_mask(columns, filters)
+        
+        results = []
+        for pos in np.flatnonzero(candidates):
+            poi_id = columns.ids[pos]
+            poi = columns.pois[pos]
             
             # Calculate relevance score
-            score = 0
-            poi_text = self.poi_texts[poi_id].lower()
-            poi_tags = set([t.lower() for t in poi.tags + poi.category])
+            score = 0.6 * bm25.get(poi_id, 0.0) / best if best else 0.0
             
-            # Match query terms
-            for term in query_terms:
-                if term in poi_text:
-                    score += 0.2
-                if term in poi_tags:
-                    score += 0.4
-                if term in poi.name.lower():
-                    score += 0.3
+            tags = index.tag_sets[poi_id]
+            score += 0.4 * sum(1 for term in query_terms if term in tags or stem(term) in tags)
+            score += 0.3 * len(query_tokens & index.name_tokens[poi_id])
             
             # Apply boosts
-            score = self._apply_score_boosts(poi, score, filters)
+            score += boost_vector[pos]
             
             if score > 0:
                 results.append(RetrievalResult(
@@ -439,64 +701,33 @@ class HybridPOIRetriever:
         results.sort(key=lambda x: x.score, reverse=True)
         return results[:top_k]
     
-    def _passes_filters(self, poi: POI, filters: FilterCriteria) -> bool:
-        """Check if POI passes all deterministic filters."""
-        
-        # Cost filter
-        if filters.max_cost_usd is not None and poi.cost_usd > filters.max_cost_usd:
-            return False
-        
-        # Duration filter
-        if filters.max_duration_hours is not None and poi.duration_hours > filters.max_duration_hours:
-            return False
-        
-        # Category filter (must match at least one if specified)
-        if filters.categories:
-            if not any(cat in poi.category for cat in filters.categories):
-                # Allow if POI has general interest tags
-                if not any(cat in poi.tags for cat in filters.categories):
-                    pass  # Don't strictly filter, just lower score
-        
-        # Exclude tags
+    def _filter_mask(self, columns: POIColumns, filters: FilterCriteria) -> np.ndarray:
+        """
+        Boolean mask over the columns' rows of POIs passing the cost, duration
+        and exclude-tag filters.
+        """
+        mask = columns.full()
+        if not filters:
+            return mask
+        
+        if filters.max_cost_usd is not None:
+            mask &= columns.cost <= filters.max_cost_usd
+        if filters.max_duration_hours is not None:
+            mask &= columns.duration <= filters.max_duration_hours
+        # Categories only influence ranking, they never exclude a POI
         if filters.exclude_tags:
-            if any(tag in poi.tags for tag in filters.exclude_tags):
-                return False
+            mask &= ~columns.any_tag_mask(filters.exclude_tags)
         
-        return True
+        return mask
     
-    def _apply_score_boosts(
-        self,
-        poi: POI,
-        base_score: float,
-        filters: FilterCriteria
-    ) -> float:
-        """Apply score boosts based on relevance signals."""
-        
-        score = base_score
-        
-        # Must-see boost
-        if "must-see" in poi.tags:
-            score += 0.3
-        
-        # UNESCO boost
-        if "unesco" in poi.tags:
-            score += 0.2
-        
-        # Free entry boost for budget
-        if poi.cost_usd == 0:
-            score += 0.1
-        
-        # Mountain boost if required
+    def _boost_vector(self, columns: POIColumns, filters: FilterCriteria) -> np.ndarray:
+        """
+        Additive boost per columns row: must-see/UNESCO/photography tags and
+        free entry, plus the mountain boost when the filters require tags.
+        """
         if filters and filters.required_tags:
-            mountain_tags = ["mountains", "day2_mountains", "nature", "trekking", "hiking"]
-            if any(tag in poi.tags for tag in mountain_tags):
-                score += 0.5
-        
-        # Photography boost
-        if "photography" in poi.tags:
-            score += 0.1
-        
-        return score
+            return columns.static_boost + columns.mountain_boost
+        return columns.static_boost.copy()
     
     def _get_matched_tags(self, poi: POI, query: str) -> List[str]:
         """Get list of tags that matched the query."""
@@ -538,19 +769,55 @@ class HybridPOIRetriever:
     
     def get_by_tag(self, tag: str) -> List[POI]:
         """Get all POIs with specific tag."""
-        return [poi for poi in self.pois.values() if tag in poi.tags]
+        if self.columns is None:
+            return []
+        return list(self.columns.memo(("tag", tag), lambda c: c.select(c.tag_mask(tag))))
     
     def get_mountain_options(self) -> List[POI]:
         """Get POIs suitable for mountain day trips."""
-        mountain_tags = ["day2_mountains", "mountains", "nature", "trekking"]
-        results = []
+        if self.columns is None:
+            return []
         
-        for poi in self.pois.values():
-            if any(tag in poi.tags for tag in mountain_tags):
-                if poi.duration_hours >= 4:  # Full day activities
-                    results.append(poi)
+        def build(columns: POIColumns) -> List[POI]:
+            # Full day activities only
+            mask = columns.any_tag_mask(MOUNTAIN_DAY_TAGS) & (columns.duration >= 4)
+            return sorted(columns.select(mask), key=lambda x: -x.duration_hours)
+        
+        return list(self.columns.memo("mountain_options", build))
+    
+    def nearby(
+        self,
+        lat: float,
+        lng: float,
+        radius_km: float = 1.0,
+        category: Optional[str] = None,
+        limit: int = 20,
+        exclude_ids: Optional[List[str]] = None
+    ) -> List[Tuple[POI, float]]:
+        """
+        POIs, restaurants and hotels within radius_km of a point, nearest first.
         
-        return sorted(results, key=lambda x: -x.duration_hours)
+        Args:
+            category: Optional POI category or tag (e.g. "history", "restaurant", "hotel")
+            exclude_ids: IDs to leave out (e.g. the place the user is standing at)
+        
+        Returns:
+            (poi, distance_km) pairs
+        """
+        state = self.state
+        if state.geo_index is None:
+            return []
+        
+        columns = state.columns
+        mask = None
+        if category:
+            mask = columns.category_mask(category) | columns.tag_mask(category)
+        if exclude_ids:
+            mask = columns.full() if mask is None else mask.copy()
+            mask[[columns.positions[i] for i in exclude_ids if i in columns.positions]] = False
+        
+        hits = state.geo_index.within(lat, lng, radius_km, mask=mask, limit=limit)
+        return [(columns.pois[pos], distance) for pos, distance in hits]
     
     def get_must_see(self) -> List[POI]:
         """Get must-see POIs."""
@@ -558,7 +825,9 @@ class HybridPOIRetriever:
     
     def get_by_category(self, category: str) -> List[POI]:
         """Get POIs by category."""
-        return [poi for poi in self.pois.values() if category in poi.category]
+        if self.columns is None:
+            return []
+        return list(self.columns.memo(("category", category), lambda c: c.select(c.category_mask(category))))
     
     def get_all(self) -> List[POI]:
         """Get all POIs."""
@@ -580,7 +849,8 @@ class HybridPOIRetriever:
             "avg_cost": total_cost / len(self.pois) if self.pois else 0,
             "must_see_count": len(self.get_must_see()),
             "mountain_options": len(self.get_mountain_options()),
-            "vectors_enabled": self.use_vectors
+            "vectors_enabled": self.use_vectors,
+            "embedding_cache": self.embedding_cache.stats() if self.embedding_cache else None
         }
 
 
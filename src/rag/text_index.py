@@ -0,0 +1,94 @@
+"""
+Text Index - Tokenisation and BM25 ranking for the keyword search path.
+Handles Russian, Uzbek (Latin) and English text with light suffix stemming.
+"""
+
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List
+
+
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+_CYRILLIC_RE = re.compile(r"[а-яё]")
+
+# Uzbek Latin uses several apostrophe forms in o‘/g‘ and for the glottal stop
+_APOSTROPHES = str.maketrans({"ʻ": None, "ʼ": None, "‘": None, "’": None, "'": None, "`": None})
+
+# Longest suffixes first; a stem keeps at least MIN_STEM characters
+RU_SUFFIXES = (
+    "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими", "ией",
+    "ий", "ый", "ой", "ей", "ая", "яя", "ое", "ее", "ые", "ие", "ых", "их",
+    "ов", "ев", "ам", "ям", "ах", "ях", "ом", "ем", "ую", "юю",
+    "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й",
+)
+LATIN_SUFFIXES = (
+    # Uzbek plural / case endings
+    "larning", "lardan", "larda", "larga", "lari", "ning", "dagi", "lar",
+    "dan", "da", "ga", "ni",
+    # English
+    "ing", "ies", "ed", "es", "s",
+)
+MIN_STEM = 3
+
+
+def stem(token: str) -> str:
+    """Strip one common inflectional suffix (Russian, Uzbek or English)."""
+    suffixes = RU_SUFFIXES if _CYRILLIC_RE.search(token) else LATIN_SUFFIXES
+    for suffix in suffixes:
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM:
+            if suffix == "ies":
+                return token[:-3] + "y"
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, fold ё/apostrophes, split on non-letters and stem."""
+    text = text.lower().replace("ё", "е").translate(_APOSTROPHES)
+    return [stem(t) for t in _TOKEN_RE.findall(text)]
+
+
+class BM25Index:
+    """
+    Inverted index with Okapi BM25 scoring.
+
+    Postings and document lengths are built once; a query touches only the
+    postings of its own terms.
+    """
+
+    def __init__(self, documents: Dict[str, str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[tuple]] = defaultdict(list)
+        self.doc_len: Dict[str, int] = {}
+
+        for doc_id, text in documents.items():
+            counts = Counter(tokenize(text))
+            self.doc_len[doc_id] = sum(counts.values())
+            for term, tf in counts.items():
+                self.postings[term].append((doc_id, tf))
+
+        n_docs = len(self.doc_len)
+        self.avg_len = (sum(self.doc_len.values()) / n_docs) if n_docs else 0.0
+        self.idf = {
+            term: math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+        self.postings = dict(self.postings)
+
+    def search(self, query_terms: Iterable[str]) -> Dict[str, float]:
+        """BM25 score for every document containing at least one query term."""
+        scores: Dict[str, float] = defaultdict(float)
+        k1, b, avg_len = self.k1, self.b, self.avg_len or 1.0
+
+        for term in set(query_terms):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf[term]
+            for doc_id, tf in postings:
+                norm = k1 * (1 - b + b * self.doc_len[doc_id] / avg_len)
+                scores[doc_id] += idf * tf * (k1 + 1) / (tf + norm)
+
+        return scores
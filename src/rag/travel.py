@@ -0,0 +1,152 @@
+"""
+Travel Matrix - Pairwise distances and travel times between catalog entities.
+Covers POIs, restaurants and hotels. Distances are haversine with a detour
+factor; travel time picks walking for short hops and taxi otherwise.
+The matrix is computed once per catalog version and cached on disk.
+"""
+
+import math
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from src.rag.catalog import get_catalog, CatalogSnapshot
+from src.rag.geo_index import haversine_km
+
+
+CACHE_DIR_NAME = "travel_matrix"  # under the catalog's data directory
+
+# Speed models (straight-line distance * detour = street distance)
+WALK_SPEED_KMH = 4.5
+WALK_DETOUR = 1.3
+TAXI_SPEED_KMH = 25.0
+TAXI_DETOUR = 1.4
+TAXI_OVERHEAD_MINUTES = 5.0  # hailing and parking
+
+# Hops up to this long are walked, longer ones go by taxi
+MAX_WALK_MINUTES = float(os.getenv("MAX_WALK_MINUTES", "20"))
+
+# Used when either end has no coordinates
+DEFAULT_TRANSFER_MINUTES = 20.0
+
+
+class TravelMatrix:
+    """
+    Dense N x N matrices over catalog entity IDs.
+
+    `distance_km` is the great-circle distance; `walk_minutes`, `taxi_minutes`
+    and `minutes` (fastest sensible mode) are derived from it.
+    """
+
+    def __init__(self, ids: List[str], distance_km: np.ndarray, version: str = ""):
+        self.ids = list(ids)
+        self.positions: Dict[str, int] = {entity_id: i for i, entity_id in enumerate(self.ids)}
+        self.version = version
+        self.distance_km = distance_km
+
+        street_walk = distance_km * WALK_DETOUR
+        street_taxi = distance_km * TAXI_DETOUR
+        self.walk_minutes = street_walk / WALK_SPEED_KMH * 60
+        self.taxi_minutes = street_taxi / TAXI_SPEED_KMH * 60 + TAXI_OVERHEAD_MINUTES
+        np.fill_diagonal(self.taxi_minutes, 0.0)
+
+        self.walks = self.walk_minutes <= MAX_WALK_MINUTES
+        self.minutes = np.where(self.walks, self.walk_minutes, self.taxi_minutes)
+        self.minutes = np.where(np.isnan(self.minutes), DEFAULT_TRANSFER_MINUTES, self.minutes)
+        np.fill_diagonal(self.minutes, 0.0)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def distance(self, from_id: str, to_id: str) -> Optional[float]:
+        """Straight-line distance in km, or None if unknown."""
+        i, j = self.positions.get(from_id), self.positions.get(to_id)
+        if i is None or j is None or np.isnan(self.distance_km[i, j]):
+            return None
+        return float(self.distance_km[i, j])
+
+    def travel_minutes(self, from_id: Optional[str], to_id: Optional[str]) -> float:
+        """Door-to-door minutes between two entities (walk or taxi, whichever applies)."""
+        if not from_id or not to_id or from_id == to_id:
+            return 0.0
+        i, j = self.positions.get(from_id), self.positions.get(to_id)
+        if i is None or j is None:
+            return DEFAULT_TRANSFER_MINUTES
+        return float(self.minutes[i, j])
+
+    def mode(self, from_id: str, to_id: str) -> str:
+        """"walk" or "taxi" for a hop."""
+        i, j = self.positions.get(from_id), self.positions.get(to_id)
+        if i is None or j is None:
+            return "taxi"
+        return "walk" if self.walks[i, j] else "taxi"
+
+    def submatrix(self, ids: Iterable[str]) -> np.ndarray:
+        """Travel minutes among the given IDs (unknown IDs get DEFAULT_TRANSFER_MINUTES)."""
+        ids = list(ids)
+        rows = np.array([self.positions.get(entity_id, -1) for entity_id in ids], dtype=np.int64)
+        known = rows >= 0
+        sub = np.full((len(ids), len(ids)), DEFAULT_TRANSFER_MINUTES, dtype=np.float64)
+        sub[np.ix_(known, known)] = self.minutes[np.ix_(rows[known], rows[known])]
+        np.fill_diagonal(sub, 0.0)
+        return sub
+
+
+def transfer_slot_minutes(minutes: float, step: int = 5) -> int:
+    """Round a travel time up to the schedule's granularity (at least one step)."""
+    return max(step, int(math.ceil(minutes / step)) * step)
+
+
+def _catalog_points(catalog: CatalogSnapshot):
+    ids, lats, lngs = [], [], []
+    for record in catalog.pois + catalog.restaurants + catalog.hotels:
+        if "id" not in record:
+            continue
+        coords = record.get("coordinates") or {}
+        ids.append(record["id"])
+        lats.append(coords.get("lat", np.nan))
+        lngs.append(coords.get("lng", np.nan))
+    return ids, np.array(lats, dtype=np.float64), np.array(lngs, dtype=np.float64)
+
+
+def _build_travel_matrix(catalog: CatalogSnapshot, cache_dir: Path = None) -> TravelMatrix:
+    """Load the matrix for this catalog version from disk, or compute and store it."""
+    cache_dir = Path(cache_dir or catalog.data_dir / CACHE_DIR_NAME)
+    cache_path = cache_dir / f"{catalog.version}.npz"
+    ids, lats, lngs = _catalog_points(catalog)
+
+    if cache_path.exists():
+        try:
+            with np.load(cache_path, allow_pickle=False) as data:
+                if list(data["ids"]) == ids:
+                    return TravelMatrix(ids, data["distance_km"].astype(np.float64), catalog.version)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️  Travel matrix cache unreadable, recomputing: {e}")
+
+    # Stored as float32; round-trip now so fresh and cached matrices agree exactly
+    distance_km = haversine_km(lats[:, None], lngs[:, None], lats[None, :], lngs[None, :])
+    distance_km = distance_km.astype(np.float32).astype(np.float64)
+    matrix = TravelMatrix(ids, distance_km, catalog.version)
+
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_dir / f"{catalog.version}.tmp.npz"
+        np.savez(tmp_path, ids=np.array(ids), distance_km=distance_km.astype(np.float32))
+        os.replace(tmp_path, cache_path)
+        # Matrices of older catalog versions are never read again
+        for stale in cache_dir.glob("*.npz"):
+            if stale != cache_path:
+                stale.unlink(missing_ok=True)
+    except OSError as e:
+        print(f"⚠️  Could not save travel matrix: {e}")
+
+    print(f"🧭 Travel matrix: {len(ids)} places (catalog {catalog.version})")
+    return matrix
+
+
+def get_travel_matrix(catalog: CatalogSnapshot = None) -> TravelMatrix:
+    """Travel matrix for a catalog snapshot (default: the shared database/ catalog)."""
+    catalog = catalog or get_catalog()
+    return catalog.derive("travel_matrix", _build_travel_matrix)
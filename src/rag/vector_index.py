@@ -0,0 +1,204 @@
+"""
+NumPy Vector Index - In-process exact cosine search, a lightweight alternative to ChromaDB.
+All document embeddings live in one L2-normalised float32 matrix that is
+memory-mapped from database/vector_index/; a query is a single matmul plus
+metadata masks. Implements the subset of the Chroma collection API the
+retriever uses (count/get/upsert/delete/query).
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+DEFAULT_INDEX_DIR = Path(__file__).parent.parent.parent / "database" / "vector_index"
+
+
+class OpenAIEmbedder:
+    """Minimal OpenAI embedding function (same call interface as ChromaDB's)."""
+
+    def __init__(self, api_key: str, model_name: str = "text-embedding-3-small"):
+        from openai import OpenAI
+        self.client = OpenAI(api_key=api_key)
+        self.model_name = model_name
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        response = self.client.embeddings.create(model=self.model_name, input=list(input))
+        return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+class NumpyVectorIndex:
+    """
+    Exact cosine-similarity index persisted as <name>.npy + <name>.json.
+
+    Distances follow Chroma's cosine space (1 - similarity), so results are
+    interchangeable with a Chroma collection created with hnsw:space=cosine.
+    """
+
+    def __init__(self, name: str, embedding_function, index_dir: Path = None):
+        self.name = name
+        self.embedding_function = embedding_function
+        self.index_dir = Path(index_dir or DEFAULT_INDEX_DIR)
+        self.matrix_path = self.index_dir / f"{name}.npy"
+        self.meta_path = self.index_dir / f"{name}.json"
+
+        self.ids: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self._positions: Dict[str, int] = {}
+        self._columns: Dict[str, np.ndarray] = {}
+        self._load()
+
+    # --- Persistence ---
+
+    def _load(self):
+        if not (self.matrix_path.exists() and self.meta_path.exists()):
+            return
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            matrix = np.load(self.matrix_path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Vector index {self.name} unreadable, rebuilding: {e}")
+            return
+        if matrix.shape[0] != len(meta.get("ids", [])):
+            print(f"⚠️  Vector index {self.name} is inconsistent, rebuilding")
+            return
+        self._set(meta["ids"], meta["metadatas"], matrix)
+
+    def _save(self):
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        tmp_matrix = self.matrix_path.with_suffix(".tmp.npy")
+        tmp_meta = self.meta_path.with_suffix(".json.tmp")
+        np.save(tmp_matrix, np.ascontiguousarray(self.matrix, dtype=np.float32))
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump({"ids": self.ids, "metadatas": self.metadatas}, f, ensure_ascii=False)
+        os.replace(tmp_matrix, self.matrix_path)
+        os.replace(tmp_meta, self.meta_path)
+        # Re-open memory-mapped so the process doesn't hold a private copy
+        self._set(self.ids, self.metadatas, np.load(self.matrix_path, mmap_mode="r"))
+
+    def _set(self, ids: List[str], metadatas: List[Dict], matrix: np.ndarray):
+        self.ids = list(ids)
+        self.metadatas = list(metadatas)
+        self.matrix = matrix
+        self._positions = {doc_id: i for i, doc_id in enumerate(self.ids)}
+        self._columns = {}
+
+    # --- Chroma-compatible API ---
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def get(self, include: List[str] = None) -> Dict[str, Any]:
+        return {"ids": list(self.ids), "metadatas": list(self.metadatas)}
+
+    def upsert(self, documents: List[str], metadatas: List[Dict], ids: List[str]):
+        vectors = _normalize(np.asarray(self.embedding_function(documents), dtype=np.float32))
+
+        matrix = np.array(self.matrix, dtype=np.float32) if self.ids else np.zeros((0, vectors.shape[1]), np.float32)
+        new_ids = list(self.ids)
+        new_metadatas = list(self.metadatas)
+        appended = []
+
+        for doc_id, metadata, vector in zip(ids, metadatas, vectors):
+            position = self._positions.get(doc_id)
+            if position is None:
+                appended.append(vector)
+                new_ids.append(doc_id)
+                new_metadatas.append(metadata)
+            else:
+                matrix[position] = vector
+                new_metadatas[position] = metadata
+
+        if appended:
+            matrix = np.vstack([matrix, np.stack(appended)])
+        self.ids, self.metadatas, self.matrix = new_ids, new_metadatas, matrix
+        self._save()
+
+    def delete(self, ids: List[str]):
+        drop = {self._positions[doc_id] for doc_id in ids if doc_id in self._positions}
+        if not drop:
+            return
+        keep = [i for i in range(len(self.ids)) if i not in drop]
+        self.ids = [self.ids[i] for i in keep]
+        self.metadatas = [self.metadatas[i] for i in keep]
+        self.matrix = np.array(self.matrix[keep], dtype=np.float32)
+        self._save()
+
+    def query(self, query_texts: List[str], n_results: int = 10, where: Optional[Dict] = None) -> Dict[str, Any]:
+        if not self.ids:
+            return {"ids": [[] for _ in query_texts], "distances": [[] for _ in query_texts]}
+
+        queries = _normalize(np.asarray(self.embedding_function(query_texts), dtype=np.float32))
+        similarities = queries @ self.matrix.T  # (n_queries, n_docs)
+
+        if where:
+            mask = self._where_mask(where)
+            similarities[:, ~mask] = -np.inf
+            n_results = min(n_results, int(mask.sum()))
+        n_results = min(n_results, len(self.ids))
+        if n_results <= 0:
+            return {"ids": [[] for _ in query_texts], "distances": [[] for _ in query_texts]}
+
+        top = np.argpartition(-similarities, n_results - 1, axis=1)[:, :n_results]
+        all_ids, all_distances = [], []
+        for row, candidates in zip(similarities, top):
+            ordered = candidates[np.argsort(-row[candidates])]
+            all_ids.append([self.ids[i] for i in ordered])
+            all_distances.append([float(1.0 - row[i]) for i in ordered])
+        return {"ids": all_ids, "distances": all_distances}
+
+    # --- Metadata filtering ---
+
+    def _column(self, key: str) -> np.ndarray:
+        """Metadata field as an array over documents (cached until the next write)."""
+        column = self._columns.get(key)
+        if column is None:
+            values = [m.get(key) for m in self.metadatas]
+            if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+                column = np.asarray(values, dtype=np.float64)
+            else:
+                column = np.asarray(values, dtype=object)
+            self._columns[key] = column
+        return column
+
+    def _where_mask(self, where: Dict) -> np.ndarray:
+        """Evaluate a Chroma where clause ($and/$or, $eq/$ne/$lt/$lte/$gt/$gte/$in) to a row mask."""
+        masks = []
+        for key, condition in where.items():
+            if key == "$and":
+                masks.append(np.logical_and.reduce([self._where_mask(c) for c in condition]))
+            elif key == "$or":
+                masks.append(np.logical_or.reduce([self._where_mask(c) for c in condition]))
+            else:
+                column = self._column(key)
+                if not isinstance(condition, dict):
+                    condition = {"$eq": condition}
+                for op, value in condition.items():
+                    if op == "$eq":
+                        masks.append(column == value)
+                    elif op == "$ne":
+                        masks.append(column != value)
+                    elif op == "$lt":
+                        masks.append(column < value)
+                    elif op == "$lte":
+                        masks.append(column <= value)
+                    elif op == "$gt":
+                        masks.append(column > value)
+                    elif op == "$gte":
+                        masks.append(column >= value)
+                    elif op == "$in":
+                        masks.append(np.isin(column, list(value)))
+                    else:
+                        raise ValueError(f"Unsupported where operator: {op}")
+        return np.logical_and.reduce(masks) if masks else np.ones(len(self.ids), dtype=bool)
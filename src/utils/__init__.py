@@ -1,2 +1,3 @@
 # src/utils/__init__.py
 from .llm import get_llm_client, OllamaClient, OpenAIClient, MockLLMClient
+from .llm_cache import CachedLLMClient, LLMResponseCache, get_llm_cache
@@ -0,0 +1,168 @@
+"""
+Image Index - Resolves POI/hotel/restaurant IDs to served image URLs.
+Scans frontend/images once and answers lookups from an in-memory table.
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+
+IMAGES_DIR = Path(__file__).parent.parent.parent / "frontend" / "images"
+
+CATEGORIES = ("poi", "hotels", "restaurants")
+
+# Preferred extension first
+IMAGE_EXTENSIONS = (".jpg", ".png", ".webp")
+
+# How often (seconds) the image directories' mtimes are re-checked
+RELOAD_CHECK_INTERVAL = float(os.getenv("IMAGE_INDEX_RELOAD_INTERVAL", "5.0"))
+
+# Special mappings for POI IDs that don't match image filenames exactly
+POI_ID_MAPPINGS = {
+    "gur_emir_mausoleum": "gur_e_amir_mausoleum",
+    "shah_i_zinda": "shah_i_zinda_necropolis",
+    "bibi_khanym_mosque": "bibi_khanym_mosque",
+    "siab_bazaar": "siob_bazaar",
+    "afrosiyab_museum": "afrosiyob_museum",
+    "ulugh_beg_observatory": "ulugh_beg_observatory_museum",
+    "hazrat_khizr_mosque": "hazrat_khizr_mosque",
+    "central_plov_center": "central_plov_center",  # May not exist, will fallback
+    "silk_paper_workshop_konigil": "meros_paper_mill",
+    "khovrenko_winery": "khovrenko_winery_wine_museum",
+    "rukhobod_mausoleum": "rukhobod_mausoleum",
+    "amir_temur_statue": "amir_temur_monument",
+    "zarafshan_gorge_day_trip": "amankutan_gorge_viewpoint",  # Fallback
+    "seven_lakes_fann_mountains": "amankutan_gorge_viewpoint",  # Fallback
+    "aksay_waterfall_hike": "amankutan_gorge_viewpoint",  # Fallback
+    "urgut_sunday_market": "urgut_bazaar",
+    "siyob_restaurant": "siob_bazaar",  # Fallback
+    "art_cafe_samarkand": "siob_bazaar",  # Fallback
+    "ishrat_khona_ruins": "ishratkhana_mausoleum",
+    "sunset_viewpoint_hill": "hazrat_khizr_viewpoint",
+    "samarkand_carpet_workshop": "samarkand_bukhara_silk_carpets_factory",
+    "saint_daniel_tomb": "khoja_doniyor_mausoleum",
+    "museum_ulughbek": "ulugh_beg_observatory_museum",
+    "registan_night_show": "registan_square",
+    "teahouse_lyabi_hovuz": "siob_bazaar",  # Fallback
+    "afrosiyab_ancient_settlement": "afrosiyob_archaeological_site",
+    "eternal_city_samarkand": "registan_square",  # Fallback
+    "nurata_mountains_2day": "amankutan_gorge_viewpoint",  # Fallback
+    "chorsu_local_market": "siob_bazaar",  # Fallback
+}
+
+# Fallbacks by category (so cards always have a local image)
+FALLBACK_BY_CATEGORY = {
+    "hotels": "hotel_city_samarkand.jpg",
+    "restaurants": "rest_afandi_food.jpg",
+    "poi": "registan_square.jpg",
+}
+
+
+class ImageIndex:
+    """
+    Precomputed (category, id) -> URL table.
+
+    ID mappings and per-category fallbacks are baked into the table at build
+    time, so `resolve` is a dict lookup with no filesystem access.
+    """
+
+    def __init__(self, images_dir: Path = None, check_interval: float = RELOAD_CHECK_INTERVAL):
+        self.images_dir = Path(images_dir or IMAGES_DIR)
+        self.check_interval = check_interval
+        self.version = ""
+        self._tables: Dict[str, Dict[str, str]] = {}
+        self._fallbacks: Dict[str, str] = {}
+        self._signature: Tuple = ()
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self._refresh(time.monotonic())
+
+    def _current_signature(self) -> Tuple:
+        signature = []
+        for category in CATEGORIES:
+            try:
+                signature.append((self.images_dir / category).stat().st_mtime_ns)
+            except OSError:
+                signature.append(0)
+        return tuple(signature)
+
+    def _build(self):
+        tables: Dict[str, Dict[str, str]] = {}
+        fallbacks: Dict[str, str] = {}
+
+        for category in CATEGORIES:
+            folder = self.images_dir / category
+            files = set()
+            if folder.is_dir():
+                files = {entry.name for entry in os.scandir(folder) if entry.is_file()}
+
+            table: Dict[str, str] = {}
+            # Reverse preference order so .jpg wins over .png/.webp for the same stem
+            for ext in reversed(IMAGE_EXTENSIONS):
+                for name in files:
+                    if name.endswith(ext):
+                        table[name[:-len(ext)]] = f"/images/{category}/{name}"
+
+            # Mapped IDs resolve to their target image (or the fallback below)
+            for alias, target in POI_ID_MAPPINGS.items():
+                if alias != target:
+                    table.pop(alias, None)
+                if target in table:
+                    table[alias] = table[target]
+
+            fb_file = FALLBACK_BY_CATEGORY.get(category)
+            if fb_file and fb_file in files:
+                fallbacks[category] = f"/images/{category}/{fb_file}"
+
+            tables[category] = table
+
+        return tables, fallbacks
+
+    def _refresh(self, now: float):
+        with self._lock:
+            self._last_check = now
+            signature = self._current_signature()
+            if signature == self._signature and self._tables:
+                return
+            tables, fallbacks = self._build()
+            # Swap all tables at once so readers never see a partial index
+            self._tables, self._fallbacks = tables, fallbacks
+            self._signature = signature
+            self.version = "-".join(f"{s:x}" for s in signature)
+
+    def _maybe_refresh(self):
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._refresh(now)
+
+    def current_version(self) -> str:
+        """Version of the image directories, re-checked at most every check_interval."""
+        self._maybe_refresh()
+        return self.version
+
+    def resolve(self, image_id: Optional[str], category: str = "poi") -> str:
+        """Map an ID to its image URL, the category fallback, or ''."""
+        self._maybe_refresh()
+
+        url = self._tables.get(category, {}).get(image_id)
+        if url:
+            return url
+        # Return empty string if no image found (frontend will use remote fallback)
+        return self._fallbacks.get(category, "")
+
+
+_image_index: Optional[ImageIndex] = None
+_image_index_lock = threading.Lock()
+
+
+def get_image_index() -> ImageIndex:
+    """Get the shared image index (built on first use)."""
+    global _image_index
+    if _image_index is None:
+        with _image_index_lock:
+            if _image_index is None:
+                _image_index = ImageIndex()
+    return _image_index
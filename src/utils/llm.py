@@ -5,16 +5,88 @@ Supports OpenAI API and local LLM via Ollama.
 
 import os
 import json
-from typing import Optional, Type, TypeVar
+import asyncio
+import weakref
+from typing import AsyncIterator, Optional, Type, TypeVar
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
+from src.utils.llm_cache import CachedLLMClient, get_llm_cache
+
 # Load environment variables
 load_dotenv()
 
 T = TypeVar('T', bound=BaseModel)
 
 
+# --- Shared async HTTP pool ---
+# One keep-alive pool per event loop (an httpx.AsyncClient is bound to the loop it runs on)
+_async_http_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+ASYNC_HTTP_LIMITS = {
+    "max_connections": int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+    "max_keepalive_connections": int(os.getenv("LLM_MAX_KEEPALIVE", "10")),
+}
+
+
+def get_async_http_client():
+    """Get the pooled httpx.AsyncClient for the running event loop."""
+    import httpx
+    
+    loop = asyncio.get_running_loop()
+    client = _async_http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(keepalive_expiry=60, **ASYNC_HTTP_LIMITS),
+            timeout=httpx.Timeout(120, connect=10)
+        )
+        _async_http_clients[loop] = client
+    return client
+
+
+async def aclose_async_http_client():
+    """Close the pooled client of the running event loop (call on shutdown)."""
+    client = _async_http_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def _extract_json(response: str) -> dict:
+    """Parse JSON from a raw LLM response, stripping markdown fences and chatter."""
+    
+    # Clean response
+    response = response.strip()
+    if response.startswith("```"):
+        response = response.split("```")[1]
+        if response.startswith("json"):
+            response = response[4:]
+    response = response.strip()
+    
+    # Find JSON in response
+    start = response.find("{")
+    end = response.rfind("}") + 1
+    if start >= 0 and end > start:
+        response = response[start:end]
+    
+    return json.loads(response)
+
+
+async def _iter_sse_deltas(response) -> AsyncIterator[str]:
+    """Yield content deltas from an OpenAI-compatible SSE chat stream."""
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            break
+        chunk = json.loads(data)
+        choices = chunk.get("choices") or []
+        if choices:
+            text = (choices[0].get("delta") or {}).get("content")
+            if text:
+                yield text
+
+
 class OllamaClient:
     """Local LLM client using Ollama."""
     
@@ -23,6 +95,21 @@ class OllamaClient:
         self.base_url = base_url or os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
         print(f"🦙 Ollama client: {self.base_url} | model: {self.model} (CPU optimized)")
     
+    def _payload(self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int) -> dict:
+        full_prompt = prompt
+        if system_prompt:
+            full_prompt = f"System: {system_prompt}\n\nUser: {prompt}"
+        
+        return {
+            "model": self.model,
+            "prompt": full_prompt,
+            "stream": False,
+            "options": {
+                "temperature": temperature,
+                "num_predict": max_tokens
+            }
+        }
+    
     def complete(
         self,
         prompt: str,
@@ -33,21 +120,9 @@ class OllamaClient:
         """Get text completion from Ollama."""
         import requests
         
-        full_prompt = prompt
-        if system_prompt:
-            full_prompt = f"System: {system_prompt}\n\nUser: {prompt}"
-        
         response = requests.post(
             f"{self.base_url}/api/generate",
-            json={
-                "model": self.model,
-                "prompt": full_prompt,
-                "stream": False,
-                "options": {
-                    "temperature": temperature,
-                    "num_predict": max_tokens
-                }
-            },
+            json=self._payload(prompt, system_prompt, temperature, max_tokens),
             timeout=120
         )
         
@@ -56,50 +131,67 @@ class OllamaClient:
         else:
             raise Exception(f"Ollama error: {response.status_code} - {response.text}")
     
-    def complete_json(
+    async def acomplete(
         self,
         prompt: str,
         system_prompt: Optional[str] = None,
-        temperature: float = 0.3
-    ) -> dict:
-        """Get JSON completion from Ollama."""
-        
-        json_prompt = f"""
-{prompt}
-
-ВАЖНО: Ответь ТОЛЬКО валидным JSON без markdown, без ```json, без пояснений.
-"""
-        
-        response = self.complete(json_prompt, system_prompt, temperature)
-        
-        # Clean response
-        response = response.strip()
-        if response.startswith("```"):
-            response = response.split("```")[1]
-            if response.startswith("json"):
-                response = response[4:]
-        response = response.strip()
+        temperature: float = 0.7,
+        max_tokens: int = 2000
+    ) -> str:
+        """Get text completion from Ollama without blocking the event loop."""
         
-        # Find JSON in response
-        start = response.find("{")
-        end = response.rfind("}") + 1
-        if start >= 0 and end > start:
-            response = response[start:end]
+        response = await get_async_http_client().post(
+            f"{self.base_url}/api/generate",
+            json=self._payload(prompt, system_prompt, temperature, max_tokens),
+            timeout=120
+        )
         
-        return json.loads(response)
+        if response.status_code == 200:
+            return response.json().get("response", "")
+        else:
+            raise Exception(f"Ollama error: {response.status_code} - {response.text}")
     
-    def complete_structured(
+    async def astream(
         self,
         prompt: str,
-        output_schema: Type[T],
         system_prompt: Optional[str] = None,
-        temperature: float = 0.3
-    ) -> T:
-        """Get structured output matching Pydantic schema."""
-        
+        temperature: float = 0.7,
+        max_tokens: int = 2000
+    ) -> AsyncIterator[str]:
+        """Stream text chunks from Ollama (NDJSON, one object per line)."""
+        
+        payload = self._payload(prompt, system_prompt, temperature, max_tokens)
+        payload["stream"] = True
+        
+        async with get_async_http_client().stream(
+            "POST", f"{self.base_url}/api/generate", json=payload, timeout=120
+        ) as response:
+            if response.status_code != 200:
+                body = await response.aread()
+                raise Exception(f"Ollama error: {response.status_code} - {body.decode(errors='replace')}")
+            
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise Exception(f"Ollama error: {chunk['error']}")
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    break
+    
+    def _json_prompt(self, prompt: str) -> str:
+        return f"""
+{prompt}
+
+ВАЖНО: Ответь ТОЛЬКО валидным JSON без markdown, без ```json, без пояснений.
+"""
+    
+    def _structured_prompt(self, prompt: str, output_schema: Type[T]) -> str:
         schema_json = output_schema.model_json_schema()
         
-        full_prompt = f"""
+        return f"""
 {prompt}
 
 Ответь JSON объектом по этой схеме:
@@ -107,9 +199,50 @@ class OllamaClient:
 
 Только JSON, без markdown и пояснений.
 """
-        
+    
+    def complete_json(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.3
+    ) -> dict:
+        """Get JSON completion from Ollama."""
+        response = self.complete(self._json_prompt(prompt), system_prompt, temperature)
+        return _extract_json(response)
+    
+    async def acomplete_json(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.3
+    ) -> dict:
+        """Async variant of complete_json."""
+        response = await self.acomplete(self._json_prompt(prompt), system_prompt, temperature)
+        return _extract_json(response)
+    
+    def complete_structured(
+        self,
+        prompt: str,
+        output_schema: Type[T],
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.3
+    ) -> T:
+        """Get structured output matching Pydantic schema."""
+        full_prompt = self._structured_prompt(prompt, output_schema)
         result = self.complete_json(full_prompt, system_prompt, temperature)
         return output_schema.model_validate(result)
+    
+    async def acomplete_structured(
+        self,
+        prompt: str,
+        output_schema: Type[T],
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.3
+    ) -> T:
+        """Async variant of complete_structured."""
+        full_prompt = self._structured_prompt(prompt, output_schema)
+        result = await self.acomplete_json(full_prompt, system_prompt, temperature)
+        return output_schema.model_validate(result)
 
 
 class GroqClient:
@@ -125,6 +258,25 @@ class GroqClient:
         
         print(f"⚡ Groq client: {self.model} (cloud, ultra-fast)")
     
+    def _headers(self) -> dict:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+    
+    def _payload(self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int) -> dict:
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+    
     def complete(
         self,
         prompt: str,
@@ -135,23 +287,10 @@ class GroqClient:
         """Get text completion from Groq."""
         import requests
         
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": prompt})
-        
         response = requests.post(
             f"{self.base_url}/chat/completions",
-            headers={
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": self.model,
-                "messages": messages,
-                "temperature": temperature,
-                "max_tokens": max_tokens
-            },
+            headers=self._headers(),
+            json=self._payload(prompt, system_prompt, temperature, max_tokens),
             timeout=30
         )
         
@@ -160,50 +299,61 @@ class GroqClient:
         else:
             raise Exception(f"Groq error: {response.status_code} - {response.text}")
     
-    def complete_json(
+    async def acomplete(
         self,
         prompt: str,
         system_prompt: Optional[str] = None,
-        temperature: float = 0.3
-    ) -> dict:
-        """Get JSON completion from Groq."""
-        
-        json_prompt = f"""
-{prompt}
-
-IMPORTANT: Respond with ONLY valid JSON. No markdown, no ```json, no explanations.
-"""
-        
-        response = self.complete(json_prompt, system_prompt, temperature)
-        
-        # Clean response
-        response = response.strip()
-        if response.startswith("```"):
-            response = response.split("```")[1]
-            if response.startswith("json"):
-                response = response[4:]
-        response = response.strip()
+        temperature: float = 0.7,
+        max_tokens: int = 2000
+    ) -> str:
+        """Get text completion from Groq without blocking the event loop."""
         
-        # Find JSON in response
-        start = response.find("{")
-        end = response.rfind("}") + 1
-        if start >= 0 and end > start:
-            response = response[start:end]
+        response = await get_async_http_client().post(
+            f"{self.base_url}/chat/completions",
+            headers=self._headers(),
+            json=self._payload(prompt, system_prompt, temperature, max_tokens),
+            timeout=30
+        )
         
-        return json.loads(response)
+        if response.status_code == 200:
+            return response.json()["choices"][0]["message"]["content"]
+        else:
+            raise Exception(f"Groq error: {response.status_code} - {response.text}")
     
-    def complete_structured(
+    async def astream(
         self,
         prompt: str,
-        output_schema: Type[T],
         system_prompt: Optional[str] = None,
-        temperature: float = 0.3
-    ) -> T:
-        """Get structured output matching Pydantic schema."""
-        
+        temperature: float = 0.7,
+        max_tokens: int = 2000
+    ) -> AsyncIterator[str]:
+        """Stream text chunks from Groq (OpenAI-compatible SSE)."""
+        
+        payload = self._payload(prompt, system_prompt, temperature, max_tokens)
+        payload["stream"] = True
+        
+        async with get_async_http_client().stream(
+            "POST", f"{self.base_url}/chat/completions",
+            headers=self._headers(), json=payload, timeout=30
+        ) as response:
+            if response.status_code != 200:
+                body = await response.aread()
+                raise Exception(f"Groq error: {response.status_code} - {body.decode(errors='replace')}")
+            
+            async for text in _iter_sse_deltas(response):
+                yield text
+    
+    def _json_prompt(self, prompt: str) -> str:
+        return f"""
+{prompt}
+
+IMPORTANT: Respond with ONLY valid JSON. No markdown, no ```json, no explanations.
+"""
+    
+    def _structured_prompt(self, prompt: str, output_schema: Type[T]) -> str:
         schema_json = output_schema.model_json_schema()
         
-        full_prompt = f"""
+        return f"""
 {prompt}
 
 Respond with a JSON object matching this schema:
@@ -211,9 +361,50 @@ Respond with a JSON object matching this schema:
 
 Return ONLY valid JSON, no markdown or explanation.
 """
-        
+    
+    def complete_json(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.3
+    ) -> dict:
+        """Get JSON completion from Groq."""
+        response = self.complete(self._json_prompt(prompt), system_prompt, temperature)
+        return _extract_json(response)
+    
+    async def acomplete_json(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.3
+    ) -> dict:
+        """Async variant of complete_json."""
+        response = await self.acomplete(self._json_prompt(prompt), system_prompt, temperature)
+        return _extract_json(response)
+    
+    def complete_structured(
+        self,
+        prompt: str,
+        output_schema: Type[T],
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.3
+    ) -> T:
+        """Get structured output matching Pydantic schema."""
+        full_prompt = self._structured_prompt(prompt, output_schema)
         result = self.complete_json(full_prompt, system_prompt, temperature)
         return output_schema.model_validate(result)
+    
+    async def acomplete_structured(
+        self,
+        prompt: str,
+        output_schema: Type[T],
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.3
+    ) -> T:
+        """Async variant of complete_structured."""
+        full_prompt = self._structured_prompt(prompt, output_schema)
+        result = await self.acomplete_json(full_prompt, system_prompt, temperature)
+        return output_schema.model_validate(result)
 
 
 class OpenAIClient:
@@ -230,6 +421,7 @@ class OpenAIClient:
             raise ValueError("Please replace the placeholder OpenAI API key in .env with your actual key")
         
         self._client = None
+        self._async_clients = weakref.WeakKeyDictionary()  # event loop -> (http client, AsyncOpenAI)
         print(f"🤖 OpenAI client ready: {self.model}")
     
     @property
@@ -240,6 +432,18 @@ class OpenAIClient:
             self._client = OpenAI(api_key=self.api_key)
         return self._client
     
+    @property
+    def async_client(self):
+        """AsyncOpenAI client for the running loop, sharing the pooled HTTP client."""
+        loop = asyncio.get_running_loop()
+        http_client = get_async_http_client()
+        cached = self._async_clients.get(loop)
+        if cached is None or cached[0] is not http_client:
+            from openai import AsyncOpenAI
+            cached = (http_client, AsyncOpenAI(api_key=self.api_key, http_client=http_client))
+            self._async_clients[loop] = cached
+        return cached[1]
+    
     def get_embeddings(self, texts: list, model: str = "text-embedding-3-small") -> list:
         """Get embeddings for a list of texts using OpenAI."""
         try:
@@ -252,6 +456,15 @@ class OpenAIClient:
             print(f"⚠️  OpenAI embeddings error: {e}")
             raise
     
+    def _messages(self, prompt: str, system_prompt: Optional[str]) -> list:
+        messages = []
+        
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        
+        messages.append({"role": "user", "content": prompt})
+        return messages
+    
     def complete(
         self,
         prompt: str,
@@ -261,17 +474,31 @@ class OpenAIClient:
     ) -> str:
         """Get text completion from OpenAI."""
         
-        messages = []
-        
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        
-        messages.append({"role": "user", "content": prompt})
-        
         try:
             response = self.client.chat.completions.create(
                 model=self.model,
-                messages=messages,
+                messages=self._messages(prompt, system_prompt),
+                temperature=temperature,
+                max_completion_tokens=max_tokens
+            )
+            return response.choices[0].message.content
+        except Exception as e:
+            print(f"⚠️  OpenAI completion error: {e}")
+            raise
+    
+    async def acomplete(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000
+    ) -> str:
+        """Get text completion from OpenAI without blocking the event loop."""
+        
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=self._messages(prompt, system_prompt),
                 temperature=temperature,
                 max_completion_tokens=max_tokens
             )
@@ -280,6 +507,30 @@ class OpenAIClient:
             print(f"⚠️  OpenAI completion error: {e}")
             raise
     
+    async def astream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000
+    ) -> AsyncIterator[str]:
+        """Stream text chunks from OpenAI."""
+        
+        try:
+            stream = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=self._messages(prompt, system_prompt),
+                temperature=temperature,
+                max_completion_tokens=max_tokens,
+                stream=True
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            print(f"⚠️  OpenAI streaming error: {e}")
+            raise
+    
     def complete_json(
         self,
         prompt: str,
@@ -288,17 +539,10 @@ class OpenAIClient:
     ) -> dict:
         """Get JSON completion from OpenAI."""
         
-        messages = []
-        
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        
-        messages.append({"role": "user", "content": prompt})
-        
         try:
             response = self.client.chat.completions.create(
                 model=self.model,
-                messages=messages,
+                messages=self._messages(prompt, system_prompt),
                 temperature=temperature,
                 response_format={"type": "json_object"}
             )
@@ -307,18 +551,30 @@ class OpenAIClient:
             print(f"⚠️  OpenAI JSON completion error: {e}")
             raise
     
-    def complete_structured(
+    async def acomplete_json(
         self,
         prompt: str,
-        output_schema: Type[T],
         system_prompt: Optional[str] = None,
         temperature: float = 0.3
-    ) -> T:
-        """Get structured output matching Pydantic schema."""
+    ) -> dict:
+        """Async variant of complete_json."""
         
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=self._messages(prompt, system_prompt),
+                temperature=temperature,
+                response_format={"type": "json_object"}
+            )
+            return json.loads(response.choices[0].message.content)
+        except Exception as e:
+            print(f"⚠️  OpenAI JSON completion error: {e}")
+            raise
+    
+    def _structured_prompt(self, prompt: str, output_schema: Type[T]) -> str:
         schema_json = output_schema.model_json_schema()
         
-        full_prompt = f"""
+        return f"""
 {prompt}
 
 Respond with a JSON object matching this schema:
@@ -326,9 +582,30 @@ Respond with a JSON object matching this schema:
 
 Return ONLY valid JSON, no markdown or explanation.
 """
-        
+    
+    def complete_structured(
+        self,
+        prompt: str,
+        output_schema: Type[T],
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.3
+    ) -> T:
+        """Get structured output matching Pydantic schema."""
+        full_prompt = self._structured_prompt(prompt, output_schema)
         result = self.complete_json(full_prompt, system_prompt, temperature)
         return output_schema.model_validate(result)
+    
+    async def acomplete_structured(
+        self,
+        prompt: str,
+        output_schema: Type[T],
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.3
+    ) -> T:
+        """Async variant of complete_structured."""
+        full_prompt = self._structured_prompt(prompt, output_schema)
+        result = await self.acomplete_json(full_prompt, system_prompt, temperature)
+        return output_schema.model_validate(result)
 
 
 class MockLLMClient:
@@ -360,6 +637,18 @@ class MockLLMClient:
     def complete_structured(self, prompt: str, output_schema: Type[T], **kwargs) -> T:
         result = self.complete_json(prompt, **kwargs)
         return output_schema.model_validate(result)
+    
+    async def acomplete(self, prompt: str, **kwargs) -> str:
+        return self.complete(prompt, **kwargs)
+    
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        yield self.complete(prompt, **kwargs)
+    
+    async def acomplete_json(self, prompt: str, **kwargs) -> dict:
+        return self.complete_json(prompt, **kwargs)
+    
+    async def acomplete_structured(self, prompt: str, output_schema: Type[T], **kwargs) -> T:
+        return self.complete_structured(prompt, output_schema, **kwargs)
 
 
 def get_llm_client(use_mock: bool = False, prefer_local: bool = None):
@@ -369,7 +658,15 @@ def get_llm_client(use_mock: bool = False, prefer_local: bool = None):
     2. Groq (cloud, ultra-fast) as alternative
     3. Ollama (local) if prefer_local=True
     4. Mock fallback
+    
+    The client is wrapped in CachedLLMClient, so identical requests are served
+    from the shared response cache (see src/utils/llm_cache.py).
     """
+    return CachedLLMClient(_create_llm_client(use_mock, prefer_local), get_llm_cache())
+
+
+def _create_llm_client(use_mock: bool = False, prefer_local: bool = None):
+    """Pick the raw LLM client for get_llm_client."""
     
     if use_mock:
         return MockLLMClient()
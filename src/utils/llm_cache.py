@@ -0,0 +1,338 @@
+"""
+LLM Response Cache - Content-addressed cache in front of any LLM client.
+In-memory LRU tier with TTLs, plus an optional SQLite tier shared across processes.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+
+T = TypeVar('T', bound=BaseModel)
+
+DEFAULT_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL", "3600"))
+DEFAULT_MAX_ENTRIES = int(os.getenv("LLM_CACHE_SIZE", "512"))
+
+
+class LLMResponseCache:
+    """
+    Two-tier TTL cache for LLM responses.
+
+    Values are stored JSON-encoded, so every hit returns a fresh object that
+    callers may mutate freely.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        default_ttl: float = DEFAULT_TTL_SECONDS,
+        db_path: Optional[str] = None
+    ):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.db_path = db_path
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.counters = {"hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=5)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+                self._db.commit()
+                print(f"💾 LLM cache disk tier: {db_path}")
+            except sqlite3.Error as e:
+                print(f"⚠️  LLM cache disk tier disabled: {e}")
+                self._db = None
+
+    @staticmethod
+    def make_key(method: str, model: str, system_prompt: Optional[str], prompt: str,
+                 temperature: float, max_tokens: Optional[int]) -> str:
+        """Content address of a request."""
+        payload = json.dumps(
+            [method, model, system_prompt or "", prompt, temperature, max_tokens],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, encoded = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.counters["hits"] += 1
+                    return json.loads(encoded)
+                del self._memory[key]
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+                    ).fetchone()
+                except sqlite3.Error:
+                    row = None
+                if row and row[1] > now:
+                    self._remember(key, row[1], row[0])
+                    self.counters["hits"] += 1
+                    self.counters["disk_hits"] += 1
+                    return json.loads(row[0])
+
+            self.counters["misses"] += 1
+            return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        expires_at = time.time() + ttl
+        encoded = json.dumps(value, ensure_ascii=False)
+
+        with self._lock:
+            self._remember(key, expires_at, encoded)
+            self.counters["stores"] += 1
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, encoded, expires_at)
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"⚠️  LLM cache write failed: {e}")
+
+    def _remember(self, key: str, expires_at: float, encoded: str):
+        """Insert into the LRU tier (caller holds the lock)."""
+        self._memory[key] = (expires_at, encoded)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def purge_expired(self) -> int:
+        """Drop expired entries from both tiers. Returns the number removed from disk."""
+        now = time.time()
+        with self._lock:
+            for key in [k for k, (exp, _) in self._memory.items() if exp <= now]:
+                del self._memory[key]
+            if self._db is None:
+                return 0
+            cursor = self._db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+            self._db.commit()
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "disk_enabled": self._db is not None
+            }
+
+
+class CachedLLMClient:
+    """
+    Wraps an LLM client and serves repeated requests from LLMResponseCache.
+
+    Caching is opt-in per call site: every completion method accepts an extra
+    `cache_ttl` (seconds) saying how long its answers stay valid, and calls
+    without one (None or 0) go straight to the client. Text completions also
+    take `cache_refresh=True`, which skips the lookup but stores the new
+    answer. Attributes not defined here are delegated to the wrapped client.
+    """
+
+    def __init__(self, client, cache: Optional[LLMResponseCache] = None):
+        self.client = client
+        self.cache = cache
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    @property
+    def model(self) -> str:
+        return getattr(self.client, "model", type(self.client).__name__)
+
+    def _key(self, method: str, prompt: str, system_prompt: Optional[str],
+             temperature: float, max_tokens: Optional[int]) -> str:
+        return LLMResponseCache.make_key(
+            method, f"{type(self.client).__name__}:{self.model}",
+            system_prompt, prompt, temperature, max_tokens
+        )
+
+    def _lookup(self, key: str, cache_ttl: Optional[float], refresh: bool = False) -> Optional[Any]:
+        if self.cache is None or not cache_ttl or refresh:
+            return None
+        return self.cache.get(key)
+
+    def _store(self, key: str, value: Any, cache_ttl: Optional[float]):
+        if self.cache is not None and cache_ttl and value:
+            self.cache.set(key, value, cache_ttl)
+
+    # --- Sync ---
+
+    def complete(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        cache_ttl: Optional[float] = None,
+        cache_refresh: bool = False
+    ) -> str:
+        key = self._key("complete", prompt, system_prompt, temperature, max_tokens)
+        cached = self._lookup(key, cache_ttl, cache_refresh)
+        if cached is not None:
+            return cached
+        result = self.client.complete(
+            prompt, system_prompt=system_prompt, temperature=temperature, max_tokens=max_tokens
+        )
+        self._store(key, result, cache_ttl)
+        return result
+
+    def complete_json(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.3,
+        cache_ttl: Optional[float] = None
+    ) -> dict:
+        key = self._key("complete_json", prompt, system_prompt, temperature, None)
+        cached = self._lookup(key, cache_ttl)
+        if cached is not None:
+            return cached
+        result = self.client.complete_json(prompt, system_prompt=system_prompt, temperature=temperature)
+        self._store(key, result, cache_ttl)
+        return result
+
+    def complete_structured(
+        self,
+        prompt: str,
+        output_schema: Type[T],
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.3,
+        cache_ttl: Optional[float] = None
+    ) -> T:
+        key = self._key(f"structured:{output_schema.__name__}", prompt, system_prompt, temperature, None)
+        cached = self._lookup(key, cache_ttl)
+        if cached is not None:
+            return output_schema.model_validate(cached)
+        result = self.client.complete_structured(
+            prompt, output_schema, system_prompt=system_prompt, temperature=temperature
+        )
+        self._store(key, result.model_dump(mode="json"), cache_ttl)
+        return result
+
+    # --- Async ---
+
+    async def acomplete(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        cache_ttl: Optional[float] = None,
+        cache_refresh: bool = False
+    ) -> str:
+        key = self._key("complete", prompt, system_prompt, temperature, max_tokens)
+        cached = self._lookup(key, cache_ttl, cache_refresh)
+        if cached is not None:
+            return cached
+        result = await self.client.acomplete(
+            prompt, system_prompt=system_prompt, temperature=temperature, max_tokens=max_tokens
+        )
+        self._store(key, result, cache_ttl)
+        return result
+
+    async def acomplete_json(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.3,
+        cache_ttl: Optional[float] = None
+    ) -> dict:
+        key = self._key("complete_json", prompt, system_prompt, temperature, None)
+        cached = self._lookup(key, cache_ttl)
+        if cached is not None:
+            return cached
+        result = await self.client.acomplete_json(prompt, system_prompt=system_prompt, temperature=temperature)
+        self._store(key, result, cache_ttl)
+        return result
+
+    async def acomplete_structured(
+        self,
+        prompt: str,
+        output_schema: Type[T],
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.3,
+        cache_ttl: Optional[float] = None
+    ) -> T:
+        key = self._key(f"structured:{output_schema.__name__}", prompt, system_prompt, temperature, None)
+        cached = self._lookup(key, cache_ttl)
+        if cached is not None:
+            return output_schema.model_validate(cached)
+        result = await self.client.acomplete_structured(
+            prompt, output_schema, system_prompt=system_prompt, temperature=temperature
+        )
+        self._store(key, result.model_dump(mode="json"), cache_ttl)
+        return result
+
+    async def astream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        cache_ttl: Optional[float] = None,
+        cache_refresh: bool = False
+    ) -> AsyncIterator[str]:
+        """Stream chunks; a cached answer is replayed as one chunk, a fresh one is stored when complete."""
+        # Same key as complete(): a streamed answer can serve a later non-streamed request
+        key = self._key("complete", prompt, system_prompt, temperature, max_tokens)
+        cached = self._lookup(key, cache_ttl, cache_refresh)
+        if cached is not None:
+            yield cached
+            return
+
+        parts = []
+        async for chunk in self.client.astream(
+            prompt, system_prompt=system_prompt, temperature=temperature, max_tokens=max_tokens
+        ):
+            parts.append(chunk)
+            yield chunk
+        self._store(key, "".join(parts), cache_ttl)
+
+
+_llm_cache: Optional[LLMResponseCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """
+    Shared response cache, configured from the environment:
+    LLM_CACHE_ENABLED (default true), LLM_CACHE_SIZE, LLM_CACHE_TTL and
+    LLM_CACHE_DB (SQLite path; unset = memory only).
+    """
+    global _llm_cache
+    if os.getenv("LLM_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                _llm_cache = LLMResponseCache(db_path=os.getenv("LLM_CACHE_DB") or None)
+    return _llm_cache
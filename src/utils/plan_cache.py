@@ -0,0 +1,147 @@
+"""
+Plan Cache - Bounded LRU of deterministic trip plans.
+DeterministicTripPlanner.create_plan depends only on the normalised request
+and the catalog version, so popular plans are served without planning work.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from src.models.schemas import PlanRequest, PlanResponse
+
+
+DEFAULT_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_SIZE", "256"))
+
+# Requests precomputed at startup (PLAN_CACHE_PRECOMPUTE): the frontend's
+# default interests over the usual trip lengths, paces and budgets
+PRECOMPUTE_DAYS = (1, 2, 3, 4, 5)
+PRECOMPUTE_PACES = ("slow", "medium", "fast")
+PRECOMPUTE_BUDGETS = (100.0, 200.0)
+PRECOMPUTE_INTERESTS = (
+    ("history", "food"),
+    ("history", "culture"),
+)
+
+
+def normalise_start_date(start_date: Optional[str]) -> str:
+    """
+    ISO start date the planner will use: the given date, or today when it is
+    missing or unparsable (the planner falls back to today in that case).
+    """
+    if start_date:
+        try:
+            return datetime.strptime(start_date, "%Y-%m-%d").date().isoformat()
+        except ValueError:
+            pass
+    return date.today().isoformat()
+
+
+def plan_key(request: PlanRequest, start_date: str, catalog_version: str) -> Tuple:
+    """Cache key: only fields that change the plan, normalised."""
+    interests = tuple(sorted({i.lower() for i in request.interests}))
+    return (request.days, interests, float(request.budget), request.pace, start_date, catalog_version)
+
+
+class PlanCache:
+    """
+    Thread-safe LRU of PlanResponse objects.
+
+    Cached responses are shared between requests and must be treated as
+    read-only. Entries of older catalog versions are never hit again and
+    age out of the LRU.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, PlanResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def get(self, key: Hashable) -> Optional[PlanResponse]:
+        with self._lock:
+            plan = self._entries.get(key)
+            if plan is None:
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return plan
+
+    def set(self, key: Hashable, plan: PlanResponse):
+        with self._lock:
+            self._entries[key] = plan
+            self._entries.move_to_end(key)
+            self.counters["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], PlanResponse]) -> PlanResponse:
+        """Cached plan, or build and store it (concurrent misses may both build)."""
+        plan = self.get(key)
+        if plan is None:
+            plan = factory()
+            self.set(key, plan)
+        return plan
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries
+            }
+
+
+def common_plan_requests() -> List[PlanRequest]:
+    """The request combinations worth precomputing at startup."""
+    return [
+        PlanRequest(days=days, interests=list(interests), budget=budget, pace=pace)
+        for interests in PRECOMPUTE_INTERESTS
+        for days in PRECOMPUTE_DAYS
+        for pace in PRECOMPUTE_PACES
+        for budget in PRECOMPUTE_BUDGETS
+    ]
+
+
+def precompute_plans(
+    build: Callable[[PlanRequest], PlanResponse],
+    requests: Iterable[PlanRequest] = None
+) -> int:
+    """Warm the cache by calling `build` (which caches) per request. Returns plans built."""
+    built = 0
+    for request in requests if requests is not None else common_plan_requests():
+        try:
+            build(request)
+            built += 1
+        except Exception as e:
+            print(f"⚠️  Plan precompute failed for {request.days}d/{request.pace}: {e}")
+    return built
+
+
+_plan_cache: Optional[PlanCache] = None
+_plan_cache_lock = threading.Lock()
+
+
+def get_plan_cache() -> Optional[PlanCache]:
+    """
+    Shared plan cache, configured from the environment:
+    PLAN_CACHE_ENABLED (default true) and PLAN_CACHE_SIZE.
+    """
+    global _plan_cache
+    if os.getenv("PLAN_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    if _plan_cache is None:
+        with _plan_cache_lock:
+            if _plan_cache is None:
+                _plan_cache = PlanCache()
+    return _plan_cache
@@ -0,0 +1,291 @@
+"""
+Session Store - Bounded conversation history for /v1/chat.
+Caps messages per session, evicts idle sessions and enforces a global size
+ceiling. The SQLite backend lets several uvicorn workers share sessions.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional
+
+
+DEFAULT_MAX_MESSAGES = int(os.getenv("SESSION_MAX_MESSAGES", "20"))
+DEFAULT_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", str(6 * 3600)))
+DEFAULT_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Idle/ceiling sweeps run at most this often (seconds)
+SWEEP_INTERVAL = 30.0
+
+
+class SessionStore(ABC):
+    """Interface shared by the session backends."""
+
+    @abstractmethod
+    def append(self, session_id: str, message: Dict):
+        ...
+
+    @abstractmethod
+    def get(self, session_id: str) -> List[Dict]:
+        """Messages of a session, oldest first (empty list if unknown or expired)."""
+
+    @abstractmethod
+    def clear(self, session_id: str):
+        ...
+
+    @abstractmethod
+    def stats(self) -> Dict:
+        ...
+
+
+class _Session:
+    __slots__ = ("messages", "sizes", "nbytes", "last_seen")
+
+    def __init__(self):
+        self.messages: Deque[Dict] = deque()
+        self.sizes: Deque[int] = deque()
+        self.nbytes = 0
+        self.last_seen = time.monotonic()
+
+
+class MemorySessionStore(SessionStore):
+    """
+    In-process store. Sessions are kept in LRU order, so both idle eviction
+    and the size ceiling only ever pop from the front.
+    """
+
+    def __init__(
+        self,
+        max_messages: int = DEFAULT_MAX_MESSAGES,
+        idle_ttl: float = DEFAULT_IDLE_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES
+    ):
+        self.max_messages = max_messages
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._nbytes = 0
+        self._evicted = 0
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+
+    def _drop(self, session_id: str):
+        session = self._sessions.pop(session_id)
+        self._nbytes -= session.nbytes
+        self._evicted += 1
+
+    def _sweep(self, now: float):
+        """Evict idle sessions, then LRU sessions until under the ceiling (caller holds the lock)."""
+        if now - self._last_sweep >= SWEEP_INTERVAL:
+            self._last_sweep = now
+            while self._sessions:
+                session_id, session = next(iter(self._sessions.items()))
+                if now - session.last_seen < self.idle_ttl:
+                    break
+                self._drop(session_id)
+
+        # Never evict the most recent session to satisfy the ceiling
+        while self._nbytes > self.max_bytes and len(self._sessions) > 1:
+            self._drop(next(iter(self._sessions)))
+
+    def append(self, session_id: str, message: Dict):
+        size = len(json.dumps(message, ensure_ascii=False, default=str))
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = _Session()
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_seen = now
+
+            session.messages.append(message)
+            session.sizes.append(size)
+            session.nbytes += size
+            self._nbytes += size
+            while len(session.messages) > self.max_messages:
+                session.messages.popleft()
+                dropped = session.sizes.popleft()
+                session.nbytes -= dropped
+                self._nbytes -= dropped
+
+            self._sweep(now)
+
+    def get(self, session_id: str) -> List[Dict]:
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return []
+            if now - session.last_seen >= self.idle_ttl:
+                self._drop(session_id)
+                return []
+            return list(session.messages)
+
+    def clear(self, session_id: str):
+        with self._lock:
+            if session_id in self._sessions:
+                self._drop(session_id)
+                self._evicted -= 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "bytes": self._nbytes,
+                "max_bytes": self.max_bytes,
+                "evicted": self._evicted
+            }
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    SQLite-backed store shared by all worker processes on one host.
+    Each call opens a short transaction; WAL mode keeps readers unblocked.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_messages: int = DEFAULT_MAX_MESSAGES,
+        idle_ttl: float = DEFAULT_IDLE_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES
+    ):
+        self.db_path = db_path
+        self.max_messages = max_messages
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS session_messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_session_messages_session
+                ON session_messages (session_id, id);
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                last_seen REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_sessions_last_seen ON sessions (last_seen);
+        """)
+        self._db.commit()
+        print(f"💾 Session store: {db_path}")
+
+    def _delete_sessions(self, session_ids: List[str]):
+        for session_id in session_ids:
+            self._db.execute("DELETE FROM session_messages WHERE session_id = ?", (session_id,))
+            self._db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def _sweep(self, now: float, current: str):
+        """Evict idle sessions and enforce the size ceiling (caller holds the lock)."""
+        if now - self._last_sweep < SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+
+        idle = [row[0] for row in self._db.execute(
+            "SELECT session_id FROM sessions WHERE last_seen < ?", (now - self.idle_ttl,)
+        )]
+        self._delete_sessions(idle)
+
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM session_messages").fetchone()[0]
+        if total > self.max_bytes:
+            rows = self._db.execute(
+                "SELECT s.session_id, COALESCE(SUM(m.size), 0) FROM sessions s "
+                "LEFT JOIN session_messages m ON m.session_id = s.session_id "
+                "WHERE s.session_id != ? GROUP BY s.session_id ORDER BY s.last_seen",
+                (current,)
+            ).fetchall()
+            victims = []
+            for session_id, size in rows:
+                if total <= self.max_bytes:
+                    break
+                victims.append(session_id)
+                total -= size
+            self._delete_sessions(victims)
+
+    def append(self, session_id: str, message: Dict):
+        payload = json.dumps(message, ensure_ascii=False, default=str)
+        now = time.time()
+        with self._lock:
+            with self._db:
+                self._db.execute(
+                    "INSERT INTO session_messages (session_id, payload, size) VALUES (?, ?, ?)",
+                    (session_id, payload, len(payload))
+                )
+                self._db.execute(
+                    "INSERT OR REPLACE INTO sessions (session_id, last_seen) VALUES (?, ?)",
+                    (session_id, now)
+                )
+                self._db.execute(
+                    "DELETE FROM session_messages WHERE session_id = ? AND id NOT IN "
+                    "(SELECT id FROM session_messages WHERE session_id = ? ORDER BY id DESC LIMIT ?)",
+                    (session_id, session_id, self.max_messages)
+                )
+                self._sweep(now, session_id)
+
+    def get(self, session_id: str) -> List[Dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT last_seen FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None or time.time() - row[0] >= self.idle_ttl:
+                return []
+            rows = self._db.execute(
+                "SELECT payload FROM session_messages WHERE session_id = ? ORDER BY id",
+                (session_id,)
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def clear(self, session_id: str):
+        with self._lock:
+            with self._db:
+                self._delete_sessions([session_id])
+
+    def stats(self) -> Dict:
+        with self._lock:
+            sessions = self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            nbytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM session_messages").fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "sessions": sessions,
+            "bytes": nbytes,
+            "max_bytes": self.max_bytes
+        }
+
+
+_session_store: Optional[SessionStore] = None
+_session_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """
+    Shared session store, configured from the environment:
+    SESSION_STORE ("memory" or "sqlite"), SESSION_DB, SESSION_MAX_MESSAGES,
+    SESSION_IDLE_TTL and SESSION_MAX_BYTES.
+    """
+    global _session_store
+    if _session_store is None:
+        with _session_store_lock:
+            if _session_store is None:
+                backend = os.getenv("SESSION_STORE", "memory").lower()
+                if backend == "sqlite":
+                    db_path = os.getenv("SESSION_DB", "database/sessions.sqlite3")
+                    try:
+                        _session_store = SQLiteSessionStore(db_path)
+                    except sqlite3.Error as e:
+                        print(f"⚠️  SQLite session store unavailable ({e}), using memory")
+                if _session_store is None:
+                    _session_store = MemorySessionStore()
+    return _session_store
@@ -0,0 +1,156 @@
+"""
+Opening-hours index edge cases: after-midnight hours, closed weekdays,
+round-the-clock notations and per-weekday rules.
+
+Run: python -m unittest discover tests
+"""
+
+import sys
+import unittest
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.rag.opening_hours import (
+    ANY_DAY, MINUTES_PER_DAY, OpeningHoursIndex, parse_hhmm, time_window, weekly_hours
+)
+
+
+MON, TUE, WED, SAT, SUN = 0, 1, 2, 5, 6
+MONDAY = date(2026, 10, 19)
+
+
+def hhmm(value: str) -> int:
+    return parse_hhmm(value)
+
+
+class WeeklyHoursTest(unittest.TestCase):
+    def test_overnight_closing_spills_into_next_day(self):
+        self.assertEqual(time_window({"opening_hours": "18:00-02:00"}), (hhmm("18:00"), MINUTES_PER_DAY + hhmm("02:00")))
+
+    def test_round_the_clock_notations(self):
+        for hours in ("00:00-00:00", "00:00-23:59"):
+            self.assertEqual(time_window({"opening_hours": hours}), (0, MINUTES_PER_DAY), hours)
+        # Same opening and closing time other than midnight: open 24h from that time
+        self.assertEqual(time_window({"opening_hours": "10:00-10:00"}), (600, 600 + MINUTES_PER_DAY))
+
+    def test_unknown_hours_count_as_open_all_day(self):
+        self.assertEqual(weekly_hours({}), [(0, MINUTES_PER_DAY)] * (ANY_DAY + 1))
+        self.assertEqual(time_window({"opening_hours": "по записи"}), (0, MINUTES_PER_DAY))
+
+    def test_restaurant_fields(self):
+        record = {"opens_at": "11:00", "closing_hours": "01:00"}
+        self.assertEqual(time_window(record), (hhmm("11:00"), MINUTES_PER_DAY + hhmm("01:00")))
+
+    def test_closed_on_and_weekday_rules(self):
+        week = weekly_hours({"opening_hours": "09:00-18:00", "closed_on": ["Monday", "sun"]})
+        self.assertIsNone(week[MON])
+        self.assertIsNone(week[SUN])
+        self.assertEqual(week[TUE], (540, 1080))
+        self.assertEqual(week[ANY_DAY], (540, 1080))
+
+        week = weekly_hours({"opening_hours": {"default": "09:00-18:00", "sat": "10:00-14:00", "sunday": "closed"}})
+        self.assertEqual(week[WED], (540, 1080))
+        self.assertEqual(week[SAT], (600, 840))
+        self.assertIsNone(week[SUN])
+        self.assertEqual(week[ANY_DAY], (540, 1080))
+
+
+class OpeningHoursIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = OpeningHoursIndex([
+            {"id": "museum", "opening_hours": "09:00-18:00", "closed_on": ["monday"]},
+            {"id": "bar", "opening_hours": "18:00-02:00"},
+            {"id": "club", "opening_hours": "22:00-04:00", "closed_on": ["monday"]},
+            {"id": "cafe", "opening_hours": "00:00-00:00"},
+            {"id": "market", "opening_hours": {"default": "07:00-19:00", "sun": "05:00-12:00"}},
+            {"name": "no id, ignored"},
+        ])
+
+    def test_day_hours(self):
+        self.assertTrue(self.index.is_open("museum", TUE, hhmm("09:00")))
+        self.assertTrue(self.index.open_between("museum", TUE, hhmm("16:30"), hhmm("18:00")))
+        self.assertFalse(self.index.open_between("museum", TUE, hhmm("17:00"), hhmm("18:30")))
+        self.assertFalse(self.index.is_open("museum", TUE, hhmm("08:59")))
+
+    def test_closed_weekday(self):
+        self.assertFalse(self.index.is_open("museum", MON, hhmm("12:00")))
+        self.assertFalse(self.index.is_open("museum", MONDAY, hhmm("12:00")))
+        self.assertIsNone(self.index.window("museum", MON))
+        self.assertEqual(self.index.window("museum", TUE), (540, 1080))
+        # Regular hours (no weekday) ignore closed days
+        self.assertTrue(self.index.is_open("museum", None, hhmm("12:00")))
+
+    def test_overnight_spill(self):
+        # Monday's late hours continue into Tuesday morning
+        self.assertTrue(self.index.is_open("bar", TUE, hhmm("01:30")))
+        self.assertTrue(self.index.open_between("bar", MON, hhmm("23:00"), MINUTES_PER_DAY + hhmm("01:00")))
+        self.assertFalse(self.index.open_between("bar", MON, hhmm("23:00"), MINUTES_PER_DAY + hhmm("03:00")))
+        self.assertFalse(self.index.is_open("bar", TUE, hhmm("02:30")))
+        self.assertTrue(self.index.is_open("bar", None, hhmm("01:30")))
+
+    def test_no_spill_from_a_closed_day(self):
+        # Closed on Monday night, so not open early on Tuesday; Wednesday gets Tuesday's spill
+        self.assertFalse(self.index.is_open("club", TUE, hhmm("01:00")))
+        self.assertTrue(self.index.is_open("club", WED, hhmm("01:00")))
+        # Sunday night spills into (closed) Monday morning
+        self.assertTrue(self.index.is_open("club", MON, hhmm("03:00")))
+
+    def test_round_the_clock(self):
+        for minute in (0, hhmm("12:00"), MINUTES_PER_DAY - 1):
+            self.assertTrue(self.index.is_open("cafe", SAT, minute))
+        self.assertTrue(self.index.open_between("cafe", SAT, 0, MINUTES_PER_DAY))
+        # A late visit runs on into the next day
+        self.assertTrue(self.index.open_between("cafe", SAT, hhmm("22:45"), MINUTES_PER_DAY + hhmm("00:15")))
+        self.assertTrue(self.index.open_between("cafe", None, hhmm("22:45"), MINUTES_PER_DAY + hhmm("00:15")))
+        # ...but not into a closed day
+        index = OpeningHoursIndex([{"id": "diner", "opening_hours": "00:00-00:00", "closed_on": ["sunday"]}])
+        self.assertTrue(index.open_between("diner", SAT, hhmm("22:00"), MINUTES_PER_DAY - 1))
+        self.assertFalse(index.open_between("diner", SAT, hhmm("23:00"), MINUTES_PER_DAY + hhmm("00:30")))
+
+    def test_weekday_rules(self):
+        self.assertTrue(self.index.is_open("market", SUN, hhmm("06:00")))
+        self.assertFalse(self.index.is_open("market", SUN, hhmm("13:00")))
+        self.assertFalse(self.index.is_open("market", SAT, hhmm("06:00")))
+        self.assertTrue(self.index.is_open("market", SAT, hhmm("13:00")))
+
+    def test_unknown_entities_count_as_open(self):
+        self.assertNotIn("nowhere", self.index)
+        self.assertTrue(self.index.is_open("nowhere", MON, hhmm("03:00")))
+        self.assertTrue(self.index.open_between("nowhere", MON, 0, MINUTES_PER_DAY))
+        self.assertIsNone(self.index.window("nowhere"))
+
+    def test_open_in_window(self):
+        self.assertEqual(len(self.index), 5)
+        self.assertEqual(
+            self.index.open_in_window(hhmm("23:00"), MINUTES_PER_DAY + hhmm("01:00"), TUE),
+            ["bar", "club", "cafe"]
+        )
+        self.assertEqual(
+            self.index.open_in_window(hhmm("12:00"), hhmm("13:00"), MON, ids=["market", "museum", "nowhere", "cafe"]),
+            ["market", "cafe"]
+        )
+        self.assertEqual(self.index.open_in_window(hhmm("12:00"), ids=[]), [])
+
+    def test_matches_weekly_hours_on_catalog(self):
+        """Every catalog entity: the index agrees with its parsed weekly hours."""
+        from src.rag.catalog import get_catalog
+        from src.rag.opening_hours import get_opening_hours
+
+        catalog = get_catalog()
+        index = get_opening_hours(catalog)
+        for record in catalog.pois + catalog.restaurants + catalog.hotels:
+            if "id" not in record:
+                continue
+            week = weekly_hours(record)
+            for day in range(7):
+                interval = week[day]
+                self.assertEqual(index.window(record["id"], day), interval, (record["id"], day))
+                if interval:
+                    opens, closes = interval
+                    self.assertTrue(index.open_between(record["id"], day, opens, min(closes, 2 * MINUTES_PER_DAY)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+RestaurantIndex.best must pick exactly what a scan over all restaurants picks:
+the slot/price buckets are only a shortcut.
+
+Run: python -m unittest discover tests
+"""
+
+import itertools
+import sys
+import unittest
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.rag.catalog import get_catalog
+from src.rag.opening_hours import OpeningHoursIndex, parse_hhmm
+from src.rag.restaurant_index import (
+    DEFAULT_CHECK_USD, DEFAULT_RATING, PROXIMITY_WEIGHT, RestaurantIndex, get_restaurant_index
+)
+
+
+def scan(index, start, minutes=0, day=None, max_price=None, exclude=(), near=None, cheapest=False):
+    """Reference: check every restaurant, no buckets."""
+    def price(record):
+        return record.get("avg_check_usd", DEFAULT_CHECK_USD)
+
+    def rating(record):
+        return record.get("rating", DEFAULT_RATING)
+
+    def travel(record):
+        if not near or index.travel is None:
+            return 0.0
+        return index.travel.travel_minutes(near, record["id"])
+
+    rows = [
+        (row, record) for row, record in enumerate(index.records)
+        if record["id"] not in exclude
+        and (max_price is None or price(record) <= max_price)
+        and index.opening_hours.open_between(record["id"], day, start, start + minutes)
+    ]
+    if not rows:
+        return None
+    if cheapest:
+        return min(rows, key=lambda r: (price(r[1]), travel(r[1]), -rating(r[1]), r[0]))[1]
+    if near and index.travel is not None:
+        return max(rows, key=lambda r: (rating(r[1]) - PROXIMITY_WEIGHT * travel(r[1]) / 10, -r[0]))[1]
+    return min(rows, key=lambda r: (-rating(r[1]), r[0]))[1]
+
+
+TIMES = ["00:30", "07:00", "08:00", "10:00", "11:45", "12:00", "13:20", "15:00", "19:00", "19:30", "22:45", "23:30"]
+PRICES = [None, 3, 5, 8, 10, 13.4, 20, 35, 50, 200]
+DAYS = [None, 0, 3, 6, date(2026, 10, 18)]
+
+
+class RestaurantIndexTest(unittest.TestCase):
+    def assert_same(self, index, cases):
+        checked = 0
+        for start, minutes, day, max_price, exclude, near, cheapest in cases:
+            expected = scan(index, start, minutes, day, max_price, exclude, near, cheapest)
+            actual = index.best(start, minutes, day, max_price, exclude, near, cheapest)
+            self.assertIs(actual, expected, (start, minutes, day, max_price, exclude, near, cheapest))
+            checked += 1
+        return checked
+
+    def test_synthetic_edge_cases(self):
+        """Overnight hours, closed days, price-band edges, rating ties and missing fields."""
+        restaurants = [
+            {"id": "late", "opening_hours": "18:00-02:00", "avg_check_usd": 20, "rating": 4.5},
+            {"id": "allday", "opening_hours": "00:00-00:00", "avg_check_usd": 10, "rating": 4.5},
+            {"id": "lunch", "opens_at": "11:30", "closing_hours": "15:00", "avg_check_usd": 35, "rating": 4.9},
+            {"id": "closed_mon", "opening_hours": "09:00-22:00", "closed_on": ["monday"], "rating": 4.7},
+            {"id": "weekend", "opening_hours": {"default": "12:00-20:00", "sat": "08:00-23:59"},
+             "avg_check_usd": 35.01, "rating": 4.5},
+            {"id": "cheap", "opening_hours": "07:00-23:00", "avg_check_usd": 3},
+            {"id": "tie", "opening_hours": "07:00-23:00", "avg_check_usd": 3, "rating": 4.0},
+        ]
+        index = RestaurantIndex(restaurants, OpeningHoursIndex(restaurants))
+        self.assertEqual(len(index), len(restaurants))
+
+        cases = itertools.product(
+            [parse_hhmm(t) for t in TIMES], [0, 90], DAYS, PRICES,
+            [(), ("allday",), ("cheap", "late")], [None], [False, True]
+        )
+        self.assertGreater(self.assert_same(index, cases), 0)
+
+    def test_catalog_matches_scan(self):
+        catalog = get_catalog()
+        index = get_restaurant_index(catalog)
+        ids = [r["id"] for r in index.records]
+        self.assertTrue(ids, "catalog has no restaurants")
+
+        cases = itertools.product(
+            [parse_hhmm(t) for t in TIMES], [0, 90], DAYS, PRICES,
+            [(), (ids[0],), tuple(ids[:5])], [None], [False, True]
+        )
+        self.assertGreater(self.assert_same(index, cases), 0)
+
+    def test_catalog_near_matches_scan(self):
+        """Proximity ranking (and cheapest tie-break by travel) from a few previous stops."""
+        catalog = get_catalog()
+        index = get_restaurant_index(catalog)
+        stops = [p["id"] for p in catalog.pois[:4] if "id" in p] + [index.records[0]["id"]]
+
+        cases = itertools.product(
+            [parse_hhmm(t) for t in ("08:00", "12:00", "13:20", "19:30", "22:45")], [90],
+            [None, 2], [None, 10, 20, 50], [(), (index.records[1]["id"],)], stops, [False, True]
+        )
+        self.assertGreater(self.assert_same(index, cases), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()